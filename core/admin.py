@@ -0,0 +1,67 @@
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
+
+from . import search
+
+# Below this many rows an exact COUNT(*) is cheap enough
+ESTIMATE_THRESHOLD = 10000
+
+
+def estimated_row_count(model):
+    """Approximate row count of ``model``'s table, or ``None`` if unknown."""
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [table])
+        elif connection.vendor == 'sqlite':
+            # Rowids are assigned in increasing order, so this is an index
+            # lookup rather than a table scan
+            cursor.execute(
+                f'SELECT MAX(rowid) FROM {connection.ops.quote_name(table)}')
+        else:
+            return None
+        row = cursor.fetchone()
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return row[0]
+
+
+class FullTextSearchMixin:
+    """
+    Serve the changelist search box from the full-text index.
+
+    ``search_kind`` is the indexed type to match and ``search_lookup`` the
+    field holding that object's ID (``pk`` for the model itself). Falls back
+    to ``search_fields`` when the index isn't available.
+    """
+    search_kind = None
+    search_lookup = 'pk'
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not search.is_available():
+            return super().get_search_results(request, queryset, search_term)
+
+        ids = search.matching_ids(self.search_kind, search_term)
+        return queryset.filter(**{f'{self.search_lookup}__in': ids}), False
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator using the table size estimate for unfiltered changelists.
+
+    Filtered and small result sets still get an exact count. The estimate
+    counts deleted rows too, so the last few pages of a big table may be
+    empty.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_row_count(self.object_list.model)
+            if estimate is not None and estimate > ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
@@ -0,0 +1,125 @@
+"""
+In-process execution of batched API requests.
+
+Each sub-request is dispatched straight to the view its path resolves to,
+carrying the batch request's credentials (``Authorization`` header and
+cookies). Runs of consecutive read-only requests execute concurrently on a
+small thread pool; a write waits for everything before it and runs alone,
+so sub-requests observe each other in list order.
+"""
+
+import asyncio
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_PREFIXES = ('/api/schedule/', '/api/users/', '/api/search/')
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Request metadata passed on from the batch request besides HTTP_* headers
+INHERITED_META = ('REMOTE_ADDR', 'SERVER_NAME', 'SERVER_PORT')
+
+MAX_REQUESTS = getattr(settings, 'BATCH_MAX_REQUESTS', 20)
+WORKERS = getattr(settings, 'BATCH_WORKERS', 4)
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='batch')
+
+
+def _error(status_code, message):
+    return {'status': status_code, 'headers': {}, 'body': {'error': message}}
+
+
+def _sub_request(request, item, url):
+    body = b'' if item.get('body') is None else json.dumps(item['body']).encode()
+    environ = {
+        key: value for key, value in request.META.items()
+        if key.startswith('HTTP_') or key in INHERITED_META
+    }
+    # A key meant for the batch itself must not leak into its items
+    environ.pop('HTTP_IDEMPOTENCY_KEY', None)
+    environ['HTTP_ACCEPT'] = 'application/json'
+    for name, value in item.get('headers', {}).items():
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'SCRIPT_NAME': '',
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    })
+    return WSGIRequest(environ)
+
+
+def run(request, item):
+    """Execute one sub-request; returns its ``status``, ``headers`` and ``body``."""
+    url = urlsplit(item['path'])
+    if not url.path.startswith(ALLOWED_PREFIXES):
+        return _error(400, "Only schedule, users and search endpoints can be batched.")
+    try:
+        match = resolve(url.path)
+    except Resolver404:
+        return _error(404, "Not found.")
+    if asyncio.iscoroutinefunction(match.func):
+        return _error(400, "This endpoint can't be batched.")
+
+    sub_request = _sub_request(request, item, url)
+    sub_request.resolver_match = match
+    try:
+        response = match.func(sub_request, *match.args, **match.kwargs)
+        if response.streaming:
+            return _error(400, "Streaming endpoints can't be batched.")
+        if hasattr(response, 'render'):
+            response.render()
+    except Exception:
+        logger.exception("Batched %s %s failed", item['method'], item['path'])
+        return _error(500, "Internal server error.")
+
+    body = None
+    if response.content:
+        if response.get('Content-Type', '').startswith('application/json'):
+            body = json.loads(response.content)
+        else:
+            body = response.content.decode(response.charset or 'utf-8', 'replace')
+    headers = {name: value for name, value in response.items()
+               if name.lower() != 'content-length'}
+    return {'status': response.status_code, 'headers': headers, 'body': body}
+
+
+def _run_in_worker(request, item):
+    try:
+        return run(request, item)
+    finally:
+        # Pool threads outlive the request; don't keep their connections open
+        connections.close_all()
+
+
+def execute(request, items):
+    """Run ``items`` and return their results in the same order."""
+    results = [None] * len(items)
+    pending = []
+
+    def wait_for_pending():
+        for index, future in pending:
+            results[index] = future.result()
+        pending.clear()
+
+    for index, item in enumerate(items):
+        if item['method'] in SAFE_METHODS:
+            pending.append((index, _executor.submit(_run_in_worker, request, item)))
+        else:
+            wait_for_pending()
+            results[index] = run(request, item)
+    wait_for_pending()
+    return results
@@ -0,0 +1,172 @@
+"""
+Negotiated compression of API responses.
+
+Responses under ``COMPRESSION_PATHS`` are compressed with the best
+encoding the client accepts: zstd and brotli when their packages are
+installed, gzip otherwise. Bodies smaller than ``COMPRESSION_MIN_SIZE``
+are sent as they are.
+
+The compressed body of a response carrying an ``ETag`` is cached under
+that ETag (which holds the data's version) in the shared store, so a
+popular unchanged response is compressed once for all workers instead of
+on every request. Streaming responses are compressed as they stream,
+except server-sent events, which proxies and clients expect unencoded.
+"""
+
+import gzip
+import hashlib
+import logging
+import re
+import sqlite3
+import zlib
+
+from django.conf import settings
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from . import shared_store
+
+logger = logging.getLogger(__name__)
+
+PATHS = tuple(getattr(settings, 'COMPRESSION_PATHS', ()))
+MIN_SIZE = getattr(settings, 'COMPRESSION_MIN_SIZE', 1024)
+CACHE_TIMEOUT = getattr(settings, 'COMPRESSION_CACHE_TIMEOUT', 300)
+
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/x-ndjson',
+                      'application/vnd.', 'application/msgpack')
+UNCOMPRESSED_TYPES = ('text/event-stream',)
+# Streams whose every chunk has to reach the client right away
+LIVE_TYPES = ('application/x-ndjson',)
+
+_accept_item = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([\d.]+))?')
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _Zstd:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+# One-shot compressors and stream compressors, in order of preference
+ENCODINGS = {}
+if zstandard is not None:
+    ENCODINGS['zstd'] = (lambda data: zstandard.ZstdCompressor(level=3).compress(data), _Zstd)
+if brotli is not None:
+    ENCODINGS['br'] = (lambda data: brotli.compress(data, quality=5), _Brotli)
+ENCODINGS['gzip'] = (lambda data: gzip.compress(data, compresslevel=6, mtime=0), _Gzip)
+
+
+def negotiate(accept_encoding):
+    """The preferred encoding ``accept_encoding`` allows, or ``None``."""
+    accepted = {}
+    for item in accept_encoding.lower().split(','):
+        match = _accept_item.match(item)
+        if match:
+            try:
+                accepted[match.group(1)] = float(match.group(2) or 1)
+            except ValueError:
+                continue
+    wildcard = accepted.get('*', 0)
+    candidates = [encoding for encoding in ENCODINGS
+                  if accepted.get(encoding, wildcard) > 0]
+    # Highest q-value first; ties go to the server's preference
+    return max(candidates, key=lambda encoding: accepted.get(encoding, wildcard),
+               default=None)
+
+
+def compressible(content_type):
+    media_type = content_type.split(';')[0].strip()
+    return (media_type.startswith(COMPRESSIBLE_TYPES)
+            and not media_type.startswith(UNCOMPRESSED_TYPES))
+
+
+def compress(content, encoding, etag=None, variant=''):
+    """
+    Return ``content`` compressed with ``encoding``.
+
+    With an ``etag``, the result is cached under it and ``variant`` (the
+    rest of what the body depends on, such as the URL and content type).
+    """
+    if etag is None:
+        return ENCODINGS[encoding][0](content)
+    digest = hashlib.sha1(f'{etag}\n{variant}'.encode()).hexdigest()
+    key = f'compressed:{encoding}:{digest}'
+    try:
+        compressed = shared_store.get(key)
+    except sqlite3.Error:
+        logger.exception("Compressed body lookup failed")
+        return ENCODINGS[encoding][0](content)
+    if compressed is None:
+        compressed = ENCODINGS[encoding][0](content)
+        try:
+            shared_store.put(key, compressed, CACHE_TIMEOUT)
+        except sqlite3.Error:
+            logger.exception("Could not store a compressed body")
+    return compressed
+
+
+def compress_stream(chunks, encoding, live=False):
+    """Compress an iterable of byte chunks; ``live`` flushes after each one."""
+    compressor = ENCODINGS[encoding][1]()
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if live:
+            data += compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def compress_async_stream(chunks, encoding, live=False):
+    compressor = ENCODINGS[encoding][1]()
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if live:
+            data += compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
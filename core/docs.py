@@ -0,0 +1,105 @@
+"""
+Swagger UI and OpenAPI schema views, and the annotations the schema is built from.
+
+Kept out of ``core.views`` because building the schema view imports most
+of drf_yasg; ``schema_view`` only does so when the docs are first
+requested, so workers that never serve them don't pay for it at startup.
+
+Views import ``openapi`` and ``swagger_auto_schema`` from here rather
+than from drf_yasg. Without ``API_DOCS`` (the lean profile) no schema is
+ever built, so both are inert stand-ins and drf_yasg isn't imported at all.
+"""
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.views.decorators.csrf import csrf_exempt
+
+if settings.API_DOCS:
+    from drf_yasg import openapi
+    from drf_yasg.utils import swagger_auto_schema
+else:
+    class _Inert:
+        """Accepts any attribute access or call, like ``drf_yasg.openapi`` would."""
+
+        def __getattr__(self, name):
+            return self
+
+        def __call__(self, *args, **kwargs):
+            return self
+
+    openapi = _Inert()
+
+    def swagger_auto_schema(*args, **kwargs):
+        return lambda view: view
+
+_view = None
+
+
+def _build_view():
+    from drf_yasg.renderers import (
+        OpenAPIRenderer, ReDocRenderer, SwaggerUIRenderer, SwaggerYAMLRenderer,
+    )
+    from drf_yasg.views import get_schema_view
+    from rest_framework import permissions
+    from rest_framework.response import Response
+
+    from . import response_cache
+    from .schema import API_INFO, get_schema
+
+    class PrebuiltSchemaRenderer(OpenAPIRenderer):
+        """Passes the prebuilt schema's bytes through; renders anything else as usual."""
+
+        def render(self, data, media_type=None, renderer_context=None):
+            if isinstance(data, bytes):
+                return data
+            return super().render(data, media_type, renderer_context)
+
+    class PrebuiltSchemaJSONRenderer(PrebuiltSchemaRenderer):
+        media_type = 'application/json'
+        format = 'json'
+
+    class SchemaView(get_schema_view(
+        API_INFO,
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )):
+        """
+        Swagger UI and OpenAPI schema.
+
+        The JSON schema is served from the prebuilt copy in ``core.schema``
+        instead of being regenerated on every request. The UI page only
+        needs the API's title and version: the browser fetches the schema
+        itself, from ``?format=openapi``, so the page is rendered without
+        generating one.
+        """
+
+        def get(self, request, version='', format=None):
+            renderer = request.accepted_renderer
+            if isinstance(renderer, SwaggerYAMLRenderer):
+                return super().get(request, version, format)
+            if not isinstance(renderer, PrebuiltSchemaRenderer):
+                return Response(openapi.Swagger(
+                    info=API_INFO, _prefix='/', paths=openapi.Paths({})))
+
+            body, etag = get_schema()
+            if response_cache.etag_matches(request, etag):
+                response = HttpResponseNotModified()
+            else:
+                response = Response(body)
+            response['ETag'] = etag
+            return response
+
+    # The renderers ``with_ui('swagger')`` would pick, JSON ones swapped for the prebuilt copy
+    return SchemaView.as_cached_view(cache_timeout=0, renderer_classes=[
+        SwaggerUIRenderer, ReDocRenderer, SwaggerYAMLRenderer,
+        PrebuiltSchemaJSONRenderer, PrebuiltSchemaRenderer,
+    ])
+
+
+@csrf_exempt
+def schema_view(request, *args, **kwargs):
+    """Swagger UI, or the schema with ``?format=openapi``."""
+    global _view
+    if _view is None:
+        _view = _build_view()
+    return _view(request, *args, **kwargs)
@@ -0,0 +1,130 @@
+"""
+Sparse fieldsets for list endpoints.
+
+``?fields=id,date,stadium`` limits a list response to those fields. The
+queryset is projected to the columns the remaining fields read, and when
+every field is a plain column the rows are built straight from
+``.values()`` without per-object serializer overhead.
+"""
+
+from datetime import date, time
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+# Serializer fields whose output is the column value (dates and times are
+# rendered as ISO strings, like DRF's defaults)
+PLAIN_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.DateField,
+    serializers.TimeField,
+    serializers.PrimaryKeyRelatedField,
+    serializers.ReadOnlyField,
+)
+
+
+def requested_fields(request):
+    """Return the field names asked for with ``?fields=``, or ``None``."""
+    if request is None or request.method != 'GET':
+        return None
+    value = request.query_params.get('fields')
+    if not value:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin dropping the fields not listed in ``context['fields']``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get('fields')
+        if not requested:
+            return
+
+        unknown = set(requested) - set(self.fields)
+        if unknown:
+            raise serializers.ValidationError(
+                {"fields": f"Unknown fields: {', '.join(sorted(unknown))}"})
+        for name in set(self.fields) - set(requested):
+            self.fields.pop(name)
+
+
+def _lookup(model, field):
+    """Model lookup path read by a serializer field, or ``None`` if unknown."""
+    parts = field.source.split('.')
+    if len(parts) > 2:
+        return None
+    current = model
+    for index, part in enumerate(parts):
+        try:
+            model_field = current._meta.get_field(part)
+        except FieldDoesNotExist:
+            return None
+        if index < len(parts) - 1:
+            if not model_field.many_to_one:
+                return None
+            current = model_field.related_model
+    return '__'.join(parts)
+
+
+def project(queryset, serializer):
+    """Load only the columns (and joins) the serializer's fields read."""
+    only, related = [], set()
+    for field in serializer.fields.values():
+        lookup = _lookup(queryset.model, field)
+        if lookup is None:
+            return queryset
+        only.append(lookup)
+        if '__' in lookup:
+            related.add(lookup.split('__')[0])
+    if related:
+        queryset = queryset.select_related(*related)
+    return queryset.only(*only)
+
+
+def _to_representation(value):
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    return value
+
+
+def fast_rows(queryset, serializer):
+    """
+    Build the rows with ``.values()`` if every field is a plain column.
+
+    Returns ``None`` when the serializer needs its full machinery.
+    """
+    lookups = []
+    for name, field in serializer.fields.items():
+        if not isinstance(field, PLAIN_FIELDS):
+            return None
+        lookup = _lookup(queryset.model, field)
+        if lookup is None:
+            return None
+        lookups.append((name, lookup))
+
+    columns = [lookup for _, lookup in lookups]
+    return [
+        {name: _to_representation(row[lookup]) for name, lookup in lookups}
+        for row in queryset.values(*columns)
+    ]
+
+
+def serialize_list(view, queryset):
+    """List response data for ``view``, honouring ``?fields=``."""
+    context = view.get_serializer_context()
+    context['fields'] = requested_fields(view.request)
+    serializer = view.get_serializer_class()(
+        queryset, many=True, context=context)
+
+    rows = fast_rows(queryset, serializer.child)
+    if rows is not None:
+        return rows
+
+    serializer.instance = project(queryset, serializer.child)
+    return serializer.data
@@ -0,0 +1,109 @@
+"""
+``Idempotency-Key`` support for POST endpoints.
+
+The first response to a key is kept in the shared store (see
+``core.shared_store``) for ``IDEMPOTENCY_KEY_TTL`` seconds, and retries
+carrying the same key get it back without the view running again, in
+whichever worker they land. Keys are scoped to the user and the endpoint.
+
+The first request holds a lock, taken with an atomic insert, until its
+response is stored. Duplicates arriving meanwhile wait for that response
+(up to ``IDEMPOTENCY_WAIT_TIMEOUT`` seconds) instead of executing
+alongside it. The lock only expires on its own, after
+``IDEMPOTENCY_LOCK_TIMEOUT`` seconds, if its holder dies.
+"""
+
+import functools
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import shared_store
+from .docs import openapi
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+
+TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)
+WAIT_TIMEOUT = getattr(settings, 'IDEMPOTENCY_WAIT_TIMEOUT', 10)
+LOCK_TIMEOUT = getattr(settings, 'IDEMPOTENCY_LOCK_TIMEOUT', 300)
+
+# For @swagger_auto_schema(manual_parameters=[...])
+header_parameter = openapi.Parameter(
+    HEADER, openapi.IN_HEADER, type=openapi.TYPE_STRING,
+    description="Unique key making retries of this request safe; a retry "
+                "returns the first response instead of repeating the operation")
+
+
+def _fingerprint(request):
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(stored):
+    response = Response(stored['data'], status=stored['status'],
+                        headers=stored['headers'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """Make a viewset method honour the ``Idempotency-Key`` header."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return Response(
+                {"error": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        user = request.user.pk if request.user.is_authenticated else 'anonymous'
+        scope = hashlib.sha256(
+            f'{user}:{request.method}:{request.path}:{key}'.encode()).hexdigest()
+        cache_key = f'idempotency:{scope}'
+        lock_key = f'{cache_key}:lock'
+        fingerprint = _fingerprint(request)
+
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        while True:
+            stored = shared_store.get(cache_key)
+            if stored is not None:
+                if stored['fingerprint'] != fingerprint:
+                    return Response(
+                        {"error": f"{HEADER} was already used for a different request."},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY
+                    )
+                return _replay(stored)
+            if shared_store.add(lock_key, True, LOCK_TIMEOUT):
+                break
+            if time.monotonic() >= deadline:
+                return Response(
+                    {"error": f"A request with this {HEADER} is still in progress."},
+                    status=status.HTTP_409_CONFLICT
+                )
+            time.sleep(POLL_INTERVAL)
+
+        try:
+            response = view_method(self, request, *args, **kwargs)
+            # Server errors aren't kept, so the client's retry can succeed
+            if response.status_code < 500:
+                shared_store.put(cache_key, {
+                    'fingerprint': fingerprint,
+                    'status': response.status_code,
+                    'data': response.data,
+                    'headers': dict(response.items()),
+                }, TTL)
+        finally:
+            shared_store.delete(lock_key)
+        return response
+
+    return wrapper
@@ -0,0 +1,37 @@
+import statistics
+
+from django.core.management.base import BaseCommand
+
+from core.startup import DEFAULT_PATH, measure
+
+METRICS = (
+    ('setup', 'django.setup()', 's'),
+    ('first_request', 'first request', 's'),
+    ('total', 'process total', 's'),
+    ('max_rss_mb', 'max RSS', 'MB'),
+)
+
+
+class Command(BaseCommand):
+    help = ("Measure worker cold start: django.setup() and a first request, "
+            "in fresh processes, for each app profile.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help="Processes started per profile.")
+        parser.add_argument('--path', default=DEFAULT_PATH,
+                            help="Path of the first request.")
+        parser.add_argument('--profile', action='append', choices=['full', 'lean'],
+                            help="App profile to measure (default: both).")
+
+    def handle(self, *args, **options):
+        for profile in options['profile'] or ['full', 'lean']:
+            results = measure(options['runs'], options['path'], profile)
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"{profile} ({len(results)} runs, {results[0]['modules']} modules, "
+                f"first request {results[0]['status']})"))
+            for key, label, unit in METRICS:
+                values = [result[key] for result in results]
+                self.stdout.write(
+                    f"  {label:<16} median {statistics.median(values):8.3f} {unit}"
+                    f"   min {min(values):8.3f}   max {max(values):8.3f}")
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.schema import code_version, write_schema
+
+
+class Command(BaseCommand):
+    help = "Generate the OpenAPI schema file served by the API root."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help="Write the schema here instead of OPENAPI_SCHEMA_FILE.")
+
+    def handle(self, *args, **options):
+        if not settings.API_DOCS:
+            # The views' schema annotations are no-ops in the lean profile
+            raise CommandError("Generate the schema with DJANGO_APP_PROFILE=full.")
+        path = write_schema(options['output'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote schema for version {code_version()} to {path}"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from core import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index from the database."
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            self.stderr.write("Full-text search needs the SQLite backend.")
+            return
+        count = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} objects"))
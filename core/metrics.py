@@ -0,0 +1,146 @@
+"""
+In-process request metrics.
+
+Histograms are kept per worker process and rendered in the Prometheus text
+exposition format by ``core.views.metrics``.
+"""
+
+import threading
+from bisect import bisect_left
+
+# Bucket upper bounds, following the Prometheus conventions (seconds/bytes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_registry = []
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for name, value in labels:
+        value = str(value).replace('\\', '\\\\').replace(
+            '"', '\\"').replace('\n', '\\n')
+        parts.append(f'{name}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class Histogram:
+    """A labelled histogram with fixed buckets."""
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> [bucket counts, sum, count]
+        self._series = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [
+                    [0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        """Return the exposition lines for this histogram."""
+        with self._lock:
+            snapshot = [(key, list(counts), total, count)
+                        for key, (counts, total, count) in self._series.items()]
+
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} histogram',
+        ]
+        for key, counts, total, count in sorted(snapshot):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += bucket_count
+                labels = _format_labels(key + (('le', bound),))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels(key)
+            lines.append(f'{self.name}_sum{labels} {total}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    """A labelled monotonic counter."""
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def collect(self):
+        """Return the exposition lines for this counter."""
+        with self._lock:
+            snapshot = sorted(self._series.items())
+        lines = [
+            f'# HELP {self.name} {self.documentation}',
+            f'# TYPE {self.name} counter',
+        ]
+        for key, value in snapshot:
+            lines.append(f'{self.name}{_format_labels(key)} {value}')
+        return lines
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+def histogram(name, documentation, buckets=LATENCY_BUCKETS):
+    """Create a histogram and register it for exposition."""
+    metric = Histogram(name, documentation, buckets)
+    _registry.append(metric)
+    return metric
+
+
+def counter(name, documentation):
+    """Create a counter and register it for exposition."""
+    metric = Counter(name, documentation)
+    _registry.append(metric)
+    return metric
+
+
+def render():
+    """Render every registered metric in Prometheus text format."""
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return '\n'.join(lines) + '\n'
+
+
+# Per-route request metrics recorded by core.middleware.PerformanceMiddleware
+request_duration = histogram(
+    'http_request_duration_seconds', 'Total time spent handling the request.')
+view_duration = histogram(
+    'http_view_duration_seconds', 'Time spent inside the view.')
+render_duration = histogram(
+    'http_render_duration_seconds', 'Time spent rendering the response body.')
+db_duration = histogram(
+    'http_db_duration_seconds', 'Time spent executing database queries.')
+db_queries = histogram(
+    'http_db_queries', 'Number of database queries per request.',
+    QUERY_COUNT_BUCKETS)
+response_size = histogram(
+    'http_response_size_bytes', 'Size of the response body.', SIZE_BUCKETS)
@@ -0,0 +1,190 @@
+import time
+from contextlib import ExitStack
+
+from django.db import connection
+from django.utils.cache import patch_vary_headers
+
+from . import compression, metrics, profiling
+
+
+class _RequestTimings:
+    """Timing data collected for a single request."""
+
+    __slots__ = ('query_count', 'query_time', 'view_start', 'view_end',
+                 'render_start', 'render_end')
+
+    def __init__(self):
+        self.query_count = 0
+        self.query_time = 0.0
+        self.view_start = None
+        self.view_end = None
+        self.render_start = None
+        self.render_end = None
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.query_time += time.perf_counter() - start
+            self.query_count += 1
+
+
+class PerformanceMiddleware:
+    """
+    Record per-route timings for every request.
+
+    Database, view and render timings are added to the response as a
+    ``Server-Timing`` header and aggregated into the histograms exposed on
+    the ``/metrics`` endpoint.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = _RequestTimings()
+        request.timings = timings
+
+        start = time.perf_counter()
+        with connection.execute_wrapper(timings.record_query):
+            response = self.get_response(request)
+        end = time.perf_counter()
+
+        self._record(request, response, timings, end - start, end)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.timings.view_start = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after this hook; time the render too
+        timings = request.timings
+        timings.view_end = timings.render_start = time.perf_counter()
+        response.add_post_render_callback(self._render_finished(timings))
+        return response
+
+    @staticmethod
+    def _render_finished(timings):
+        def callback(response):
+            timings.render_end = time.perf_counter()
+        return callback
+
+    def _record(self, request, response, timings, total, end):
+        match = getattr(request, 'resolver_match', None)
+        labels = {
+            'route': match.route if match else '<unmatched>',
+            'method': request.method,
+        }
+
+        entries = [
+            ('db', timings.query_time, f'{timings.query_count} queries')]
+
+        if timings.view_start is not None:
+            view_end = timings.view_end or end
+            view_time = view_end - timings.view_start
+            metrics.view_duration.observe(view_time, **labels)
+            entries.append(('view', view_time, None))
+
+        if timings.render_start is not None and timings.render_end is not None:
+            render_time = timings.render_end - timings.render_start
+            metrics.render_duration.observe(render_time, **labels)
+            entries.append(('render', render_time, None))
+
+        entries.append(('total', total, None))
+
+        metrics.request_duration.observe(total, **labels)
+        metrics.db_duration.observe(timings.query_time, **labels)
+        metrics.db_queries.observe(timings.query_count, **labels)
+        if not response.streaming:
+            metrics.response_size.observe(len(response.content), **labels)
+
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.2f}' +
+            (f';desc="{desc}"' if desc else '')
+            for name, duration, desc in entries
+        )
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests on demand or at random (see ``core.profiling``).
+
+    Profiling starts once the view is resolved and the user is known, and
+    covers the view and the rendering of its response. The stored
+    profile's ID is returned in the ``X-Profile-Id`` header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.profile = None
+        # Stops the profiler and query log even if the view raises
+        with ExitStack() as request.profile_stack:
+            response = self.get_response(request)
+
+        if request.profile is not None:
+            response['X-Profile-Id'] = request.profile.save(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = profiling.requested_mode(request)
+        if mode is not None and not profiling.is_allowed(request):
+            mode = None
+        if mode is None and profiling.sampled(request.resolver_match.url_name):
+            mode = profiling.MODES[0]
+        if mode is None:
+            return None
+
+        profile = profiling.Profile(mode)
+        request.profile_stack.enter_context(connection.execute_wrapper(profile.queries))
+        profile.start()
+        request.profile_stack.callback(profile.stop)
+        request.profile = profile
+        return None
+
+
+class CompressionMiddleware:
+    """
+    Compress API responses with the encoding the client prefers.
+
+    See ``core.compression``. Strong ETags are made weak, as the
+    compressed body isn't byte-for-byte the one the ETag was issued for.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not request.path.startswith(compression.PATHS):
+            return response
+
+        content_type = response.get('Content-Type', '')
+        if response.has_header('Content-Encoding') or not compression.compressible(content_type):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and len(response.content) < compression.MIN_SIZE:
+            return response
+        encoding = compression.negotiate(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+
+        etag = response.get('ETag')
+        if response.streaming:
+            live = content_type.startswith(compression.LIVE_TYPES)
+            stream = (compression.compress_async_stream if response.is_async
+                      else compression.compress_stream)
+            response.streaming_content = stream(response.streaming_content, encoding, live)
+            del response['Content-Length']
+        else:
+            response.content = compression.compress(
+                response.content, encoding, etag,
+                variant=f'{request.get_full_path()}\n{content_type}')
+            response['Content-Length'] = str(len(response.content))
+
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
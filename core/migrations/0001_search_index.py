@@ -0,0 +1,58 @@
+# Full-text search index (SQLite FTS5), see core/search.py
+
+from django.db import migrations
+
+CREATE_INDEX = """
+CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5(
+    kind UNINDEXED,
+    object_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# rowid = object ID * 4 + type code, as in core.search.KINDS
+POPULATE_INDEX = [
+    """
+    INSERT INTO search_index (rowid, kind, object_id, title, body)
+    SELECT id * 4 + 1, 'stadium', id, name, location FROM schedule_stadium
+    """,
+    """
+    INSERT INTO search_index (rowid, kind, object_id, title, body)
+    SELECT id * 4 + 2, 'department', id, name, '' FROM schedule_department
+    """,
+    """
+    INSERT INTO search_index (rowid, kind, object_id, title, body)
+    SELECT id * 4 + 3, 'user', id, username,
+           email || ' ' || first_name || ' ' || last_name
+    FROM users_user
+    """,
+]
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(CREATE_INDEX)
+    for statement in POPULATE_INDEX:
+        schema_editor.execute(statement)
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0002_department_name_index"),
+        ("users", "0003_link_department"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
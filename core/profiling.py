@@ -0,0 +1,201 @@
+"""
+On-demand profiling of individual requests.
+
+A request is profiled when a staff user (or a client presenting
+``PROFILING_TOKEN``) asks for it with the ``X-Profile`` header or the
+``_profile`` query parameter, or when it falls in the random 1-in-N sample
+configured for its route in ``PROFILING_SAMPLE_RATES``. Two modes exist:
+
+- ``sample`` (default): a background thread records the request thread's
+  stack every ``PROFILING_INTERVAL`` seconds. Overhead is low enough for
+  production; the result is written in the collapsed-stack format read by
+  flamegraph.pl, speedscope and similar tools.
+- ``cprofile``: deterministic profiling with ``cProfile``, written as a
+  ``pstats`` dump. Exact call counts, but slows the request down.
+
+Each profile is stored in ``PROFILING_DIR`` next to a JSON file describing
+the request and the SQL queries it ran. Only the newest
+``PROFILING_MAX_FILES`` profiles are kept.
+"""
+
+import cProfile
+import json
+import os
+import random
+import secrets
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+
+HEADER = 'X-Profile'
+QUERY_PARAM = '_profile'
+TOKEN_HEADER = 'X-Profile-Token'
+MODES = ('sample', 'cprofile')
+
+TOKEN = getattr(settings, 'PROFILING_TOKEN', '')
+DIRECTORY = getattr(settings, 'PROFILING_DIR', None)
+SAMPLE_RATES = getattr(settings, 'PROFILING_SAMPLE_RATES', {})
+INTERVAL = getattr(settings, 'PROFILING_INTERVAL', 0.005)
+MAX_FILES = getattr(settings, 'PROFILING_MAX_FILES', 100)
+
+_prune_lock = threading.Lock()
+
+
+def requested_mode(request):
+    """The profiling mode asked for by ``request``, or ``None``."""
+    mode = request.headers.get(HEADER) or request.GET.get(QUERY_PARAM)
+    if not mode:
+        return None
+    mode = mode.lower()
+    return mode if mode in MODES else MODES[0]
+
+
+def is_allowed(request):
+    """Whether ``request`` may ask for a profile."""
+    # Only admin accounts are staff; API users (bearer tokens) need the token
+    user = getattr(request, 'user', None)
+    if isinstance(user, get_user_model()) and user.is_active and user.is_staff:
+        return True
+    token = request.headers.get(TOKEN_HEADER)
+    return bool(TOKEN and token and secrets.compare_digest(token, TOKEN))
+
+
+def sampled(url_name):
+    """Whether to profile this request of the ``url_name`` route at random."""
+    rate = SAMPLE_RATES.get(url_name)
+    return bool(rate) and random.randrange(rate) == 0
+
+
+class StackSampler:
+    """Counts the stacks a thread is seen in, sampled from another thread."""
+
+    def __init__(self, thread_id, interval=INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name='profiling-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_qualname}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        """The samples in collapsed-stack format, one ``stack count`` per line."""
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+class QueryLog:
+    """``connection.execute_wrapper`` keeping each query's SQL and duration."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'many': many,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+class Profile:
+    """A profiling run over one request."""
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.queries = QueryLog()
+        self.started_at = timezone.now()
+        if mode == 'cprofile':
+            self._profiler = cProfile.Profile()
+        else:
+            self._profiler = StackSampler(threading.get_ident())
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self.mode == 'cprofile':
+            self._profiler.enable()
+        else:
+            self._profiler.start()
+
+    def stop(self):
+        if self.mode == 'cprofile':
+            self._profiler.disable()
+        else:
+            self._profiler.stop()
+        self.duration = time.perf_counter() - self._start
+
+    def save(self, request, response):
+        """Write the profile and its metadata to disk; returns the profile's ID."""
+        match = getattr(request, 'resolver_match', None)
+        route = match.url_name if match and match.url_name else 'unknown'
+        profile_id = (f"{self.started_at:%Y%m%dT%H%M%S}-{route}-"
+                      f"{secrets.token_hex(4)}")
+
+        os.makedirs(DIRECTORY, exist_ok=True)
+        base = os.path.join(DIRECTORY, profile_id)
+        if self.mode == 'cprofile':
+            self._profiler.dump_stats(base + '.prof')
+        else:
+            with open(base + '.collapsed', 'w') as output:
+                output.write(self._profiler.collapsed())
+
+        with open(base + '.json', 'w') as output:
+            json.dump({
+                'id': profile_id,
+                'mode': self.mode,
+                'started_at': self.started_at.isoformat(),
+                'method': request.method,
+                'path': request.get_full_path(),
+                'route': route,
+                'status': response.status_code,
+                'duration_ms': round(self.duration * 1000, 3),
+                'query_count': len(self.queries.queries),
+                'query_time_ms': round(
+                    sum(query['duration_ms'] for query in self.queries.queries), 3),
+                'queries': self.queries.queries,
+            }, output, indent=2)
+
+        prune()
+        return profile_id
+
+
+def prune():
+    """Delete all but the newest ``MAX_FILES`` profiles."""
+    with _prune_lock:
+        try:
+            entries = [entry for entry in os.scandir(DIRECTORY) if entry.name.endswith('.json')]
+        except FileNotFoundError:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:-MAX_FILES]:
+            stem = entry.name[:-len('.json')]
+            for extension in ('.json', '.collapsed', '.prof'):
+                try:
+                    os.remove(os.path.join(DIRECTORY, stem + extension))
+                except FileNotFoundError:
+                    pass
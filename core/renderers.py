@@ -0,0 +1,57 @@
+"""
+Compact renderers for large list responses.
+
+Clients opt in with the ``Accept`` header or ``?format=``.
+"""
+
+import json
+
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+
+class ColumnarJSONRenderer(BaseRenderer):
+    """
+    Render a list of objects as ``{"columns": [...], "rows": [[...], ...]}``.
+
+    Field names are sent once instead of per row. Anything other than a
+    list of objects is rendered as plain JSON.
+    """
+    media_type = 'application/vnd.columnar+json'
+    format = 'columnar'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, list) and data and all(isinstance(row, dict) for row in data):
+            columns = list(data[0])
+            data = {
+                'columns': columns,
+                'rows': [[row.get(column) for column in columns] for row in data],
+            }
+        return json.dumps(data, cls=JSONEncoder, separators=(',', ':'),
+                          ensure_ascii=False).encode('utf-8')
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render responses as MessagePack."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Round-trip through the JSON encoder for dates, decimals, etc.
+        return msgpack.packb(json.loads(json.dumps(data, cls=JSONEncoder)))
+
+
+# Renderers offered by list endpoints in addition to the defaults
+COMPACT_RENDERERS = [ColumnarJSONRenderer]
+if msgpack is not None:
+    COMPACT_RENDERERS.append(MessagePackRenderer)
@@ -0,0 +1,114 @@
+"""
+Response cache shared by the worker processes of a host.
+
+Entries are kept in the shared store (see ``core.shared_store``), so a
+response computed by one worker is served by all of them. Each entry is
+stored with the versions its tags had when it was computed; invalidating
+a tag turns every entry recorded under an older version into a miss in
+every worker at once, without having to find and delete the entries.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import sqlite3
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import metrics, shared_store
+
+logger = logging.getLogger(__name__)
+
+TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+requests_total = metrics.counter(
+    'response_cache_requests_total', 'Shared response cache lookups by result.')
+
+
+def invalidate(tags):
+    """Expire every entry tagged with any of ``tags`` once the transaction commits."""
+    shared_store.invalidate(tags)
+
+
+def etag_matches(request, etag):
+    """Whether ``request``'s ``If-None-Match`` lists ``etag`` (weak comparison)."""
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    etags = parse_etags(header)
+    if etags == ['*']:
+        return True
+    # Compression weakens ETags (W/"..."); a weak match is enough for GET
+    return etag.removeprefix('W/') in {value.removeprefix('W/') for value in etags}
+
+
+def _cache_key(request):
+    query = urlencode(sorted(request.GET.lists()), doseq=True)
+    return f'response:{request.scheme}://{request.get_host()}{request.path}?{query}'
+
+
+def _etag(key, tag_versions):
+    # Changes exactly when one of the entry's tags is invalidated
+    state = f'{shared_store.generation()}\n{key}\n{json.dumps(tag_versions)}'
+    return '"%s"' % hashlib.sha1(state.encode()).hexdigest()[:16]
+
+
+def cached(tags):
+    """
+    Serve a viewset method's successful GET responses from the shared cache.
+
+    ``tags(request, *args, **kwargs)`` returns the tags of the response's
+    data, or ``None`` when the response shouldn't be cached. The data is
+    cached, not the rendered body, so content negotiation still applies.
+
+    Responses carry an ``ETag`` derived from their tags' versions, and a
+    matching ``If-None-Match`` gets a 304 without computing the response.
+    """
+
+    def decorator(view_method):
+        @functools.wraps(view_method)
+        def wrapper(self, request, *args, **kwargs):
+            response_tags = tags(request, *args, **kwargs) if TIMEOUT else None
+            if not response_tags:
+                return view_method(self, request, *args, **kwargs)
+
+            match = request.resolver_match
+            route = match.url_name if match else view_method.__name__
+            key = _cache_key(request)
+            try:
+                entry = shared_store.get(key)
+                if entry is None:
+                    tag_versions = shared_store.versions(response_tags)
+                    etag = _etag(key, tag_versions)
+                else:
+                    data, etag = entry
+            except sqlite3.Error:
+                logger.exception("Response cache lookup failed")
+                return view_method(self, request, *args, **kwargs)
+
+            if etag_matches(request, etag):
+                requests_total.inc(route=route, result='hit')
+                return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            if entry is not None:
+                requests_total.inc(route=route, result='hit')
+                return Response(data, headers={'ETag': etag, 'X-Cache': 'hit'})
+
+            requests_total.inc(route=route, result='miss')
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code == 200 and hasattr(response, 'data'):
+                try:
+                    shared_store.put(key, (response.data, etag), TIMEOUT, tag_versions)
+                except sqlite3.Error:
+                    logger.exception("Could not store a response cache entry")
+                response['ETag'] = etag
+                response['X-Cache'] = 'miss'
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,105 @@
+"""
+Prebuilt OpenAPI schema.
+
+Generating the schema introspects every viewset and serializer, so it is
+built once per code version, written to ``settings.OPENAPI_SCHEMA_FILE``
+and served from memory afterwards.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson
+from drf_yasg.generators import OpenAPISchemaGenerator
+
+API_INFO = openapi.Info(
+    title="Master <Coding> API",
+    default_version='v1',
+    description="API documentation for My Project",
+)
+
+# Packages whose source determines the schema
+SOURCE_PACKAGES = ('core', 'schedule', 'users')
+
+_lock = threading.Lock()
+_cached = None
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """Return the deployed code version, hashing the sources if unset."""
+    version = os.environ.get('CODE_VERSION')
+    if version:
+        return version
+
+    digest = hashlib.sha1()
+    for package in SOURCE_PACKAGES:
+        for path in sorted((settings.BASE_DIR / package).rglob('*.py')):
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:12]
+
+
+def build_schema(version):
+    """Generate the schema for every public endpoint."""
+    generator = OpenAPISchemaGenerator(API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    schema['x-code-version'] = version
+    return OpenAPICodecJson(validators=[]).encode(schema)
+
+
+def write_schema(path=None):
+    """Generate the schema and write it to disk. Returns the path."""
+    path = path or settings.OPENAPI_SCHEMA_FILE
+    _write(path, build_schema(code_version()))
+    return path
+
+
+def _write(path, body):
+    with open(path, 'wb') as schema_file:
+        schema_file.write(body)
+
+
+def _load_schema(path, version):
+    try:
+        with open(path, 'rb') as schema_file:
+            body = schema_file.read()
+        if json.loads(body).get('x-code-version') == version:
+            return body
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def get_schema():
+    """
+    Return the ``(body, etag)`` pair for the current code version.
+
+    The schema file is reused when it was built for this version, otherwise
+    it is regenerated once and rewritten.
+    """
+    global _cached
+    cached = _cached
+    if cached is not None:
+        return cached
+
+    with _lock:
+        if _cached is None:
+            version = code_version()
+            path = settings.OPENAPI_SCHEMA_FILE
+            body = _load_schema(path, version)
+            if body is None:
+                body = build_schema(version)
+                try:
+                    _write(path, body)
+                except OSError:
+                    # Read-only deployments still serve from memory
+                    pass
+            etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+            _cached = (body, etag)
+        return _cached
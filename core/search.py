@@ -0,0 +1,160 @@
+"""
+Full-text search across stadiums, departments and users.
+
+Searchable text is kept in the ``search_index`` SQLite FTS5 table, which is
+created by ``core`` migration 0001 and kept in sync by the signal handlers
+below. Writes that skip the signals (``bulk_create``, ``QuerySet.update``)
+of searchable fields must index their rows with ``index_objects``, as the
+user importer does. Each row's rowid encodes the object type and ID so
+that updates and deletes touch a single row.
+"""
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+from django.db.models.signals import post_delete, post_save
+
+TABLE = 'search_index'
+
+# type name -> (rowid code, model label, title field, body fields)
+KINDS = {
+    'stadium': (1, 'schedule.Stadium', 'name', ('location',)),
+    'department': (2, 'schedule.Department', 'name', ()),
+    'user': (3, 'users.User', 'username', ('email', 'first_name', 'last_name')),
+}
+KIND_COUNT = 4
+
+# Rows per statement when indexing in bulk (5 parameters per row, well
+# under SQLite's variable limit)
+BATCH_SIZE = 1000
+
+
+def is_available():
+    return connection.vendor == 'sqlite'
+
+
+def _rowid(kind, object_id):
+    return object_id * KIND_COUNT + KINDS[kind][0]
+
+
+def _document(kind, obj):
+    _, _, title_field, body_fields = KINDS[kind]
+    body = ' '.join(str(getattr(obj, field) or '') for field in body_fields)
+    return getattr(obj, title_field), body
+
+
+def index_objects(kind, objects):
+    """Add or refresh the index rows for ``objects``."""
+    if not is_available():
+        return
+    rows = [
+        (_rowid(kind, obj.pk), kind, obj.pk, *_document(kind, obj))
+        for obj in objects
+    ]
+    # Multi-row statements rather than executemany(), which the debug
+    # toolbar's SQL panel can't record
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            cursor.execute(
+                f'DELETE FROM {TABLE} WHERE rowid IN (%s)' % ', '.join(['%s'] * len(batch)),
+                [row[0] for row in batch])
+            cursor.execute(
+                f'INSERT INTO {TABLE} (rowid, kind, object_id, title, body) VALUES ' +
+                ', '.join(['(%s, %s, %s, %s, %s)'] * len(batch)),
+                [value for row in batch for value in row])
+
+
+def remove_object(kind, object_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s',
+                       [_rowid(kind, object_id)])
+
+
+def rebuild():
+    """Re-index every searchable object. Returns the number of rows."""
+    from django.apps import apps
+
+    if not is_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+    total = 0
+    for kind, (_, label, _, _) in KINDS.items():
+        objects = apps.get_model(label).objects.all()
+        batch = []
+        for obj in objects.iterator(chunk_size=BATCH_SIZE):
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                index_objects(kind, batch)
+                batch = []
+        index_objects(kind, batch)
+        total += objects.count()
+    return total
+
+
+def build_query(text):
+    """
+    Turn free text into an FTS5 query.
+
+    Every word must match, and the last token of each word is matched as a
+    prefix, so ``"sta ce"`` finds "Stadium Central".
+    """
+    terms = ['"%s"*' % word.replace('"', '""') for word in text.split()]
+    return ' AND '.join(terms)
+
+
+def search(text, kinds=None, limit=20):
+    """Return ranked ``{"type", "id", "title", "subtitle", "rank"}`` results."""
+    query = build_query(text)
+    if not query or not is_available():
+        return []
+
+    sql = (f'SELECT kind, object_id, title, body, '
+           f'bm25({TABLE}, 0, 0, 10.0, 1.0) AS score '
+           f'FROM {TABLE} WHERE {TABLE} MATCH %s')
+    params = [query]
+    if kinds:
+        sql += ' AND kind IN (%s)' % ', '.join(['%s'] * len(kinds))
+        params.extend(kinds)
+    sql += ' ORDER BY score LIMIT %s'
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [
+            {'type': kind, 'id': object_id, 'title': title,
+             'subtitle': body, 'rank': -score}
+            for kind, object_id, title, body, score in cursor.fetchall()
+        ]
+
+
+def matching_ids(kind, text):
+    """Subquery of the IDs of ``kind`` objects matching ``text``."""
+    return RawSQL(
+        f'SELECT object_id FROM {TABLE} WHERE {TABLE} MATCH %s AND kind = %s',
+        (build_query(text), kind))
+
+
+def _indexer(kind):
+    def handler(sender, instance, **kwargs):
+        index_objects(kind, [instance])
+    return handler
+
+
+def _remover(kind):
+    def handler(sender, instance, **kwargs):
+        remove_object(kind, instance.pk)
+    return handler
+
+
+def connect_signals():
+    from django.apps import apps
+
+    for kind, (_, label, _, _) in KINDS.items():
+        model = apps.get_model(label)
+        post_save.connect(_indexer(kind), sender=model,
+                          weak=False, dispatch_uid=f'search-index-{kind}')
+        post_delete.connect(_remover(kind), sender=model,
+                            weak=False, dispatch_uid=f'search-remove-{kind}')
@@ -0,0 +1,16 @@
+from rest_framework import serializers
+
+from . import batch
+
+
+class BatchItemSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(
+        choices=['GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField(max_length=2000)
+    headers = serializers.DictField(child=serializers.CharField(), required=False)
+    body = serializers.JSONField(required=False, allow_null=True)
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = BatchItemSerializer(many=True, allow_empty=False,
+                                   max_length=batch.MAX_REQUESTS)
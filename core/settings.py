@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -23,7 +25,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = "django-insecure-^g*y10od)ui2k76dmvj)#&g&m#d=(^#2o@+&l1@b(cr+60x*2+"
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# Off unless DJANGO_DEBUG=True is set, e.g. for local development
+DEBUG = os.environ.get('DJANGO_DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = ['*']
 
@@ -32,6 +35,15 @@ INTERNAL_IPS = [
     "127.0.0.1",
     # ...
 ]
+# App profile: "full" (the default) or "lean". The lean profile, meant for
+# API workers, leaves out the API docs, the admin theme and the debug
+# toolbar, which add to every worker's startup time and memory.
+APP_PROFILE = os.environ.get('DJANGO_APP_PROFILE', 'full')
+LEAN = APP_PROFILE == 'lean'
+
+# Swagger UI and the OpenAPI schema on "/"; loaded on first use
+API_DOCS = not LEAN
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -47,17 +59,28 @@ INSTALLED_APPS = [
     "django.contrib.staticfiles",
     'corsheaders',
     # Third-party apps
-    "debug_toolbar",
     'rest_framework',
-    'rest_framework_swagger',  # Swagger
     'drf_yasg',                # Yet Another Swagger generator
     # Local apps
     # .....
+    "core",
     "schedule",
     "users",
 ]
 
+if LEAN:
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in ("semantic_admin", "semantic_forms", "drf_yasg")
+    ]
+
 MIDDLEWARE = [
+    # Negotiated compression of API responses (see core/compression.py)
+    "core.middleware.CompressionMiddleware",
+    # Per-request timings (Server-Timing header and /metrics)
+    "core.middleware.PerformanceMiddleware",
+    # On-demand profiling of single requests (see core/profiling.py)
+    "core.middleware.ProfilingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -66,10 +89,14 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     # Third-party middleware
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.common.CommonMiddleware',
 ]
+
+# The debug toolbar is only loaded in development
+if DEBUG and not LEAN:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.append("debug_toolbar.middleware.DebugToolbarMiddleware")
 CORS_ALLOW_CREDENTIALS = True
 
 CORS_ALLOW_ALL_ORIGINS = True
@@ -105,6 +132,127 @@ DATABASES = {
 }
 
 
+# Django REST framework
+# Requests are authenticated with signed tokens issued by `users` login
+
+REST_FRAMEWORK = {
+    "DEFAULT_AUTHENTICATION_CLASSES": [
+        "users.authentication.UserTokenAuthentication",
+        "rest_framework.authentication.SessionAuthentication",
+    ],
+}
+
+SIMPLE_JWT = {
+    "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
+    "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
+    "AUTH_HEADER_TYPES": ("Bearer",),
+}
+
+# Decoded tokens kept per process, and how often (in seconds) revoked
+# tokens are synced from the database
+TOKEN_CACHE_SIZE = 1024
+TOKEN_REVOCATION_SYNC_INTERVAL = 30
+
+
+# Seconds a cached department timetable (/api/users/me/schedule/) is kept in
+# the shared store. Entries are invalidated by version on every booking change.
+MY_SCHEDULE_CACHE_TIMEOUT = 60
+
+# Seconds a cached stadium day board (/api/schedule/stadiums/board/) is kept
+# in the shared store
+STADIUM_BOARD_CACHE_TIMEOUT = 60
+
+# State every worker on the host must agree on (see core/shared_store.py):
+# a SQLite file they all open. Without a path, or with an in-memory
+# database, each process keeps its own store in memory.
+SHARED_STORE_PATH = os.environ.get(
+    'DJANGO_SHARED_STORE_PATH', str(BASE_DIR / "cache" / "shared.sqlite3"))
+
+# Seconds a response of the shared response cache (core/response_cache.py)
+# is kept at most; writes invalidate entries earlier by tag. 0 turns the
+# cache off.
+RESPONSE_CACHE_TIMEOUT = 300
+
+# Responses compressed with the client's preferred encoding (zstd and
+# brotli when installed, gzip otherwise): the URL prefixes covered, the
+# smallest body worth compressing in bytes, and the seconds the
+# compressed body of an ETag-versioned response is cached
+COMPRESSION_PATHS = ['/api/schedule/', '/api/users/']
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_CACHE_TIMEOUT = 300
+
+# /metrics is served to these client addresses, and to scrapers sending
+# METRICS_TOKEN (env DJANGO_METRICS_TOKEN) as "Authorization: Bearer ..."
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = os.environ.get('DJANGO_METRICS_TOKEN', '')
+
+# /api/batch/: most sub-requests per batch, and threads running reads
+BATCH_MAX_REQUESTS = 20
+BATCH_WORKERS = 4
+
+# Idempotency-Key support: seconds a response is kept for replays, the
+# longest a duplicate waits for the original request to finish, and when
+# the original's lock expires should its worker die (longer than any
+# request may run)
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+IDEMPOTENCY_WAIT_TIMEOUT = 10
+IDEMPOTENCY_LOCK_TIMEOUT = 300
+
+# Resumable image uploads (/api/schedule/uploads/): largest accepted file,
+# and where partially received files are kept
+IMAGE_UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_TEMP_DIR = BASE_DIR / "uploads"
+
+# Background threads resizing uploaded stadium and team images
+IMAGE_RENDITION_WORKERS = 2
+
+# Background threads running schedule imports uploaded to the API
+SCHEDULE_IMPORT_WORKERS = 2
+
+# Schedules older than this many days are moved to the archive table by
+# `manage.py archive_schedules`
+SCHEDULE_ARCHIVE_AFTER_DAYS = 365
+
+# Change feed SSE stream: seconds between polls for new changes, and
+# between heartbeats on an idle stream
+CHANGE_STREAM_POLL_INTERVAL = 1
+CHANGE_STREAM_HEARTBEAT = 15
+# Under WSGI a stream holds a worker thread: seconds before it is closed
+# (clients reconnect from the last event they received)
+CHANGE_STREAM_WSGI_DURATION = 60
+
+# Request profiling: staff users, or clients sending this token in
+# X-Profile-Token, can profile a request with X-Profile: sample|cprofile.
+# PROFILING_SAMPLE_RATES profiles 1 in N requests of a route by URL name,
+# e.g. {"available-slots": 1000}. Profiles are written to PROFILING_DIR,
+# keeping the newest PROFILING_MAX_FILES.
+PROFILING_TOKEN = os.environ.get('DJANGO_PROFILING_TOKEN', '')
+PROFILING_SAMPLE_RATES = {}
+PROFILING_INTERVAL = 0.005
+PROFILING_DIR = BASE_DIR / "profiles"
+PROFILING_MAX_FILES = 100
+
+# Cold-start budget of a lean worker, checked by core.tests: seconds for
+# django.setup() plus the first request, and peak resident memory.
+# `manage.py benchmark_startup` reports the current figures.
+STARTUP_TIME_BUDGET = 1.5
+STARTUP_RSS_BUDGET_MB = 96
+
+# Password hashing runs on a bounded thread pool (see users/hashing.py)
+PASSWORD_HASHING_WORKERS = 4
+PASSWORD_HASHING_QUEUE = 32
+
+# Processes hashing the passwords of imported users (see users/importer.py),
+# shared by every import a worker runs
+USER_IMPORT_WORKERS = os.cpu_count()
+
+# Login token buckets: (burst size, tokens refilled per second)
+LOGIN_THROTTLE_RATES = {
+    "ip": (20, 1.0),
+    "username": (5, 0.2),
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -141,6 +289,9 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Prebuilt OpenAPI schema (see `manage.py generate_schema`)
+OPENAPI_SCHEMA_FILE = BASE_DIR / "openapi.json"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
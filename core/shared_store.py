@@ -0,0 +1,192 @@
+"""
+State shared by the worker processes of a host.
+
+Caches, version counters and locks kept in the Django cache (a LocMem
+cache, private to each process) don't reach the other workers, so
+anything that must agree across workers is kept here instead: a SQLite
+file (``SHARED_STORE_PATH``) that every worker opens. It holds
+
+- expiring key/value entries (``get``, ``put``, ``add``, ``delete``);
+- tag versions (``versions``, ``version_token``, ``invalidate``). An
+  entry can be stored with the versions its tags had when it was
+  computed; invalidating a tag bumps its version, which turns every entry
+  recorded under an older version into a miss in every worker at once.
+
+Keys and tags are namespaced by database. When the database is in memory
+(as under the test runner) no other process can see it, and the store is
+kept in memory too. The store's generation, drawn when it is created, is
+part of every version token, so versions starting over in a new store
+can't repeat an old token.
+"""
+
+import json
+import logging
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+PATH = getattr(settings, 'SHARED_STORE_PATH', None)
+# Chance that writing an entry also deletes the expired ones
+PURGE_PROBABILITY = 0.01
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    tags TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+INSERT OR IGNORE INTO meta (name, value) VALUES ('generation', lower(hex(randomblob(4))));
+"""
+
+# Fresh when unexpired and none of its tags moved past the stored version
+GET_SQL = """
+SELECT value FROM entries AS entry
+WHERE key = ? AND expires > ? AND NOT EXISTS (
+    SELECT 1 FROM json_each(entry.tags) AS stored
+    LEFT JOIN tags ON tags.tag = stored.key
+    WHERE COALESCE(tags.version, 0) != stored.value
+)
+"""
+
+# Inserts unless a live entry holds the key
+ADD_SQL = """
+INSERT INTO entries (key, tags, value, expires) VALUES (?, '{}', ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    tags = excluded.tags, value = excluded.value, expires = excluded.expires
+WHERE entries.expires <= ?
+"""
+
+_local = threading.local()
+
+
+def _location():
+    if PATH and not getattr(connection, 'is_in_memory_db', lambda: False)():
+        os.makedirs(os.path.dirname(PATH), exist_ok=True)
+        return PATH, False
+    # Shared by the threads of this process for as long as one of them
+    # keeps its connection open
+    return f'file:shared-store-{os.getpid()}?mode=memory&cache=shared', True
+
+
+def _connection():
+    # One connection per thread, reopened in forked workers
+    conn = getattr(_local, 'connection', None)
+    if conn is None or _local.pid != os.getpid():
+        location, uri = _location()
+        conn = sqlite3.connect(location, timeout=5, isolation_level=None, uri=uri)
+        if not uri:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(SCHEMA)
+        _local.connection, _local.pid = conn, os.getpid()
+    return conn
+
+
+def _namespaced(name):
+    return f"{connection.settings_dict['NAME']}:{name}"
+
+
+def get(key, default=None):
+    """The value stored under ``key``, or ``default`` if missing, expired or stale."""
+    row = _connection().execute(GET_SQL, (_namespaced(key), time.time())).fetchone()
+    return default if row is None else pickle.loads(row[0])
+
+
+def put(key, value, timeout, tag_versions=None):
+    """
+    Store ``value`` under ``key`` for ``timeout`` seconds.
+
+    With ``tag_versions`` (from ``versions``), the entry goes stale as soon
+    as one of those tags is invalidated.
+    """
+    conn = _connection()
+    now = time.time()
+    conn.execute(
+        "INSERT OR REPLACE INTO entries (key, tags, value, expires) VALUES (?, ?, ?, ?)",
+        (_namespaced(key), json.dumps(tag_versions or {}), pickle.dumps(value), now + timeout))
+    if random.random() < PURGE_PROBABILITY:
+        conn.execute("DELETE FROM entries WHERE expires <= ?", (now,))
+
+
+def add(key, value, timeout):
+    """Store ``value`` unless ``key`` holds an unexpired entry; whether it did."""
+    now = time.time()
+    cursor = _connection().execute(
+        ADD_SQL, (_namespaced(key), pickle.dumps(value), now + timeout, now))
+    return cursor.rowcount == 1
+
+
+def delete(key):
+    _connection().execute("DELETE FROM entries WHERE key = ?", (_namespaced(key),))
+
+
+def versions(tags):
+    """
+    Current versions of ``tags``, to store with a value computed from now on.
+
+    Read before computing the value, so an invalidation racing with the
+    computation leaves the entry stale rather than wrongly fresh.
+    """
+    names = [_namespaced(tag) for tag in tags]
+    current = dict(_connection().execute(
+        f"SELECT tag, version FROM tags WHERE tag IN ({', '.join('?' * len(names))})",
+        names).fetchall())
+    return {name: current.get(name, 0) for name in names}
+
+
+def generation():
+    return _connection().execute(
+        "SELECT value FROM meta WHERE name = 'generation'").fetchone()[0]
+
+
+def version_token(tags):
+    """A string that changes whenever one of ``tags`` is invalidated."""
+    return f"{generation()}-{'.'.join(str(v) for v in versions(tags).values())}"
+
+
+def bump(tags):
+    """Invalidate ``tags`` right away."""
+    try:
+        _connection().executemany(
+            "INSERT INTO tags (tag, version) VALUES (?, 1) "
+            "ON CONFLICT (tag) DO UPDATE SET version = version + 1",
+            [(_namespaced(tag),) for tag in tags])
+    except sqlite3.Error:
+        # Tagged entries still expire on their own
+        logger.exception("Could not invalidate shared store tags %s", tags)
+
+
+def invalidate(tags):
+    """
+    Invalidate ``tags`` in every worker once the current transaction commits.
+
+    Waiting for the commit means no worker can store the data as it was
+    before the change under the new versions.
+    """
+    tags = list(tags)
+    transaction.on_commit(lambda: bump(tags))
+
+
+def clear():
+    """Drop every entry and tag version, and start a new generation."""
+    conn = _connection()
+    conn.execute("DELETE FROM entries")
+    conn.execute("DELETE FROM tags")
+    conn.execute("UPDATE meta SET value = lower(hex(randomblob(4))) WHERE name = 'generation'")
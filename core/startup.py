@@ -0,0 +1,96 @@
+"""
+Worker startup measurement.
+
+``python -m core.startup [path]`` times ``django.setup()`` and a first
+request to ``path`` (through the WSGI handler, as a worker would serve it)
+in a fresh interpreter and prints the results as JSON. ``measure`` runs it
+in subprocesses so every run starts cold.
+"""
+
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+DEFAULT_PATH = '/health'
+
+
+def _first_request(application, path):
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': path, 'REQUEST_METHOD': 'GET'}
+    setup_testing_defaults(environ)
+    statuses = []
+    body = b''.join(application(environ, lambda status, headers: statuses.append(status)))
+    return statuses[0], body
+
+
+def _max_rss_mb():
+    # ru_maxrss survives exec on Linux, so it would report the parent's
+    # peak when that was higher; VmHWM belongs to this process alone
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # Kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def main(path=DEFAULT_PATH):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+    start = time.perf_counter()
+    import django
+    django.setup()
+    setup_done = time.perf_counter()
+
+    from django.core.wsgi import get_wsgi_application
+    status, _ = _first_request(get_wsgi_application(), path)
+    request_done = time.perf_counter()
+
+    print(json.dumps({
+        'setup': setup_done - start,
+        'first_request': request_done - setup_done,
+        'status': status,
+        'max_rss_mb': _max_rss_mb(),
+        'modules': len(sys.modules),
+        'packages': sorted({
+            name.partition('.')[0] for name, module in sys.modules.items()
+            if module is not None
+        }),
+    }))
+
+
+def measure(runs=5, path=DEFAULT_PATH, profile=None):
+    """
+    Start ``runs`` fresh processes and return their measurements.
+
+    Each run also reports its ``total`` wall time, interpreter start
+    included. ``profile`` overrides ``DJANGO_APP_PROFILE``.
+    """
+    from django.conf import settings
+
+    env = dict(os.environ)
+    if profile:
+        env['DJANGO_APP_PROFILE'] = profile
+
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run(
+            [sys.executable, '-m', 'core.startup', path],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['total'] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
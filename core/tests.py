@@ -0,0 +1,633 @@
+import gzip
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time as clock
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import connection
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+
+from schedule.models import Department, Schedule, Stadium, checks
+from users.importer import UserImporter
+from users.models import User
+from users.tests import bearer
+
+from . import (
+    batch, compression, idempotency, metrics, profiling, response_cache, search, shared_store,
+)
+from .renderers import ColumnarJSONRenderer, msgpack
+from .middleware import CompressionMiddleware
+from .startup import measure
+
+# Loaded only by the full app profile
+DOCS_AND_DEBUG_PACKAGES = {'debug_toolbar', 'drf_yasg', 'semantic_admin', 'semantic_forms'}
+
+
+class LeanStartupTests(SimpleTestCase):
+    """A lean worker must leave out the docs and debug apps."""
+
+    def test_docs_and_debug_apps_not_loaded(self):
+        for result in measure(runs=1, profile='lean'):
+            self.assertEqual(result['status'], '200 OK')
+            self.assertFalse(DOCS_AND_DEBUG_PACKAGES & set(result['packages']))
+
+
+@skipUnless(os.environ.get('DJANGO_STARTUP_BENCHMARKS') == 'True',
+            "Timings depend on the machine; set DJANGO_STARTUP_BENCHMARKS=True to run")
+class StartupBudgetTests(SimpleTestCase):
+    """
+    A lean worker must start within the import-time and memory budgets.
+
+    Other load on the machine only ever adds to a run, so the best run is judged.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.results = measure(runs=3, profile='lean')
+
+    def test_startup_time(self):
+        seconds = min(result['setup'] + result['first_request'] for result in self.results)
+        self.assertLessEqual(
+            seconds, settings.STARTUP_TIME_BUDGET,
+            f"django.setup() and the first request took {seconds:.3f}s")
+
+    def test_resident_memory(self):
+        rss = min(result['max_rss_mb'] for result in self.results)
+        self.assertLessEqual(
+            rss, settings.STARTUP_RSS_BUDGET_MB, f"Peak resident memory was {rss:.1f} MB")
+
+
+class SharedStoreFixture:
+    """
+    Runs each test against a fresh store in a file, as workers use it, with
+    a stadium and a department to book.
+    """
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'shared.sqlite3')
+        for patcher in (mock.patch.object(shared_store, '_location', lambda: (path, False)),
+                        mock.patch.object(shared_store, '_local', threading.local())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.stadium = Stadium.objects.create(name='North', capacity=10)
+        self.department = Department.objects.create(name='Alpha')
+
+
+class SharedStoreTestCase(SharedStoreFixture, TestCase):
+    """``SharedStoreFixture`` for tests that run inside a transaction."""
+
+
+class ResponseCacheTests(SharedStoreTestCase):
+    url = '/api/schedule/schedules/?date=2030-01-07'
+
+    def book(self, start_time):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Schedule.objects.create(
+                department=self.department, stadium=self.stadium, date=date(2030, 1, 7),
+                start_time=start_time, end_time=time(start_time.hour + 1))
+
+    def test_hit_after_miss(self):
+        self.book(time(10))
+        first = self.client.get(self.url)
+        second = self.client.get(self.url)
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('miss', 'hit'))
+        self.assertEqual(first.json(), second.json())
+        self.assertEqual(first['ETag'], second['ETag'])
+
+    def test_write_invalidates(self):
+        self.book(time(10))
+        etag = self.client.get(self.url)['ETag']
+        self.book(time(12))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual(len(response.json()), 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unrelated_write_keeps_entry(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            Schedule.objects.create(
+                department=self.department, stadium=self.stadium, date=date(2030, 2, 1),
+                start_time=time(10), end_time=time(11))
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'hit')
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_etag_matching(self):
+        def matches(header, etag='"abc"'):
+            request = RequestFactory().get('/', HTTP_IF_NONE_MATCH=header)
+            return response_cache.etag_matches(request, etag)
+
+        self.assertTrue(matches('"abc"'))
+        self.assertTrue(matches('"x", W/"abc"'))
+        self.assertTrue(matches('*'))
+        self.assertTrue(matches('"abc"', etag='W/"abc"'))
+        self.assertFalse(matches('"abcd"'))
+        self.assertFalse(matches('"x-"abc""'))
+        self.assertFalse(matches(''))
+
+    def test_etag_stable_until_invalidated(self):
+        etag = self.client.get(self.url)['ETag']
+        shared_store.delete('response:http://testserver' + self.url)
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_invalidation_from_another_worker(self):
+        self.client.get(self.url)
+        # A thread has its own connection to the store, like another process
+        worker = threading.Thread(target=shared_store.bump, args=(['schedules:date:2030-01-07'],))
+        worker.start()
+        worker.join()
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'miss')
+
+
+class IdempotencyTests(SharedStoreTestCase):
+    url = '/api/schedule/schedules/'
+
+    def setUp(self):
+        super().setUp()
+        self.booking = {'department': self.department.pk, 'stadium': self.stadium.pk,
+                        'date': '2030-01-07', 'start_time': '10:00', 'end_time': '11:00'}
+
+    def post(self, data, key='key-1'):
+        return self.client.post(self.url, data, HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_replay(self):
+        first = self.post(self.booking)
+        retry = self.post(self.booking)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json(), first.json())
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_replay_from_another_worker(self):
+        self.post(self.booking)
+        # A fresh connection to the store, as another worker process has
+        with mock.patch.object(shared_store, '_local', threading.local()):
+            retry = self.post(self.booking)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_different_body(self):
+        self.post(self.booking)
+        response = self.post(dict(self.booking, start_time='12:00', end_time='13:00'))
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_other_key_runs(self):
+        self.post(self.booking)
+        response = self.post(dict(self.booking, start_time='12:00', end_time='13:00'), 'key-2')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Schedule.objects.count(), 2)
+
+    def post_duplicate_while_running(self, delay=0):
+        """Send a duplicate while the original request is in its view."""
+        duplicates = []
+
+        def during_original(*args):
+            if not duplicates:
+                clock.sleep(delay)
+                duplicates.append(self.post(self.booking))
+            return None
+
+        with mock.patch('schedule.views.hours_error', during_original), \
+                mock.patch.object(idempotency, 'WAIT_TIMEOUT', 0.05):
+            original = self.post(self.booking)
+        return original, duplicates[0]
+
+    def test_concurrent_duplicate(self):
+        original, duplicate = self.post_duplicate_while_running()
+        self.assertEqual(original.status_code, 201)
+        self.assertEqual(duplicate.status_code, 409)
+        self.assertEqual(Schedule.objects.count(), 1)
+        # Once the original is done, the duplicate's retry gets its response
+        self.assertEqual(self.post(self.booking)['Idempotent-Replayed'], 'true')
+
+    def test_lock_outlives_wait_timeout(self):
+        # The original runs longer than duplicates wait; its lock must hold
+        original, duplicate = self.post_duplicate_while_running(delay=0.2)
+        self.assertEqual(duplicate.status_code, 409)
+        self.assertEqual(Schedule.objects.count(), 1)
+
+
+class NegotiationTests(SimpleTestCase):
+    def test_negotiate(self):
+        with mock.patch.dict(compression.ENCODINGS, {'br': None, 'gzip': None}, clear=True):
+            self.assertEqual(compression.negotiate('gzip, deflate, br'), 'br')
+            self.assertEqual(compression.negotiate('br;q=0.5, gzip'), 'gzip')
+            self.assertEqual(compression.negotiate('br;q=0, gzip;q=0.1'), 'gzip')
+            self.assertEqual(compression.negotiate('*'), 'br')
+            self.assertEqual(compression.negotiate('*, br;q=0'), 'gzip')
+            self.assertIsNone(compression.negotiate('identity'))
+            self.assertIsNone(compression.negotiate('deflate, zstd'))
+            self.assertIsNone(compression.negotiate(''))
+
+
+class CompressionTests(TestCase):
+    list_url = '/api/schedule/schedules/'
+    board_url = '/api/schedule/stadiums/board/?date=2030-01-07'
+
+    def setUp(self):
+        shared_store.clear()
+        department = Department.objects.create(name='Alpha')
+        self.stadiums = [Stadium.objects.create(name=f'Stadium {i}', capacity=10)
+                         for i in range(5)]
+        for stadium in self.stadiums:
+            for hour in range(8, 20):
+                Schedule.objects.create(
+                    department=department, stadium=stadium, date=date(2030, 1, 7),
+                    start_time=time(hour), end_time=time(hour + 1))
+
+    def test_large_response_compressed(self):
+        plain = self.client.get(self.list_url)
+        compressed = self.client.get(self.list_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertEqual(int(compressed['Content-Length']), len(compressed.content))
+        for response in (plain, compressed):
+            self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_small_response_left_alone(self):
+        response = self.client.get(f'/api/schedule/stadiums/{self.stadiums[0].pk}/',
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_compressed_once_per_version(self):
+        calls = []
+        gzip_encoding = compression.ENCODINGS['gzip']
+
+        def counting(data):
+            calls.append(data)
+            return gzip_encoding[0](data)
+
+        with mock.patch.dict(compression.ENCODINGS, {'gzip': (counting, gzip_encoding[1])}):
+            first = self.client.get(self.board_url, HTTP_ACCEPT_ENCODING='gzip')
+            second = self.client.get(self.board_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(len(calls), 1)
+
+    def test_store_failure_still_compresses(self):
+        body = b'x' * 4096
+        error = sqlite3.OperationalError('database is locked')
+        for name in ('get', 'put'):
+            with mock.patch.object(shared_store, name, side_effect=error):
+                with self.assertLogs('core.compression', 'ERROR'):
+                    compressed = compression.compress(body, 'gzip', etag='"v1"', variant=name)
+            self.assertEqual(gzip.decompress(compressed), body, name)
+
+    def test_weak_etag_not_modified(self):
+        response = self.client.get(self.board_url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertTrue(response['ETag'].startswith('W/"'))
+        response = self.client.get(self.board_url, HTTP_ACCEPT_ENCODING='gzip',
+                                   HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_export_streams_compressed(self):
+        response = self.client.get(f'{self.list_url}export/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response)
+        rows = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(rows), 61)
+
+    def test_event_stream_left_alone(self):
+        request = RequestFactory().get(
+            '/api/schedule/changes/stream/', HTTP_ACCEPT_ENCODING='gzip')
+        events = StreamingHttpResponse(iter([b'data: 1\n\n']), content_type='text/event-stream')
+        response = CompressionMiddleware(lambda request: events)(request)
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(b''.join(response.streaming_content), b'data: 1\n\n')
+
+    def test_live_stream_flushed_per_chunk(self):
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = compression.compress_stream([b'{"a": 1}\n', b'{"b": 2}\n'], 'gzip', live=True)
+        self.assertEqual(decompressor.decompress(next(chunks)), b'{"a": 1}\n')
+        self.assertEqual(decompressor.decompress(next(chunks)), b'{"b": 2}\n')
+
+    def test_other_paths_left_alone(self):
+        request = RequestFactory().get('/health', HTTP_ACCEPT_ENCODING='gzip')
+        body = HttpResponse(b'x' * 4096, content_type='application/json')
+        response = CompressionMiddleware(lambda request: body)(request)
+        self.assertNotIn('Content-Encoding', response)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        for metric in metrics._registry:
+            metric.reset()
+
+    def test_exposition_format(self):
+        self.client.get('/api/schedule/stadiums/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        lines = response.content.decode().splitlines()
+        labels = 'method="GET",route="api/schedule/stadiums/$"'
+        self.assertIn('# TYPE http_request_duration_seconds histogram', lines)
+        self.assertIn(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', lines)
+        self.assertIn(f'http_request_duration_seconds_count{{{labels}}} 1', lines)
+        self.assertIn(f'http_db_queries_bucket{{{labels},le="100"}} 1', lines)
+        self.assertTrue(any(line.startswith(f'http_request_duration_seconds_sum{{{labels}}} ')
+                            for line in lines))
+        # Buckets are cumulative
+        counts = [int(line.rsplit(' ', 1)[1]) for line in lines
+                  if line.startswith(f'http_response_size_bytes_bucket{{{labels},')]
+        self.assertEqual(counts, sorted(counts))
+
+    def test_other_addresses_forbidden(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='203.0.113.9')
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_token(self):
+        remote = {'REMOTE_ADDR': '203.0.113.9'}
+        self.assertEqual(self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer scrape-me', **remote).status_code, 200)
+        self.assertEqual(self.client.get(
+            '/metrics', HTTP_AUTHORIZATION='Bearer wrong', **remote).status_code, 403)
+
+
+class ProfilingTests(TestCase):
+    url = '/api/schedule/stadiums/'
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        for name, value in (('DIRECTORY', self.directory), ('TOKEN', 'profile-me')):
+            patcher = mock.patch.object(profiling, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def profile(self, mode='sample', **extra):
+        response = self.client.get(self.url, HTTP_X_PROFILE=mode, **extra)
+        self.assertEqual(response.status_code, 200)
+        return response.get('X-Profile-Id')
+
+    def test_staff_session(self):
+        self.client.force_login(get_user_model().objects.create_user('admin', is_staff=True))
+        profile_id = self.profile()
+        self.assertIsNotNone(profile_id)
+        with open(os.path.join(self.directory, profile_id + '.json')) as metadata_file:
+            metadata = json.load(metadata_file)
+        self.assertEqual((metadata['mode'], metadata['route']), ('sample', 'stadium-list'))
+        self.assertEqual(metadata['query_count'], len(metadata['queries']))
+        self.assertTrue(os.path.exists(os.path.join(self.directory, profile_id + '.collapsed')))
+
+    def test_token(self):
+        profile_id = self.profile('cprofile', HTTP_X_PROFILE_TOKEN='profile-me')
+        self.assertTrue(os.path.exists(os.path.join(self.directory, profile_id + '.prof')))
+        self.assertIsNone(self.profile(HTTP_X_PROFILE_TOKEN='wrong'))
+
+    def test_no_token_configured(self):
+        with mock.patch.object(profiling, 'TOKEN', ''):
+            self.assertIsNone(self.profile(HTTP_X_PROFILE_TOKEN=''))
+
+    def test_not_allowed(self):
+        self.assertIsNone(self.profile())
+        user = User.objects.create(username='alice', email='alice@example.com')
+        self.assertIsNone(self.profile(**bearer(user)))
+        self.client.force_login(get_user_model().objects.create_user('someone'))
+        self.assertIsNone(self.profile())
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_sampled_route(self):
+        with mock.patch.object(profiling, 'SAMPLE_RATES', {'stadium-list': 1}):
+            response = self.client.get(self.url)
+        self.assertIn('X-Profile-Id', response)
+
+
+class DocsTests(TestCase):
+    def test_ui_does_not_generate_schema(self):
+        with mock.patch('drf_yasg.generators.OpenAPISchemaGenerator.get_schema') as generate:
+            response = self.client.get('/', HTTP_ACCEPT='text/html')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'swagger-ui')
+        generate.assert_not_called()
+
+    def test_schema_served_from_prebuilt_copy(self):
+        response = self.client.get('/?format=openapi')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('paths', response.json())
+        with mock.patch('core.schema.build_schema') as build:
+            response = self.client.get(
+                '/?format=openapi', HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        build.assert_not_called()
+
+    def test_schema_etag_compared_exactly(self):
+        etag = self.client.get('/?format=openapi')['ETag']
+        response = self.client.get(
+            '/?format=openapi', HTTP_IF_NONE_MATCH=etag[:-1] + '0"')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            '/?format=json', HTTP_IF_NONE_MATCH='"other", ' + etag)
+        self.assertEqual(response.status_code, 304)
+
+
+@skipUnless(search.is_available(), "The search index is SQLite FTS5")
+class SearchTests(TestCase):
+    url = '/api/search/'
+
+    def setUp(self):
+        shared_store.clear()
+        self.stadium = Stadium.objects.create(name='Central Arena', location='Riverside', capacity=10)
+        self.user = User.objects.create(
+            username='centurion', email='centurion@example.com', first_name='Cen')
+
+    def results(self, query, **headers):
+        response = self.client.get(self.url, {'q': query}, **headers)
+        self.assertEqual(response.status_code, 200)
+        return [(result['type'], result['id']) for result in response.json()]
+
+    def test_prefix_match(self):
+        self.assertEqual(self.results('cent are'), [('stadium', self.stadium.pk)])
+        self.assertEqual(self.results('river'), [('stadium', self.stadium.pk)])
+
+    def test_users_only_for_authenticated_clients(self):
+        self.assertEqual(self.results('cent'), [('stadium', self.stadium.pk)])
+        self.assertCountEqual(self.results('cent', **bearer(self.user)),
+                              [('stadium', self.stadium.pk), ('user', self.user.pk)])
+        response = self.client.get(self.url, {'q': 'cent', 'type': 'user'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_follows_saves_and_deletes(self):
+        self.stadium.name = 'Harbour Field'
+        self.stadium.save()
+        self.assertEqual(self.results('central'), [])
+        self.assertEqual(self.results('harbour'), [('stadium', self.stadium.pk)])
+        self.stadium.delete()
+        self.assertEqual(self.results('harbour'), [])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(self.url).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'q': 'a', 'type': 'pitch'}).status_code, 400)
+
+    def test_bulk_imported_users(self):
+        lines = ['username,email,password,first_name,last_name,depertment',
+                 'zelda,zelda@example.com,pw-zelda-1,Zelda,Z,']
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            UserImporter(pool=pool, workers=1).run(lines)
+        self.assertEqual(len(self.results('zelda', **bearer(self.user))), 1)
+
+    def test_index_in_batches(self):
+        count = search.BATCH_SIZE * 2 + 1
+        search.index_objects('department', [
+            Department(pk=pk, name=f'Squad {pk}') for pk in range(1, count + 1)])
+        self.assertEqual(len(search.search('squad', limit=count)), count)
+
+
+class CompactListTests(SharedStoreTestCase):
+    url = '/api/schedule/schedules/'
+
+    def setUp(self):
+        super().setUp()
+        for hour in (10, 12):
+            Schedule.objects.create(
+                department=self.department, stadium=self.stadium, date=date(2030, 1, 7),
+                start_time=time(hour), end_time=time(hour + 1))
+
+    def test_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, {'fields': 'id,date,stadium_name'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({tuple(row) for row in response.json()}, {('id', 'date', 'stadium_name')})
+        self.assertEqual(response.json()[0]['stadium_name'], 'North')
+        select = next(query['sql'] for query in queries.captured_queries
+                      if 'FROM "schedule_schedule"' in query['sql'])
+        self.assertNotIn('start_time', select.split(' FROM ')[0])
+
+    def test_unknown_field(self):
+        response = self.client.get(self.url, {'fields': 'id,colour'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('colour', response.json()['fields'])
+
+    def test_usage_stats_fields(self):
+        checks.objects.create(depertment=self.department, stadium=self.stadium, counter=2)
+        url = '/api/schedule/checks/usage-stats/'
+        response = self.client.get(url, {'fields': 'counter,stadium_name'})
+        self.assertEqual(response.json(), [{'counter': 2, 'stadium_name': 'North'}])
+        response = self.client.get(url, {'fields': 'counter,colour'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('colour', response.json()['fields'])
+
+    def test_columnar(self):
+        expected = self.client.get(self.url, {'fields': 'id,start_time'}).json()
+        for params, headers in (({'format': 'columnar'}, {}),
+                                ({}, {'HTTP_ACCEPT': 'application/vnd.columnar+json'})):
+            response = self.client.get(self.url, {'fields': 'id,start_time', **params}, **headers)
+            self.assertEqual(response['Content-Type'], 'application/vnd.columnar+json')
+            self.assertEqual(response.json(), {
+                'columns': ['id', 'start_time'],
+                'rows': [[row['id'], row['start_time']] for row in expected],
+            })
+
+    def test_columnar_non_list(self):
+        renderer = ColumnarJSONRenderer()
+        self.assertEqual(renderer.render({'error': 'x'}), b'{"error":"x"}')
+        self.assertEqual(renderer.render([]), b'[]')
+
+    @skipUnless(msgpack, "msgpack is not installed")
+    def test_msgpack(self):
+        expected = self.client.get(self.url).json()
+        response = self.client.get(self.url, HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), expected)
+
+
+class BatchTests(SharedStoreFixture, TransactionTestCase):
+    """Reads run on pool threads with their own connections, so rows are committed."""
+    url = '/api/batch/'
+
+    def run_batch(self, requests, **headers):
+        return self.client.post(self.url, {'requests': requests},
+                                content_type='application/json', **headers)
+
+    def responses(self, requests, **headers):
+        response = self.run_batch(requests, **headers)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['responses']
+
+    def test_writes_seen_by_later_reads(self):
+        booking = {'department': self.department.pk, 'stadium': self.stadium.pk,
+                   'date': '2030-01-07', 'start_time': '10:00', 'end_time': '11:00'}
+        list_path = '/api/schedule/schedules/?date=2030-01-07'
+        results = self.responses([
+            {'method': 'GET', 'path': list_path},
+            {'method': 'POST', 'path': '/api/schedule/schedules/', 'body': booking},
+            {'method': 'GET', 'path': list_path},
+        ])
+        self.assertEqual([result['status'] for result in results], [200, 201, 200])
+        self.assertEqual(results[0]['body'], [])
+        self.assertEqual([row['id'] for row in results[2]['body']], [results[1]['body']['id']])
+
+    def test_failures_stay_in_their_item(self):
+        with mock.patch('schedule.views.DepartmentViewSet.list', side_effect=RuntimeError), \
+                self.assertLogs('core.batch', 'ERROR'):
+            results = self.responses([
+                {'method': 'GET', 'path': '/api/schedule/departments/'},
+                {'method': 'GET', 'path': '/api/schedule/stadiums/'},
+                {'method': 'POST', 'path': '/api/schedule/stadiums/', 'body': {'name': ''}},
+                {'method': 'GET', 'path': '/api/schedule/nowhere/'},
+                {'method': 'GET', 'path': '/admin/'},
+                {'method': 'GET', 'path': '/api/schedule/changes/stream/'},
+            ])
+        self.assertEqual([result['status'] for result in results], [500, 200, 400, 404, 400, 400])
+        self.assertEqual(results[0]['body'], {'error': 'Internal server error.'})
+        self.assertEqual(results[1]['body'][0]['name'], 'North')
+        self.assertIn('name', results[2]['body'])
+
+    def test_headers_per_item(self):
+        user = User.objects.create(username='alice', email='alice@example.com',
+                                   depertment=self.department)
+        authorization = {'Authorization': bearer(user)['HTTP_AUTHORIZATION']}
+        results = self.responses([
+            {'method': 'GET', 'path': '/api/users/me/schedule/'},
+            {'method': 'GET', 'path': '/api/users/me/schedule/', 'headers': authorization},
+            {'method': 'GET', 'path': '/api/users/me/schedule/'},
+        ])
+        self.assertEqual([result['status'] for result in results], [401, 200, 401])
+
+    def test_batch_credentials(self):
+        user = User.objects.create(username='alice', email='alice@example.com',
+                                   depertment=self.department)
+        results = self.responses(
+            [{'method': 'GET', 'path': '/api/users/me/schedule/'}], **bearer(user))
+        self.assertEqual(results[0]['status'], 200)
+
+    def test_idempotency_key_not_inherited(self):
+        item = {'method': 'POST', 'path': '/api/schedule/checks/increment-counter/',
+                'body': {'department': self.department.pk, 'stadium': self.stadium.pk}}
+        results = self.responses([item, item], HTTP_IDEMPOTENCY_KEY='batch-1')
+        self.assertEqual([result['body']['counter'] for result in results], [1, 2])
+
+    def test_size_limit(self):
+        item = {'method': 'GET', 'path': '/api/schedule/stadiums/'}
+        self.assertEqual(len(self.responses([item] * batch.MAX_REQUESTS)), batch.MAX_REQUESTS)
+        response = self.run_batch([item] * (batch.MAX_REQUESTS + 1))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.run_batch([]).status_code, 400)
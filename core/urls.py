@@ -17,29 +17,25 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path
-from debug_toolbar.toolbar import debug_toolbar_urls
-from django.urls import path
 from django.conf.urls.static import static
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
 from django.conf import settings
 from django.conf.urls import include
 
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Master <Coding> API",
-        default_version='v1',
-        description="API documentation for My Project",
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
+from . import docs, views
 
 urlpatterns = [
     path("admin/", admin.site.urls),
-    path('', schema_view.with_ui('swagger', cache_timeout=0),
-         name='schema-swagger-ui'),
     path('api/schedule/', include('schedule.urls')),
     path('api/users/', include('users.urls')),
-] + debug_toolbar_urls()
+    path('api/search/', views.SearchView.as_view(), name='search'),
+    path('api/batch/', views.BatchView.as_view(), name='batch'),
+    path('health', views.health, name='health'),
+    path('metrics', views.metrics, name='metrics'),
+]
+
+if settings.API_DOCS:
+    urlpatterns.append(path('', docs.schema_view, name='schema-swagger-ui'))
+
+if 'debug_toolbar' in settings.INSTALLED_APPS:
+    from debug_toolbar.toolbar import debug_toolbar_urls
+    urlpatterns += debug_toolbar_urls()
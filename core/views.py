@@ -0,0 +1,161 @@
+import secrets
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import batch
+from . import metrics as request_metrics
+from . import search as full_text
+from .docs import openapi, swagger_auto_schema
+from .serializers import BatchSerializer
+
+
+class SearchView(APIView):
+    """
+    API endpoint for full-text search.
+
+    Searches stadiums, departments and users through the FTS5 index and
+    returns ranked results of mixed types. Users are only searchable by
+    authenticated clients.
+    """
+    MAX_LIMIT = 100
+    PUBLIC_KINDS = ['stadium', 'department']
+
+    @swagger_auto_schema(
+        operation_description="Search stadiums, departments and users",
+        manual_parameters=[
+            openapi.Parameter('q', openapi.IN_QUERY, description="Search text",
+                              type=openapi.TYPE_STRING, required=True),
+            openapi.Parameter('type', openapi.IN_QUERY,
+                              description="Comma-separated types to include: "
+                                          "stadium, department, user",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('limit', openapi.IN_QUERY,
+                              description="Maximum number of results (default 20, max 100)",
+                              type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_ARRAY,
+                items=openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'type': openapi.Schema(type=openapi.TYPE_STRING),
+                        'id': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'title': openapi.Schema(type=openapi.TYPE_STRING),
+                        'subtitle': openapi.Schema(type=openapi.TYPE_STRING),
+                        'rank': openapi.Schema(type=openapi.TYPE_NUMBER),
+                    }
+                )
+            ),
+            400: "Bad request - missing or invalid parameters"
+        }
+    )
+    def get(self, request):
+        text = request.query_params.get('q', '').strip()
+        if not text:
+            return Response(
+                {"error": "The q parameter is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        kinds = None
+        type_param = request.query_params.get('type')
+        if type_param:
+            kinds = [kind.strip() for kind in type_param.split(',') if kind.strip()]
+            unknown = set(kinds) - set(full_text.KINDS)
+            if unknown:
+                return Response(
+                    {"error": f"Unknown type: {', '.join(sorted(unknown))}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        if not request.user.is_authenticated:
+            kinds = [kind for kind in kinds or self.PUBLIC_KINDS
+                     if kind in self.PUBLIC_KINDS]
+            if not kinds:
+                return Response(
+                    {"error": "Authentication is required to search users."},
+                    status=status.HTTP_401_UNAUTHORIZED
+                )
+
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), self.MAX_LIMIT)
+        except ValueError:
+            return Response(
+                {"error": "limit must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(full_text.search(text, kinds, max(limit, 1)))
+
+
+class BatchView(APIView):
+    """
+    API endpoint for running several API requests in one round trip.
+
+    Sub-requests use the batch request's credentials. Consecutive reads run
+    concurrently; writes run in order, after the requests listed before them.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Run up to 20 schedule, users or search API requests "
+                              "and return all their responses",
+        request_body=BatchSerializer,
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'responses': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'status': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'headers': openapi.Schema(type=openapi.TYPE_OBJECT),
+                                'body': openapi.Schema(type=openapi.TYPE_OBJECT),
+                            }
+                        )
+                    ),
+                }
+            ),
+            400: "Bad request - invalid batch"
+        }
+    )
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return Response({
+            'responses': batch.execute(request, serializer.validated_data['requests'])
+        })
+
+
+def health(request):
+    """Cheap liveness probe for load balancers."""
+    return JsonResponse({'status': 'ok'})
+
+
+def _may_scrape(request):
+    if request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.headers.get('Authorization', '')
+    return bool(token) and secrets.compare_digest(header, f'Bearer {token}')
+
+
+def metrics(request):
+    """
+    Expose the collected request metrics in Prometheus text format.
+
+    Only to ``METRICS_ALLOWED_IPS`` and to scrapers sending
+    ``METRICS_TOKEN`` as a bearer token.
+    """
+    if not _may_scrape(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        request_metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -1,13 +1,31 @@
 from django.contrib import admin
 
 # Register your models here.
-from .models import Stadium, Department, Schedule, checks
+from core.admin import EstimatedCountPaginator, FullTextSearchMixin
+
+from .models import (
+    Stadium, Department, Schedule, ArchivedSchedule, WaitlistEntry, checks,
+    OperatingHours, CalendarException
+)
+
+
+class OperatingHoursInline(admin.TabularInline):
+    model = OperatingHours
+    extra = 0
+    max_num = 7
+
+
+class CalendarExceptionInline(admin.TabularInline):
+    model = CalendarException
+    extra = 0
+    ordering = ('-date',)
 
 
 @admin.register(Stadium)
-class StadiumAdmin(admin.ModelAdmin):
+class StadiumAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'name', 'location', 'capacity', 'is_active')
-    search_fields = ('name',)
+    search_fields = ('name', 'location')
+    search_kind = 'stadium'
     ordering = ('-id',)
     list_per_page = 10
     fieldsets = (
@@ -15,12 +33,14 @@ class StadiumAdmin(admin.ModelAdmin):
             'fields': ('name', 'location', 'capacity', 'is_active')
         }),
     )
+    inlines = (OperatingHoursInline, CalendarExceptionInline)
 
 
 @admin.register(Department)
-class DepartmentAdmin(admin.ModelAdmin):
+class DepartmentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'name')
     search_fields = ('name',)
+    search_kind = 'department'
     ordering = ('-id',)
     list_per_page = 10
     fieldsets = (
@@ -31,12 +51,20 @@ class DepartmentAdmin(admin.ModelAdmin):
 
 
 @admin.register(Schedule)
-class ScheduleAdmin(admin.ModelAdmin):
+class ScheduleAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'department', 'date',
                     'start_time', 'end_time', 'is_active', 'stadium')
+    list_select_related = ('department', 'stadium')
+    list_filter = ('stadium', 'is_active')
+    date_hierarchy = 'date'
+    autocomplete_fields = ('department', 'stadium')
     search_fields = ('department__name',)
+    search_kind = 'department'
+    search_lookup = 'department'
     ordering = ('-id',)
     list_per_page = 10
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {
             'fields': ('department', 'date', 'start_time', 'end_time', 'is_active', 'stadium')
@@ -45,13 +73,51 @@ class ScheduleAdmin(admin.ModelAdmin):
 
 
 @admin.register(checks)
-class ChecksAdmin(admin.ModelAdmin):
+class ChecksAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'counter', 'depertment', 'stadium')
+    list_select_related = ('depertment', 'stadium')
+    list_filter = ('stadium',)
+    autocomplete_fields = ('depertment', 'stadium')
     search_fields = ('depertment__name',)
+    search_kind = 'department'
+    search_lookup = 'depertment'
     ordering = ('-id',)
     list_per_page = 10
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {
             'fields': ('counter', 'depertment', 'stadium')
         }),
     )
+
+
+@admin.register(ArchivedSchedule)
+class ArchivedScheduleAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('id', 'department', 'date',
+                    'start_time', 'end_time', 'is_active', 'stadium')
+    list_select_related = ('department', 'stadium')
+    date_hierarchy = 'date'
+    raw_id_fields = ('department', 'stadium')
+    search_fields = ('department__name',)
+    search_kind = 'department'
+    search_lookup = 'department'
+    ordering = ('-id',)
+    list_per_page = 10
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(FullTextSearchMixin, admin.ModelAdmin):
+    list_display = ('id', 'department', 'stadium', 'date',
+                    'start_time', 'end_time', 'status', 'created_at')
+    list_select_related = ('department', 'stadium')
+    list_filter = ('status',)
+    autocomplete_fields = ('department', 'stadium')
+    raw_id_fields = ('schedule',)
+    search_fields = ('department__name',)
+    search_kind = 'department'
+    search_lookup = 'department'
+    ordering = ('-id',)
+    list_per_page = 10
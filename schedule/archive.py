@@ -0,0 +1,86 @@
+"""
+Hot/cold partitioning of schedules.
+
+Schedules older than the archive cutoff live in ``ArchivedSchedule`` so the
+hot ``Schedule`` table (and every conflict check on it) stays sized to the
+active season. Readers call ``reaches_archive`` to decide whether a date
+range must also read the archive.
+
+The archive's latest date is cached in the shared store, so the archiving
+command (a separate process) can clear it for every worker; it also
+expires after ``BOUNDARY_TIMEOUT`` seconds.
+"""
+
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from core import shared_store
+
+from . import cache
+from .models import ArchivedSchedule, Schedule, WaitlistEntry
+
+BOUNDARY_CACHE_KEY = 'schedule-archive:latest-date'
+BOUNDARY_TIMEOUT = 60
+COLUMNS = ['id', 'department_id', 'date', 'start_time', 'end_time',
+           'is_active', 'stadium_id']
+
+
+def default_cutoff(days):
+    return timezone.localdate() - timedelta(days=days)
+
+
+def latest_archived_date():
+    """The most recent archived date, or ``None`` if the archive is empty."""
+    latest = shared_store.get(BOUNDARY_CACHE_KEY)
+    if latest is None:
+        latest = ArchivedSchedule.objects.aggregate(latest=Max('date'))['latest']
+        shared_store.put(BOUNDARY_CACHE_KEY, latest or '', BOUNDARY_TIMEOUT)
+    return latest or None
+
+
+def reaches_archive(start_date):
+    """Whether a range starting at ``start_date`` (``None``: unbounded) needs the archive."""
+    latest = latest_archived_date()
+    if latest is None:
+        return False
+    return start_date is None or start_date <= latest
+
+
+def archive_before(cutoff, chunk_size=1000, pause=0):
+    """
+    Move schedules dated before ``cutoff`` into the archive.
+
+    Works in chunks, each in its own short transaction, so the API keeps
+    serving while it runs. Yields the number of rows moved per chunk.
+    """
+    try:
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    Schedule.objects.filter(date__lt=cutoff)
+                    .order_by('id').values(*COLUMNS)[:chunk_size]
+                )
+                if not rows:
+                    return
+                ArchivedSchedule.objects.bulk_create(
+                    [ArchivedSchedule(**row) for row in rows],
+                    ignore_conflicts=True
+                )
+                ids = [row['id'] for row in rows]
+                # The raw delete below skips on_delete, so do SET_NULL here
+                WaitlistEntry.objects.filter(schedule_id__in=ids).update(schedule=None)
+                # Raw delete: archived bookings aren't cancellations, so no
+                # delete signals (change feed, waitlists)
+                Schedule.objects.filter(id__in=ids)._raw_delete(Schedule.objects.db)
+                # Lists now read these bookings from the archive
+                cache.invalidate_bookings(
+                    {(row['stadium_id'], row['department_id'], row['date']) for row in rows})
+            yield len(rows)
+            if pause:
+                time.sleep(pause)
+    finally:
+        shared_store.delete(BOUNDARY_CACHE_KEY)
@@ -0,0 +1,107 @@
+"""
+Stadium operating hours and free time.
+
+Each stadium's weekly hours and dated exceptions are compiled into an
+in-memory ``Calendar``, kept per process and rebuilt only when the
+stadium's calendar version moves on. The version is kept in the shared
+store and bumped whenever the hours or exceptions change, so a change
+made through any worker recompiles the calendar in all of them.
+"""
+
+from datetime import time
+
+from . import cache
+from .models import CalendarException, OperatingHours
+
+# Hours on days a stadium has no operating hours for (8 AM to 10 PM)
+DEFAULT_HOURS = (time(8, 0), time(22, 0))
+
+# stadium ID -> (calendar version, Calendar)
+_calendars = {}
+
+
+class Calendar:
+    """Operating hours of one stadium, by weekday and by exception date."""
+
+    __slots__ = ('weekly', 'exceptions')
+
+    def __init__(self, weekly, exceptions):
+        self.weekly = weekly
+        self.exceptions = exceptions
+
+    def hours(self, day):
+        """``(opens_at, closes_at)`` on ``day``, or ``None`` if closed."""
+        if day in self.exceptions:
+            return self.exceptions[day]
+        return self.weekly[day.weekday()]
+
+
+def compile_calendar(stadium_id):
+    weekly = [DEFAULT_HOURS] * 7
+    for weekday, opens_at, closes_at, is_closed in OperatingHours.objects.filter(
+            stadium_id=stadium_id).values_list('weekday', 'opens_at', 'closes_at', 'is_closed'):
+        weekly[weekday] = None if is_closed else (opens_at, closes_at)
+
+    exceptions = {
+        date: None if opens_at is None else (opens_at, closes_at)
+        for date, opens_at, closes_at in CalendarException.objects.filter(
+            stadium_id=stadium_id).values_list('date', 'opens_at', 'closes_at')
+    }
+    return Calendar(tuple(weekly), exceptions)
+
+
+def calendar(stadium_id):
+    """The compiled calendar of a stadium."""
+    version = cache.calendar_version(stadium_id)
+    entry = _calendars.get(stadium_id)
+    if entry is None or entry[0] != version:
+        entry = (version, compile_calendar(stadium_id))
+        _calendars[stadium_id] = entry
+    return entry[1]
+
+
+def opening_hours(stadium_id, day):
+    """``(opens_at, closes_at)`` of a stadium on ``day``, or ``None`` if closed."""
+    return calendar(stadium_id).hours(day)
+
+
+def hours_error(stadium_id, day, start_time, end_time):
+    """Why a booking doesn't fit the stadium's hours, or ``None`` if it does."""
+    hours = opening_hours(stadium_id, day)
+    if hours is None:
+        return "The stadium is closed on this date."
+    opens_at, closes_at = hours
+    if start_time < opens_at or end_time > closes_at:
+        return (f"Outside the stadium's operating hours on this date "
+                f"({opens_at:%H:%M}-{closes_at:%H:%M}).")
+    return None
+
+
+def free_slots(schedules, start=DEFAULT_HOURS[0], end=DEFAULT_HOURS[1]):
+    """
+    Return the free ``{"start_time", "end_time"}`` gaps between ``schedules``.
+
+    ``schedules`` must be ordered by start time.
+    """
+    slots = []
+    current_time = start
+
+    # Find available slots between scheduled times
+    for schedule in schedules:
+        if current_time < schedule.start_time:
+            slots.append({
+                'start_time': current_time.strftime('%H:%M'),
+                'end_time': min(schedule.start_time, end).strftime('%H:%M')
+            })
+        current_time = max(current_time, schedule.end_time)
+        if current_time >= end:
+            break
+
+    # Add final slot if there's time left after the last schedule
+    if current_time < end:
+        slots.append({
+            'start_time': current_time.strftime('%H:%M'),
+            'end_time': end.strftime('%H:%M')
+        })
+
+    return slots
@@ -0,0 +1,114 @@
+"""
+Versions of cached schedule data.
+
+Versions are the tag versions of the shared store (see
+``core.shared_store``), so a change made through any worker moves them on
+in every worker. Cached responses include the relevant version in their
+key or ETag, so invalidating a tag invalidates them without having to
+find and delete the entries; the same tags expire the responses kept in
+the shared response cache (see ``core.response_cache``).
+"""
+
+import logging
+import sqlite3
+
+from core import shared_store
+
+logger = logging.getLogger(__name__)
+
+
+def department_tags(department_id):
+    """Tags of a department's bookings, of the stadiums and of the departments."""
+    return [schedule_list_tag(department_id=department_id), 'stadiums', 'departments']
+
+
+def date_tags(date):
+    """Tags of the bookings on ``date``, of the stadiums and of the departments."""
+    return [schedule_list_tag(date=date), 'stadiums', 'departments']
+
+
+def department_version(department_id):
+    return shared_store.version_token(department_tags(department_id))
+
+
+def date_version(date):
+    return shared_store.version_token(date_tags(date))
+
+
+def cached(key, tags, timeout, compute):
+    """
+    ``compute()``'s result, kept in the shared store for every worker.
+
+    The entry is stored under the versions ``tags`` had before computing
+    it, so invalidating one of them makes it a miss everywhere.
+    """
+    try:
+        data = shared_store.get(key)
+        if data is not None:
+            return data
+        tag_versions = shared_store.versions(tags)
+    except sqlite3.Error:
+        logger.exception("Cache lookup of %s failed", key)
+        return compute()
+
+    data = compute()
+    try:
+        shared_store.put(key, data, timeout, tag_versions)
+    except sqlite3.Error:
+        logger.exception("Could not cache %s", key)
+    return data
+
+
+def calendar_version(stadium_id):
+    """Version of a stadium's operating hours and calendar exceptions."""
+    return shared_store.version_token([f'calendar:{stadium_id}'])
+
+
+def bump_stadiums():
+    shared_store.invalidate(['stadiums'])
+
+
+def bump_departments():
+    shared_store.invalidate(['departments'])
+
+
+def bump_checks():
+    shared_store.invalidate(['checks'])
+
+
+def bump_calendar(stadium_id):
+    shared_store.invalidate([f'calendar:{stadium_id}'])
+
+
+# Tags of schedule lists and free slots
+
+def schedule_list_tag(stadium_id=None, department_id=None, date=None):
+    """The narrowest tag covering every booking a schedule filter can match."""
+    if stadium_id and date:
+        return f'schedules:stadium-date:{stadium_id}:{date}'
+    if department_id:
+        return f'schedules:department:{department_id}'
+    if stadium_id:
+        return f'schedules:stadium:{stadium_id}'
+    if date:
+        return f'schedules:date:{date}'
+    return 'schedules'
+
+
+def booking_tags(stadium_id, department_id, date):
+    """Tags of every response a booking can appear in."""
+    return {
+        schedule_list_tag(),
+        schedule_list_tag(stadium_id=stadium_id),
+        schedule_list_tag(department_id=department_id),
+        schedule_list_tag(date=date),
+        schedule_list_tag(stadium_id=stadium_id, date=date),
+    }
+
+
+def invalidate_bookings(bookings):
+    """Invalidate the data of ``(stadium_id, department_id, date)`` bookings."""
+    tags = set()
+    for stadium_id, department_id, date in bookings:
+        tags |= booking_tags(stadium_id, department_id, date)
+    shared_store.invalidate(tags)
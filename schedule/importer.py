@@ -0,0 +1,393 @@
+"""
+Bulk schedule import from CSV or iCalendar files.
+
+Files are read as a stream of rows and handled in chunks: each chunk is
+validated, then checked for conflicts against the existing bookings with
+one query and inserted with ``bulk_create`` together with its change feed
+entries and usage counters, in one transaction holding the booking lock
+(see ``schedule.locking``). Stadiums and departments are resolved from
+lookup maps loaded once per import, so memory stays bounded by the chunk
+size whatever the file size.
+
+Uploads are imported on a background pool (``start``), so an import runs
+to the end even if the client that sent the file goes away.
+"""
+
+import csv
+import io
+import logging
+import queue
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Q
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import cache
+from .availability import hours_error
+from .locking import booking_lock
+from .models import Change, Department, Schedule, Stadium, checks
+from .serializers import ChecksSerializer, ScheduleSerializer
+
+logger = logging.getLogger(__name__)
+
+WORKERS = getattr(settings, 'SCHEDULE_IMPORT_WORKERS', 2)
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='schedule-import')
+
+CSV_FIELDS = ['date', 'start_time', 'end_time', 'stadium', 'department']
+ROW_FIELDS = CSV_FIELDS + ['is_active']
+
+
+class ImportFileError(Exception):
+    """The file as a whole can't be imported."""
+
+
+def read_csv(lines):
+    """
+    Iterate over ``(line, row)`` pairs from CSV lines with a header row.
+
+    The header is checked straight away; raises ``ImportFileError`` if
+    columns are missing.
+    """
+    reader = csv.DictReader(lines)
+    missing = set(CSV_FIELDS) - set(reader.fieldnames or [])
+    if missing:
+        raise ImportFileError(f"Missing columns: {', '.join(sorted(missing))}")
+    return (
+        (line, {field: (row.get(field) or '').strip() for field in ROW_FIELDS} |
+         {'is_active': (row.get('is_active') or '').strip() or 'true'})
+        for line, row in enumerate(reader, start=2)
+    )
+
+
+def _unfold(lines):
+    """Join folded iCalendar content lines, keeping the first line's number."""
+    current, current_line = None, 0
+    for number, text in enumerate(lines, start=1):
+        text = text.rstrip('\r\n')
+        if text[:1] in (' ', '\t') and current is not None:
+            current += text[1:]
+            continue
+        if current is not None:
+            yield current_line, current
+        current, current_line = text, number
+    if current is not None:
+        yield current_line, current
+
+
+def _ical_datetime(value, params):
+    """Local ``datetime`` of an iCalendar DATE-TIME value."""
+    if 'T' not in value:
+        raise ValueError("All-day events can't be imported.")
+    utc = value.endswith('Z')
+    moment = datetime.strptime(value.rstrip('Z'), '%Y%m%dT%H%M%S')
+    if utc:
+        moment = moment.replace(tzinfo=ZoneInfo('UTC'))
+    elif 'TZID' in params:
+        try:
+            moment = moment.replace(tzinfo=ZoneInfo(params['TZID']))
+        except ZoneInfoNotFoundError:
+            raise ValueError(f"Unknown time zone '{params['TZID']}'.")
+    else:
+        return moment
+    return timezone.localtime(moment)
+
+
+def read_ical(lines):
+    """
+    Yield ``(line, row)`` pairs for the VEVENTs of an iCalendar file.
+
+    ``SUMMARY`` names the department and ``LOCATION`` the stadium (names or
+    IDs); cancelled events are imported as inactive schedules.
+    """
+    event, event_line = None, 0
+    for line, text in _unfold(lines):
+        name, _, value = text.partition(':')
+        name, *raw_params = name.split(';')
+        name = name.upper()
+        params = dict(param.partition('=')[::2] for param in raw_params)
+
+        if name == 'BEGIN' and value.upper() == 'VEVENT':
+            event, event_line = {}, line
+        elif event is None:
+            continue
+        elif name == 'END' and value.upper() == 'VEVENT':
+            yield event_line, _event_row(event)
+            event = None
+        elif name in ('DTSTART', 'DTEND', 'SUMMARY', 'LOCATION', 'STATUS'):
+            event[name] = (value.replace('\\,', ',').replace('\\;', ';').strip(), params)
+
+
+def _event_row(event):
+    row = {field: '' for field in ROW_FIELDS}
+    row['department'] = event.get('SUMMARY', ('', {}))[0]
+    row['stadium'] = event.get('LOCATION', ('', {}))[0]
+    row['is_active'] = 'false' if event.get('STATUS', ('', {}))[0].upper() == 'CANCELLED' else 'true'
+    try:
+        start = _ical_datetime(*event['DTSTART'])
+        end = _ical_datetime(*event['DTEND'])
+    except KeyError:
+        row['error'] = "DTSTART and DTEND are required."
+        return row
+    except ValueError as e:
+        row['error'] = str(e)
+        return row
+    if end.date() != start.date():
+        row['error'] = "Events must start and end on the same day."
+        return row
+    row.update(date=start.date().isoformat(), start_time=start.time().isoformat(),
+               end_time=end.time().isoformat())
+    return row
+
+
+READERS = {
+    'csv': read_csv,
+    'ics': read_ical,
+}
+
+
+EXTENSIONS = {
+    'csv': 'csv',
+    'ics': 'ics',
+    'ical': 'ics',
+}
+
+
+def file_format(filename):
+    """Import format of a file by its extension, or ``None``."""
+    return EXTENSIONS.get(filename.rsplit('.', 1)[-1].lower())
+
+
+class ScheduleImportSerializer(serializers.Serializer):
+    """
+    Field validation for imported rows, without per-row queries.
+
+    Stadiums and departments are given by name or ID and resolved by the
+    importer.
+    """
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    stadium = serializers.CharField(max_length=100)
+    department = serializers.CharField(max_length=100)
+    is_active = serializers.BooleanField(default=True)
+
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError(
+                {"end_time": "End time must be after start time."})
+        return attrs
+
+
+class ScheduleImporter:
+    """
+    Import schedules from ``(line, row)`` pairs.
+
+    ``run`` yields the rejected rows of each chunk as
+    ``{"line", "row", "errors"}`` entries; ``processed``, ``created`` and
+    ``rejected`` count the rows so far.
+    """
+
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.processed = 0
+        self.created = 0
+        self.rejected = 0
+        self._stadiums = self._departments = None
+
+    def run(self, rows):
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return
+            rejects = self._import_chunk(chunk)
+            self.processed += len(chunk)
+            self.rejected += len(rejects)
+            yield rejects
+
+    def _load_maps(self):
+        # Stadiums and departments are few; load the lookup maps once
+        self._stadiums, self._departments = {}, {}
+        for model, lookup in ((Stadium, self._stadiums), (Department, self._departments)):
+            for obj in model.objects.all():
+                lookup[str(obj.pk)] = obj
+                lookup.setdefault(obj.name.lower(), obj)
+
+    def _validate(self, chunk, rejects):
+        if self._stadiums is None:
+            self._load_maps()
+
+        valid = []
+        for line, row in chunk:
+            if 'error' in row:
+                error = row.pop('error')
+                rejects.append({'line': line, 'row': row,
+                                'errors': {'non_field_errors': [error]}})
+                continue
+            serializer = ScheduleImportSerializer(data=row)
+            if not serializer.is_valid():
+                rejects.append({'line': line, 'row': row, 'errors': serializer.errors})
+                continue
+
+            data = dict(serializer.validated_data)
+            errors = {}
+            for field, lookup in (('stadium', self._stadiums), ('department', self._departments)):
+                data[field] = lookup.get(data[field].lower())
+                if data[field] is None:
+                    errors[field] = [f"Unknown {field} '{row[field]}'."]
+            if not errors and data['is_active']:
+                error = hours_error(data['stadium'].id, data['date'],
+                                    data['start_time'], data['end_time'])
+                if error:
+                    errors['non_field_errors'] = [error]
+            if errors:
+                rejects.append({'line': line, 'row': row, 'errors': errors})
+                continue
+            valid.append((line, row, data))
+        return valid
+
+    def _check_conflicts(self, valid, rejects):
+        """Drop active rows clashing with a booking, in the database or earlier in the file."""
+        active = [data for _, _, data in valid if data['is_active']]
+        if not active:
+            return valid
+
+        # Active bookings of the chunk's stadiums and departments on its dates
+        booked = defaultdict(list)
+        existing = Schedule.active.filter(
+            Q(stadium_id__in={data['stadium'].id for data in active}) |
+            Q(department_id__in={data['department'].id for data in active}),
+            date__in={data['date'] for data in active}
+        ).values_list('stadium_id', 'department_id', 'date', 'start_time', 'end_time')
+        for stadium_id, department_id, date, start_time, end_time in existing:
+            booked['stadium', stadium_id, date].append((start_time, end_time))
+            booked['department', department_id, date].append((start_time, end_time))
+
+        accepted = []
+        for line, row, data in valid:
+            if not data['is_active']:
+                accepted.append((line, row, data))
+                continue
+            keys = (('stadium', data['stadium'].id, data['date']),
+                    ('department', data['department'].id, data['date']))
+            clash = next((
+                kind for kind, *key in keys
+                if any(data['start_time'] < end and data['end_time'] > start
+                       for start, end in booked[(kind, *key)])
+            ), None)
+            if clash == 'stadium':
+                rejects.append({'line': line, 'row': row, 'errors': {'non_field_errors': [
+                    "Time conflict with an existing schedule in this stadium."]}})
+                continue
+            if clash == 'department':
+                rejects.append({'line': line, 'row': row, 'errors': {'non_field_errors': [
+                    "Time conflict: this department is already scheduled elsewhere at this time."]}})
+                continue
+            for key in keys:
+                booked[key].append((data['start_time'], data['end_time']))
+            accepted.append((line, row, data))
+        return accepted
+
+    def _import_chunk(self, chunk):
+        rejects = []
+        valid = self._validate(chunk, rejects)
+        with booking_lock():
+            # Checked under the lock: no booking can come in before the insert
+            valid = self._check_conflicts(valid, rejects)
+            rejects.sort(key=lambda reject: reject['line'])
+            if not valid:
+                return rejects
+
+            schedules = [Schedule(**data) for _, _, data in valid]
+            Schedule.objects.bulk_create(schedules)
+            updated, created = self._count_usage(
+                Counter((s.department, s.stadium) for s in schedules))
+            # bulk_create and update() skip post_save: record the changes here
+            Change.objects.bulk_create(
+                [Change(model='schedule', object_id=schedule.pk, action='create',
+                        data=ScheduleSerializer(schedule).data)
+                 for schedule in schedules] +
+                [Change(model='checks', object_id=counter.pk, action=action,
+                        data=ChecksSerializer(counter).data)
+                 for action, counters in (('update', updated), ('create', created))
+                 for counter in counters]
+            )
+        self.created += len(schedules)
+
+        cache.invalidate_bookings({(s.stadium_id, s.department_id, s.date) for s in schedules})
+        cache.bump_checks()
+        return rejects
+
+    @staticmethod
+    def _count_usage(usage):
+        """
+        Add ``usage`` (``(department, stadium) -> bookings``) to the checks
+        counters; returns the updated and the created rows.
+        """
+        existing = {
+            (counter.depertment, counter.stadium): counter.pk
+            for counter in checks.objects.select_related('depertment', 'stadium').filter(
+                depertment__in={department for department, _ in usage},
+                stadium__in={stadium for _, stadium in usage}
+            )
+        }
+        existing = {pair: pk for pair, pk in existing.items() if pair in usage}
+        for pair, pk in existing.items():
+            checks.objects.filter(pk=pk).update(counter=F('counter') + usage[pair])
+        created = checks.objects.bulk_create([
+            checks(depertment=department, stadium=stadium, counter=count)
+            for (department, stadium), count in usage.items()
+            if (department, stadium) not in existing
+        ])
+        updated = checks.objects.select_related('depertment', 'stadium').filter(
+            pk__in=existing.values())
+        return list(updated), created
+
+
+def start(source, fmt, chunk_size=1000):
+    """
+    Import the schedules in the binary file ``source`` on the import pool.
+
+    The file's header is read first, so ``ImportFileError`` and
+    ``UnicodeDecodeError`` for the file as a whole are raised here. Returns
+    a queue of progress messages, in the order ``_run`` puts them, ending
+    with ``None``. The import doesn't wait for them to be read.
+    """
+    lines = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    try:
+        rows = READERS[fmt](lines)
+    except Exception:
+        lines.close()
+        raise
+    messages = queue.SimpleQueue()
+    _executor.submit(_run, ScheduleImporter(chunk_size), rows, lines, messages)
+    return messages
+
+
+def _run(importer, rows, lines, messages):
+    # One message per reject and per chunk committed, then the totals
+    try:
+        for rejects in importer.run(rows):
+            for reject in rejects:
+                messages.put(reject)
+            messages.put({'processed': importer.processed, 'created': importer.created,
+                          'rejected': importer.rejected})
+        messages.put({'done': True, 'processed': importer.processed,
+                      'created': importer.created, 'rejected': importer.rejected})
+    except UnicodeDecodeError:
+        messages.put({'error': "The file must be UTF-8 encoded."})
+    except Exception:
+        logger.exception("Schedule import failed after %d rows", importer.processed)
+        messages.put({'error': "The import failed; rows reported as committed were imported."})
+    finally:
+        messages.put(None)
+        lines.close()
+        connections.close_all()
@@ -0,0 +1,31 @@
+"""
+Serialised booking writes.
+
+A booking is only valid if no active booking overlaps it, so the conflict
+check and the insert must not let another worker book in between.
+``select_for_update()`` does nothing on SQLite, so ``booking_lock`` takes
+the database's write lock when the transaction starts instead: bookers
+queue up behind each other, and each one's check sees the bookings the
+others committed.
+"""
+
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+
+from .models import Schedule
+
+
+@contextmanager
+def booking_lock():
+    """A transaction holding the write lock on the bookings from its start."""
+    with transaction.atomic():
+        table = connection.ops.quote_name(Schedule._meta.db_table)
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                # Any write statement takes SQLite's write lock; this one changes nothing
+                cursor.execute(f"UPDATE {table} SET id = id WHERE 0")
+            elif connection.vendor == 'postgresql':
+                # Conflicts with itself and with other writes, not with reads
+                cursor.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+        yield
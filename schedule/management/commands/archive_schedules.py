@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.archive import archive_before, default_cutoff
+
+
+class Command(BaseCommand):
+    help = ("Move schedules older than a cutoff date from the schedule table "
+            "into the archive table, in small online batches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', help="Archive schedules dated before this day (YYYY-MM-DD). "
+                             "Defaults to SCHEDULE_ARCHIVE_AFTER_DAYS days ago.")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Rows moved per transaction (default 1000).")
+        parser.add_argument('--pause', type=float, default=0.05,
+                            help="Seconds to sleep between chunks (default 0.05).")
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = datetime.strptime(options['before'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Invalid date format. Use YYYY-MM-DD.")
+        else:
+            cutoff = default_cutoff(settings.SCHEDULE_ARCHIVE_AFTER_DAYS)
+
+        total = 0
+        for moved in archive_before(cutoff, options['chunk_size'], options['pause']):
+            total += moved
+            self.stdout.write(f"Archived {total} schedules...")
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} schedules dated before {cutoff}"))
@@ -0,0 +1,55 @@
+import csv
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from schedule.importer import READERS, ROW_FIELDS, ImportFileError, ScheduleImporter, file_format
+
+
+class Command(BaseCommand):
+    help = ("Create schedules from a CSV file (columns date, start_time, end_time, "
+            "stadium, department and optionally is_active) or an iCalendar file "
+            "(SUMMARY is the department, LOCATION the stadium).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or iCalendar file to import.")
+        parser.add_argument('--format', choices=sorted(READERS),
+                            help="File format (default: by extension).")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Rows validated and inserted per batch.")
+        parser.add_argument('--rejects',
+                            help="CSV file to write rejected rows to (default: stderr).")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or file_format(options['path'])
+        if fmt is None:
+            raise CommandError("Unknown file format; pass --format.")
+
+        importer = ScheduleImporter(chunk_size=options['chunk_size'])
+        rejects_file = writer = None
+        if options['rejects']:
+            rejects_file = open(options['rejects'], 'w', newline='')
+            writer = csv.writer(rejects_file)
+            writer.writerow(['line', 'errors'] + ROW_FIELDS)
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as source:
+                for rejects in importer.run(READERS[fmt](source)):
+                    for reject in rejects:
+                        errors = json.dumps(reject['errors'])
+                        if writer:
+                            writer.writerow([reject['line'], errors] +
+                                            [reject['row'][field] for field in ROW_FIELDS])
+                        else:
+                            self.stderr.write(f"line {reject['line']}: {errors}")
+                    self.stdout.write(
+                        f"Processed {importer.processed} rows: {importer.created} "
+                        f"created, {importer.rejected} rejected")
+        except ImportFileError as e:
+            raise CommandError(str(e))
+        finally:
+            if rejects_file:
+                rejects_file.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {importer.created} schedules, rejected {importer.rejected} rows"))
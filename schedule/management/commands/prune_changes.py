@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from schedule.models import Change
+
+
+class Command(BaseCommand):
+    help = ("Delete change feed entries older than a number of days. Clients "
+            "that last synced before the cutoff must do a full refetch.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help="Keep this many days of changes (default 30).")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = Change.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} changes"))
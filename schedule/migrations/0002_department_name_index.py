@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="department",
+            name="name",
+            field=models.CharField(db_index=True, max_length=100),
+        ),
+    ]
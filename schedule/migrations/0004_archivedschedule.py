@@ -0,0 +1,39 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0003_change"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedSchedule",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("date", models.DateField(db_index=True)),
+                ("start_time", models.TimeField()),
+                ("end_time", models.TimeField()),
+                ("is_active", models.BooleanField(default=True)),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "department",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="schedule.department",
+                    ),
+                ),
+                (
+                    "stadium",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="schedule.stadium",
+                    ),
+                ),
+            ],
+        ),
+    ]
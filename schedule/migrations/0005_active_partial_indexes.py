@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0004_archivedschedule"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["stadium", "date"],
+                name="schedule_active_stadium_date",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="schedule",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["department", "date"],
+                name="schedule_active_dept_date",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="stadium",
+            index=models.Index(
+                condition=models.Q(("is_active", True)),
+                fields=["name"],
+                name="stadium_active_name",
+            ),
+        ),
+    ]
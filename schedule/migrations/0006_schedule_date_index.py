@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0005_active_partial_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="schedule",
+            name="date",
+            field=models.DateField(db_index=True),
+        ),
+    ]
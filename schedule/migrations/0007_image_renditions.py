@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0006_schedule_date_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="department",
+            name="image_team_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name="stadium",
+            name="image_renditions",
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
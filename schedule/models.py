@@ -1,8 +1,23 @@
+import uuid
+
 from django.db import models
+from django.db.models import Q
 
 # Create your models here.
 
 
+class ActiveQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_active=True)
+
+
+class ActiveManager(models.Manager.from_queryset(ActiveQuerySet)):
+    """Manager limited to active rows, matching the partial indexes below."""
+
+    def get_queryset(self):
+        return super().get_queryset().active()
+
+
 class Stadium(models.Model):
 
     name = models.CharField(max_length=100)
@@ -11,12 +26,78 @@ class Stadium(models.Model):
     is_active = models.BooleanField(default=True)
     image = models.ImageField(
         upload_to='stadium_images/', blank=True, null=True)
+    # Resized copies of `image`, see schedule.renditions
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+
+    objects = ActiveQuerySet.as_manager()
+    active = ActiveManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], condition=Q(is_active=True),
+                         name='stadium_active_name'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class OperatingHours(models.Model):
+    """Weekly opening hours of a stadium; days without a row use the defaults."""
+    WEEKDAYS = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+
+    stadium = models.ForeignKey(
+        Stadium, on_delete=models.CASCADE, related_name='operating_hours')
+    weekday = models.PositiveSmallIntegerField(choices=WEEKDAYS)
+    opens_at = models.TimeField(null=True, blank=True)
+    closes_at = models.TimeField(null=True, blank=True)
+    is_closed = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['stadium', 'weekday'],
+                                    name='operating_hours_unique_weekday'),
+        ]
+
+    def __str__(self):
+        return f"{self.stadium.name} {self.get_weekday_display()}"
+
+
+class CalendarException(models.Model):
+    """
+    Hours replacing a stadium's weekly hours on one date, e.g. a holiday
+    or maintenance closure. No times means closed all day.
+    """
+    stadium = models.ForeignKey(
+        Stadium, on_delete=models.CASCADE, related_name='calendar_exceptions')
+    date = models.DateField()
+    opens_at = models.TimeField(null=True, blank=True)
+    closes_at = models.TimeField(null=True, blank=True)
+    reason = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['stadium', 'date'],
+                                    name='calendar_exception_unique_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.stadium.name} {self.date}"
 
 
 class Department(models.Model):
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, db_index=True)
     image_team = models.ImageField(
         upload_to='team_images/', blank=True, null=True)
+    image_team_renditions = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -24,17 +105,129 @@ class Department(models.Model):
 
 class Schedule(models.Model):
     department = models.ForeignKey(Department, on_delete=models.CASCADE)
-    date = models.DateField()
+    date = models.DateField(db_index=True)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    is_active = models.BooleanField(default=True)
+    stadium = models.ForeignKey(Stadium, on_delete=models.CASCADE)
+
+    objects = ActiveQuerySet.as_manager()
+    active = ActiveManager()
+
+    class Meta:
+        # Conflict checks and day views only look at active schedules
+        indexes = [
+            models.Index(fields=['stadium', 'date'], condition=Q(is_active=True),
+                         name='schedule_active_stadium_date'),
+            models.Index(fields=['department', 'date'], condition=Q(is_active=True),
+                         name='schedule_active_dept_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.department.name} - {self.date} {self.start_time}-{self.end_time}"
+
+
+class ArchivedSchedule(models.Model):
+    """
+    Past schedules moved out of ``Schedule`` by ``manage.py archive_schedules``.
+
+    Rows keep their original ID.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    date = models.DateField(db_index=True)
     start_time = models.TimeField()
     end_time = models.TimeField()
     is_active = models.BooleanField(default=True)
     stadium = models.ForeignKey(Stadium, on_delete=models.CASCADE)
+    archived_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
         return f"{self.department.name} - {self.date} {self.start_time}-{self.end_time}"
 
 
+class WaitlistEntry(models.Model):
+    """
+    A department waiting for a stadium time window that is already booked.
+
+    Promoted to a ``Schedule`` by ``schedule.waitlist`` as soon as the window
+    is freed.
+    """
+    STATUSES = [
+        ('waiting', 'Waiting'),
+        ('promoted', 'Promoted'),
+    ]
+
+    department = models.ForeignKey(Department, on_delete=models.CASCADE)
+    stadium = models.ForeignKey(Stadium, on_delete=models.CASCADE)
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    status = models.CharField(max_length=10, choices=STATUSES, default='waiting')
+    schedule = models.ForeignKey(
+        Schedule, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Freed intervals are matched against the waiting entries of one
+        # stadium-day, oldest first
+        indexes = [
+            models.Index(fields=['stadium', 'date', 'created_at'],
+                         condition=Q(status='waiting'), name='waitlist_waiting_stadium_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.department.name} waiting for {self.date} {self.start_time}-{self.end_time}"
+
+
 class checks(models.Model):
     counter = models.IntegerField(default=0)
     depertment = models.ForeignKey(Department, on_delete=models.CASCADE)
     stadium = models.ForeignKey(Stadium, on_delete=models.CASCADE)
+
+
+class Change(models.Model):
+    """
+    Append-only log of mutations to the schedule models.
+
+    The auto-incrementing ``id`` is the sequence number clients sync from.
+    """
+    ACTIONS = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTIONS)
+    data = models.JSONField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.model} {self.object_id}"
+
+
+class ImageUpload(models.Model):
+    """
+    A resumable upload of a stadium or team image.
+
+    Received bytes are appended to a file under ``IMAGE_UPLOAD_TEMP_DIR``,
+    whose size is the upload's offset; the image is attached to its object
+    once all ``size`` bytes have arrived.
+    """
+    TARGETS = [
+        ('stadium', 'Stadium image'),
+        ('department', 'Team image'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    target = models.CharField(max_length=20, choices=TARGETS)
+    object_id = models.BigIntegerField()
+    filename = models.CharField(max_length=255)
+    size = models.PositiveIntegerField()
+    completed = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.target} {self.object_id})"
@@ -0,0 +1,132 @@
+"""
+Resized WebP renditions of stadium and team images.
+
+Renditions are generated on a small background pool after an image is
+saved, and lazily for images uploaded before renditions existed. File
+names carry a hash of the source image, so they can be served with
+far-future cache headers. Generated names are stored on the model next to
+the image field (``<field>_renditions``) together with the source name
+they were made from; renditions of a replaced image are never exposed.
+"""
+
+import hashlib
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+
+from . import cache
+from .models import Department, Stadium
+
+logger = logging.getLogger(__name__)
+
+# rendition name -> bounding box
+SIZES = {
+    'thumbnail': (200, 200),
+    'medium': (800, 800),
+}
+UPLOAD_DIR = 'renditions'
+WEBP_QUALITY = 80
+
+# model -> image field with renditions
+IMAGE_FIELDS = {
+    Stadium: 'image',
+    Department: 'image_team',
+}
+
+WORKERS = getattr(settings, 'IMAGE_RENDITION_WORKERS', 2)
+
+_executor = ThreadPoolExecutor(
+    max_workers=WORKERS, thread_name_prefix='image-renditions')
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def current(instance, field):
+    """
+    Rendition names for the image in ``field``, or ``None`` if missing.
+
+    Missing renditions are queued for generation.
+    """
+    image = getattr(instance, field)
+    if not image:
+        return None
+    names = getattr(instance, f'{field}_renditions') or {}
+    if names.get('source') == image.name:
+        return names
+    schedule(instance, field)
+    return None
+
+
+def schedule(instance, field):
+    """
+    Generate renditions of ``instance``'s image in the background, once
+    the current transaction (if any) has committed.
+    """
+    name = getattr(instance, field).name
+    key = (instance._meta.label, instance.pk, field, name)
+    transaction.on_commit(lambda: _submit(key, type(instance), instance.pk, field, name))
+
+
+def _submit(key, model, pk, field, name):
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    future = _executor.submit(_generate, model, pk, field, name)
+    future.add_done_callback(lambda _: _discard(key))
+
+
+def _discard(key):
+    with _pending_lock:
+        _pending.discard(key)
+
+
+def render(source, size):
+    """WebP bytes of ``source`` scaled down to fit ``size``."""
+    # Imported here: Pillow is only needed once an image is uploaded
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        output = io.BytesIO()
+        image.save(output, format='WEBP', quality=WEBP_QUALITY)
+    return output.getvalue()
+
+
+def _generate(model, pk, field, name):
+    try:
+        storage = model._meta.get_field(field).storage
+        with storage.open(name) as source:
+            digest = hashlib.sha256()
+            for chunk in iter(lambda: source.read(64 * 1024), b''):
+                digest.update(chunk)
+            stem = os.path.splitext(os.path.basename(name))[0]
+            digest = digest.hexdigest()[:16]
+
+            names = {'source': name}
+            for label, size in SIZES.items():
+                target = f'{UPLOAD_DIR}/{stem}.{label}.{digest}.webp'
+                if not storage.exists(target):
+                    source.seek(0)
+                    target = storage.save(target, ContentFile(render(source, size)))
+                names[label] = target
+
+        # Only if the image wasn't replaced in the meantime
+        updated = model.objects.filter(pk=pk, **{field: name}).update(
+            **{f'{field}_renditions': names})
+        if updated and model is Stadium:
+            cache.bump_stadiums()
+        elif updated:
+            cache.bump_departments()
+    except Exception:
+        logger.exception("Could not generate renditions of %s", name)
+    finally:
+        connections.close_all()
@@ -1,20 +1,99 @@
+import os
+
 from rest_framework import serializers
-from .models import Stadium, Department, Schedule, checks
+
+from core.fieldsets import SparseFieldsetMixin
+from . import renditions, uploads
+from .models import (
+    Stadium, Department, Schedule, WaitlistEntry, checks, Change, ImageUpload,
+    OperatingHours, CalendarException
+)
+
+
+class ImageRenditionsField(serializers.Field):
+    """
+    URLs of the WebP renditions of an image field, keyed by size.
+
+    ``None`` while there is no image or its renditions are being generated.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        names = renditions.current(instance, self.image_field)
+        if names is None:
+            return None
+        storage = instance._meta.get_field(self.image_field).storage
+        request = self.context.get('request')
+        urls = {}
+        for label in renditions.SIZES:
+            url = storage.url(names[label])
+            urls[label] = request.build_absolute_uri(url) if request else url
+        return urls
 
 
 class StadiumSerializer(serializers.ModelSerializer):
+    image_renditions = ImageRenditionsField('image')
+
     class Meta:
         model = Stadium
-        fields = ['id', 'name', 'location', 'capacity', 'is_active', 'image']
+        fields = ['id', 'name', 'location', 'capacity', 'is_active', 'image',
+                  'image_renditions']
+
+
+def _with_current(serializer, attrs, fields):
+    """``fields`` from ``attrs``, falling back to the instance's values on updates."""
+    instance = serializer.instance
+    return {field: attrs.get(field, getattr(instance, field, None)) for field in fields}
+
+
+class OperatingHoursSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = OperatingHours
+        fields = ['id', 'stadium', 'weekday', 'opens_at', 'closes_at', 'is_closed']
+
+    def validate(self, attrs):
+        data = _with_current(self, attrs, ['opens_at', 'closes_at', 'is_closed'])
+        if not data['is_closed']:
+            if data.get('opens_at') is None or data.get('closes_at') is None:
+                raise serializers.ValidationError(
+                    "opens_at and closes_at are required unless is_closed is set.")
+            if data['opens_at'] >= data['closes_at']:
+                raise serializers.ValidationError(
+                    {"closes_at": "Closing time must be after opening time."})
+        return attrs
+
+
+class CalendarExceptionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CalendarException
+        fields = ['id', 'stadium', 'date', 'opens_at', 'closes_at', 'reason']
+
+    def validate(self, attrs):
+        data = _with_current(self, attrs, ['opens_at', 'closes_at'])
+        opens_at, closes_at = data['opens_at'], data['closes_at']
+        if (opens_at is None) != (closes_at is None):
+            raise serializers.ValidationError(
+                "Give both opens_at and closes_at, or neither to close all day.")
+        if opens_at is not None and opens_at >= closes_at:
+            raise serializers.ValidationError(
+                {"closes_at": "Closing time must be after opening time."})
+        return attrs
 
 
 class DepartmentSerializer(serializers.ModelSerializer):
+    image_team_renditions = ImageRenditionsField('image_team')
+
     class Meta:
         model = Department
-        fields = ['id', 'name', 'image_team']
+        fields = ['id', 'name', 'image_team', 'image_team_renditions']
 
 
-class ScheduleSerializer(serializers.ModelSerializer):
+class ScheduleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     department_name = serializers.ReadOnlyField(source='department.name')
     stadium_name = serializers.ReadOnlyField(source='stadium.name')
 
@@ -24,7 +103,45 @@ class ScheduleSerializer(serializers.ModelSerializer):
                   'end_time', 'is_active', 'stadium', 'stadium_name']
 
 
-class ChecksSerializer(serializers.ModelSerializer):
+class ScheduleWithStadiumSerializer(ScheduleSerializer):
+    stadium_detail = StadiumSerializer(source='stadium', read_only=True)
+
+    class Meta(ScheduleSerializer.Meta):
+        fields = ScheduleSerializer.Meta.fields + ['stadium_detail']
+
+
+class TimeSlotSerializer(serializers.Serializer):
+    start_time = serializers.CharField()
+    end_time = serializers.CharField()
+
+
+class StadiumBoardSerializer(StadiumSerializer):
+    schedules = ScheduleSerializer(
+        source='day_schedules', many=True, read_only=True)
+    free_slots = TimeSlotSerializer(many=True, read_only=True)
+
+    class Meta(StadiumSerializer.Meta):
+        fields = StadiumSerializer.Meta.fields + ['schedules', 'free_slots']
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    department_name = serializers.ReadOnlyField(source='department.name')
+    stadium_name = serializers.ReadOnlyField(source='stadium.name')
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'department', 'department_name', 'stadium', 'stadium_name',
+                  'date', 'start_time', 'end_time', 'status', 'schedule', 'created_at']
+        read_only_fields = ['status', 'schedule', 'created_at']
+
+    def validate(self, attrs):
+        if attrs['start_time'] >= attrs['end_time']:
+            raise serializers.ValidationError(
+                {"end_time": "End time must be after start time."})
+        return attrs
+
+
+class ChecksSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     department_name = serializers.ReadOnlyField(source='depertment.name')
     stadium_name = serializers.ReadOnlyField(source='stadium.name')
 
@@ -32,3 +149,44 @@ class ChecksSerializer(serializers.ModelSerializer):
         model = checks
         fields = ['id', 'counter', 'depertment',
                   'department_name', 'stadium', 'stadium_name']
+
+
+class ChangeSerializer(serializers.ModelSerializer):
+    seq = serializers.ReadOnlyField(source='id')
+
+    class Meta:
+        model = Change
+        fields = ['seq', 'model', 'object_id', 'action', 'data', 'created_at']
+
+
+class ImageUploadSerializer(serializers.ModelSerializer):
+    offset = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImageUpload
+        fields = ['id', 'target', 'object_id', 'filename', 'size', 'offset',
+                  'completed', 'created_at']
+        read_only_fields = ['completed', 'created_at']
+
+    def get_offset(self, obj):
+        return obj.size if obj.completed else uploads.received(obj)
+
+    def validate_size(self, value):
+        if not 0 < value <= uploads.MAX_SIZE:
+            raise serializers.ValidationError(
+                f"Images must be between 1 and {uploads.MAX_SIZE} bytes.")
+        return value
+
+    def validate_filename(self, value):
+        value = os.path.basename(value)
+        if os.path.splitext(value)[1].lower() not in ('.jpg', '.jpeg', '.png', '.gif', '.webp'):
+            raise serializers.ValidationError(
+                "Only JPEG, PNG, GIF and WebP images are accepted.")
+        return value
+
+    def validate(self, attrs):
+        model = uploads.TARGET_MODELS[attrs['target']]
+        if not model.objects.filter(pk=attrs['object_id']).exists():
+            raise serializers.ValidationError(
+                {"object_id": f"{model.__name__} not found."})
+        return attrs
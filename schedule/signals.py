@@ -0,0 +1,129 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cache, renditions, waitlist
+from .models import (
+    CalendarException, Change, Department, OperatingHours, Schedule, Stadium,
+    WaitlistEntry, checks
+)
+from .serializers import (
+    ChecksSerializer,
+    DepartmentSerializer,
+    ScheduleSerializer,
+    StadiumSerializer,
+    WaitlistEntrySerializer
+)
+
+# Models recorded in the change feed: model -> (name, serializer)
+CHANGE_FEED_MODELS = {
+    Stadium: ('stadium', StadiumSerializer),
+    Department: ('department', DepartmentSerializer),
+    Schedule: ('schedule', ScheduleSerializer),
+    checks: ('checks', ChecksSerializer),
+    WaitlistEntry: ('waitlist', WaitlistEntrySerializer),
+}
+
+
+BOOKING_FIELDS = ('department_id', 'date', 'stadium_id', 'start_time',
+                  'end_time', 'is_active')
+
+
+@receiver(pre_save, sender=Schedule)
+def remember_previous(sender, instance, **kwargs):
+    # A booking moved to another department or date changes both, and a
+    # moved or deactivated one frees its old interval
+    if instance.pk:
+        instance._previous = Schedule.objects.filter(
+            pk=instance.pk).values(*BOOKING_FIELDS).first()
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def schedule_changed(sender, instance, **kwargs):
+    bookings = [(instance.stadium_id, instance.department_id, instance.date)]
+    previous = getattr(instance, '_previous', None)
+    if previous:
+        bookings.append((previous['stadium_id'], previous['department_id'], previous['date']))
+    cache.invalidate_bookings(bookings)
+
+
+@receiver(post_save, sender=Stadium)
+@receiver(post_delete, sender=Stadium)
+def stadium_changed(sender, instance, **kwargs):
+    cache.bump_stadiums()
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def department_changed(sender, instance, **kwargs):
+    cache.bump_departments()
+
+
+@receiver(post_save, sender=checks)
+@receiver(post_delete, sender=checks)
+def checks_changed(sender, instance, **kwargs):
+    cache.bump_checks()
+
+
+@receiver(post_save, sender=OperatingHours)
+@receiver(post_delete, sender=OperatingHours)
+@receiver(post_save, sender=CalendarException)
+@receiver(post_delete, sender=CalendarException)
+def calendar_changed(sender, instance, **kwargs):
+    # Recompiles the stadium's calendar and refreshes the day boards
+    cache.bump_calendar(instance.stadium_id)
+    cache.bump_stadiums()
+
+
+@receiver(post_save, sender=Stadium)
+@receiver(post_save, sender=Department)
+def image_saved(sender, instance, raw=False, **kwargs):
+    # Resize new uploads in the background
+    if raw:
+        return
+    field = renditions.IMAGE_FIELDS[sender]
+    image = getattr(instance, field)
+    names = getattr(instance, f'{field}_renditions') or {}
+    if image and names.get('source') != image.name:
+        renditions.schedule(instance, field)
+
+
+def record_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    name, serializer_class = CHANGE_FEED_MODELS[sender]
+    Change.objects.create(
+        model=name,
+        object_id=instance.pk,
+        action='create' if created else 'update',
+        data=serializer_class(instance).data
+    )
+
+
+def record_delete(sender, instance, **kwargs):
+    name, _ = CHANGE_FEED_MODELS[sender]
+    Change.objects.create(model=name, object_id=instance.pk, action='delete')
+
+
+for model in CHANGE_FEED_MODELS:
+    post_save.connect(record_save, sender=model)
+    post_delete.connect(record_delete, sender=model)
+
+
+# Connected after the change feed, so a cancellation is recorded before
+# the promotions it causes
+@receiver(post_save, sender=Schedule)
+def booking_saved(sender, instance, created, raw=False, **kwargs):
+    previous = getattr(instance, '_previous', None)
+    if raw or created or not previous or not previous['is_active']:
+        return
+    if any(previous[field] != getattr(instance, field) for field in BOOKING_FIELDS):
+        waitlist.offer(previous['stadium_id'], previous['date'],
+                       previous['start_time'], previous['end_time'])
+
+
+@receiver(post_delete, sender=Schedule)
+def booking_deleted(sender, instance, **kwargs):
+    if instance.is_active:
+        waitlist.offer(instance.stadium_id, instance.date,
+                       instance.start_time, instance.end_time)
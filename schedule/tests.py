@@ -1,3 +1,751 @@
-from django.test import TestCase
+import csv
+import fcntl
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time
+from unittest import mock, skipUnless
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from core import shared_store
+from core.tests import SharedStoreTestCase
+
+from . import cache as schedule_cache
+from . import importer, renditions, uploads, waitlist
+from .archive import archive_before, reaches_archive
+from .importer import read_ical
+from .locking import booking_lock
+from .models import (
+    ArchivedSchedule, CalendarException, Change, Department, Schedule, Stadium,
+    WaitlistEntry, checks
+)
 
 # Create your tests here.
+
+
+@skipUnless(connection.vendor == 'sqlite', "EXPLAIN output checked is SQLite's")
+class ActiveIndexTests(TestCase):
+    """The hot active-row queries must be served by the partial indexes."""
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(index, plan, plan)
+
+    def test_stadium_day_lookup(self):
+        queryset = Schedule.active.filter(date=date(2025, 1, 1), stadium_id=1)
+        self.assertUsesIndex(queryset, 'schedule_active_stadium_date')
+
+    def test_department_day_lookup(self):
+        queryset = Schedule.active.filter(date=date(2025, 1, 1), department_id=1)
+        self.assertUsesIndex(queryset, 'schedule_active_dept_date')
+
+    def test_department_date_range(self):
+        queryset = Schedule.active.filter(
+            department_id=1, date__gte=date(2025, 1, 1), date__lt=date(2025, 1, 8)
+        ).order_by('date', 'start_time')
+        self.assertUsesIndex(queryset, 'schedule_active_dept_date')
+
+    def test_active_stadiums_by_name(self):
+        self.assertUsesIndex(Stadium.active.order_by('name'), 'stadium_active_name')
+
+
+class ActiveListTests(SharedStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.closed = Stadium.objects.create(name='Old', capacity=10, is_active=False)
+        self.active, self.inactive = (
+            Schedule.objects.create(
+                department=self.department, stadium=self.stadium, date=date(2030, 1, 7),
+                start_time=time(hour), end_time=time(hour + 1), is_active=is_active)
+            for hour, is_active in ((10, True), (12, False)))
+
+    def ids(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()]
+
+    def test_schedule_list(self):
+        url = '/api/schedule/schedules/?date=2030-01-07'
+        self.assertEqual(self.ids(url), [self.active.pk])
+        self.assertEqual(sorted(self.ids(url + '&include_inactive=true')),
+                         [self.active.pk, self.inactive.pk])
+
+    def test_schedule_export(self):
+        rows = b''.join(self.client.get('/api/schedule/schedules/export/').streaming_content)
+        self.assertEqual(len(rows.decode().splitlines()), 2)
+
+    def test_stadium_list(self):
+        self.assertEqual(self.ids('/api/schedule/stadiums/'), [self.stadium.pk])
+        self.assertEqual(self.ids('/api/schedule/stadiums/?include_inactive=1'),
+                         [self.stadium.pk, self.closed.pk])
+
+    def test_inactive_rows_reachable_by_id(self):
+        response = self.client.patch(
+            f'/api/schedule/stadiums/{self.closed.pk}/', {'is_active': True},
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f'/api/schedule/schedules/{self.inactive.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class BoardTests(SharedStoreTestCase):
+    url = '/api/schedule/stadiums/board/?date=2030-01-07'
+
+    def book(self, day, start_time):
+        with self.captureOnCommitCallbacks(execute=True):
+            Schedule.objects.create(
+                department=self.department, stadium=self.stadium, date=day,
+                start_time=start_time, end_time=time(start_time.hour + 1))
+
+    def get(self, etag=None):
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        return self.client.get(self.url, **headers)
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_booking_on_date_invalidates(self):
+        etag = self.get()['ETag']
+        self.book(date(2030, 1, 7), time(10))
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()[0]['schedules']), 1)
+
+    def test_booking_on_other_date_keeps_etag(self):
+        etag = self.get()['ETag']
+        self.book(date(2030, 1, 8), time(10))
+        self.assertEqual(self.get(etag).status_code, 304)
+
+    def test_department_rename_invalidates(self):
+        self.book(date(2030, 1, 7), time(10))
+        etag = self.get()['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.department.name = 'Beta'
+            self.department.save()
+        response = self.get(etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]['schedules'][0]['department_name'], 'Beta')
+
+    def test_invalidation_from_another_worker(self):
+        etag = self.get()['ETag']
+        # A thread has its own connection to the store, like another process
+        worker = threading.Thread(target=shared_store.bump, args=(['stadiums'],))
+        worker.start()
+        worker.join()
+        self.assertEqual(self.get(etag).status_code, 200)
+
+    def test_board_shared_with_other_workers(self):
+        self.book(date(2030, 1, 7), time(10))
+        self.get()
+        key = f'stadium-board:2030-01-07:{schedule_cache.date_version(date(2030, 1, 7))}'
+        stored = []
+        worker = threading.Thread(target=lambda: stored.append(shared_store.get(key)))
+        worker.start()
+        worker.join()
+        self.assertEqual(len(stored[0][0]['schedules']), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get().json(), stored[0])
+
+
+class OperatingHoursTests(SharedStoreTestCase):
+    """Bookings must fall within the stadium's hours as every worker sees them."""
+
+    def book(self, day, start_time, end_time):
+        return self.client.post('/api/schedule/schedules/', {
+            'department': self.department.pk, 'stadium': self.stadium.pk,
+            'date': day, 'start_time': start_time, 'end_time': end_time,
+        })
+
+    def test_outside_default_hours_rejected(self):
+        response = self.book('2030-01-07', '07:00', '09:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('operating hours', response.json()['error'])
+
+    def test_weekly_closed_day_rejected(self):
+        # 2030-01-07 is a Monday
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/schedule/operating-hours/', {
+                'stadium': self.stadium.pk, 'weekday': 0, 'is_closed': True})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.book('2030-01-07', '10:00', '11:00').status_code, 400)
+        self.assertEqual(self.book('2030-01-08', '10:00', '11:00').status_code, 201)
+
+    def test_closure_rejected(self):
+        self.assertEqual(self.book('2030-01-07', '10:00', '11:00').status_code, 201)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/schedule/calendar-exceptions/', {
+                'stadium': self.stadium.pk, 'date': '2030-01-07', 'reason': 'Maintenance'})
+        self.assertEqual(response.status_code, 201)
+        response = self.book('2030-01-07', '12:00', '13:00')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], "The stadium is closed on this date.")
+
+    def test_closure_made_by_another_worker(self):
+        # Compiles the calendar in this process
+        self.assertEqual(self.book('2030-01-07', '10:00', '11:00').status_code, 201)
+        CalendarException.objects.create(stadium=self.stadium, date=date(2030, 1, 7))
+        # The other worker's bump reaches this process through the shared store
+        worker = threading.Thread(target=shared_store.bump, args=(
+            [f'calendar:{self.stadium.pk}'],))
+        worker.start()
+        worker.join()
+        self.assertEqual(self.book('2030-01-07', '12:00', '13:00').status_code, 400)
+
+
+class ArchiveTests(SharedStoreTestCase):
+    url = '/api/schedule/schedules/?date=2020-01-06'
+
+    def setUp(self):
+        super().setUp()
+        self.schedule = Schedule.objects.create(
+            department=self.department, stadium=self.stadium, date=date(2020, 1, 6),
+            start_time=time(10), end_time=time(11))
+
+    def archive(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return sum(archive_before(date(2021, 1, 1)))
+
+    def test_promoted_waitlist_entry(self):
+        entry = WaitlistEntry.objects.create(
+            department=self.department, stadium=self.stadium, date=date(2020, 1, 6),
+            start_time=time(10), end_time=time(11), status='promoted',
+            schedule=self.schedule)
+        self.assertEqual(self.archive(), 1)
+        # Deferred foreign keys are only checked at commit
+        connection.check_constraints()
+        entry.refresh_from_db()
+        self.assertIsNone(entry.schedule)
+        self.assertTrue(ArchivedSchedule.objects.filter(pk=self.schedule.pk).exists())
+        self.assertFalse(Schedule.objects.filter(pk=self.schedule.pk).exists())
+
+    def test_boundary_cleared_for_every_worker(self):
+        # Cached as empty before the archive existed
+        self.assertFalse(reaches_archive(date(2020, 1, 6)))
+        self.archive()
+        self.assertTrue(reaches_archive(date(2020, 1, 6)))
+        self.assertFalse(reaches_archive(date(2021, 1, 6)))
+
+    def test_list_reads_archived_rows(self):
+        first = self.client.get(self.url)
+        self.assertEqual(len(first.json()), 1)
+        self.archive()
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual([row['id'] for row in response.json()], [self.schedule.pk])
+
+
+def png(width, height):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), 'green').save(output, format='PNG')
+    return output.getvalue()
+
+
+class RenditionTests(TransactionTestCase):
+    """Renditions are generated by another thread, so the rows have to be committed."""
+
+    def setUp(self):
+        shared_store.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        patcher = mock.patch.object(renditions, '_executor', self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def wait(self):
+        self.executor.shutdown(wait=True)
+
+    def detail(self, stadium):
+        return self.client.get(f'/api/schedule/stadiums/{stadium.pk}/').json()
+
+    def test_generated_after_upload(self):
+        stadium = Stadium.objects.create(
+            name='North', capacity=10,
+            image=SimpleUploadedFile('north.png', png(1600, 900), 'image/png'))
+        self.wait()
+        stadium.refresh_from_db()
+        names = stadium.image_renditions
+        self.assertEqual(names['source'], stadium.image.name)
+        for label, (width, height) in renditions.SIZES.items():
+            with default_storage.open(names[label]) as rendition, Image.open(rendition) as image:
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(image.width, width)
+                self.assertLessEqual(image.height, height)
+
+        urls = self.detail(stadium)['image_renditions']
+        self.assertTrue(urls['thumbnail'].endswith(names['thumbnail']))
+
+    def test_existing_image_generated_on_first_read(self):
+        stadium = Stadium.objects.create(name='North', capacity=10)
+        # Uploaded before renditions existed: no post_save for it
+        name = default_storage.save('stadium_images/old.png', ContentFile(png(400, 400)))
+        Stadium.objects.filter(pk=stadium.pk).update(image=name)
+
+        self.assertIsNone(self.detail(stadium)['image_renditions'])
+        self.wait()
+        self.assertIn('medium', self.detail(stadium)['image_renditions'])
+
+    def test_unreadable_image(self):
+        stadium = Stadium.objects.create(name='North', capacity=10)
+        name = default_storage.save('stadium_images/broken.png', ContentFile(b'not an image'))
+        Stadium.objects.filter(pk=stadium.pk).update(image=name)
+
+        with self.assertLogs('schedule.renditions', 'ERROR'):
+            self.assertIsNone(self.detail(stadium)['image_renditions'])
+            self.wait()
+        stadium.refresh_from_db()
+        self.assertEqual(stadium.image_renditions, {})
+
+
+class ChangeFeedTests(TestCase):
+    url = '/api/schedule/changes/'
+    stream_url = '/api/schedule/changes/stream/'
+
+    def setUp(self):
+        for name in ('North', 'South', 'East'):
+            Stadium.objects.create(name=name, capacity=10)
+        self.seqs = list(Change.objects.order_by('id').values_list('id', flat=True))
+
+    def test_pages(self):
+        first = self.client.get(self.url, {'limit': 2}).json()
+        self.assertEqual([change['seq'] for change in first['changes']], self.seqs[:2])
+        self.assertTrue(first['has_more'])
+
+        second = self.client.get(self.url, {'since': first['last_seq'], 'limit': 2}).json()
+        self.assertEqual([change['seq'] for change in second['changes']], self.seqs[2:])
+        self.assertFalse(second['has_more'])
+
+        last = self.client.get(self.url, {'since': second['last_seq']}).json()
+        self.assertEqual(last, {'changes': [], 'last_seq': second['last_seq'], 'has_more': False})
+
+    def test_invalid_since(self):
+        self.assertEqual(self.client.get(self.url, {'since': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(self.stream_url, {'since': 'x'}).status_code, 400)
+
+    @override_settings(CHANGE_STREAM_WSGI_DURATION=0)
+    def test_stream_ends_under_wsgi(self):
+        response = self.client.get(self.stream_url, HTTP_LAST_EVENT_ID=str(self.seqs[0]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('retry: 3000'))
+        ids = [int(line[4:]) for line in body.splitlines() if line.startswith('id: ')]
+        self.assertEqual(ids, self.seqs[1:])
+
+    async def test_stream_stays_open_under_asgi(self):
+        response = await self.async_client.get(self.stream_url, {'since': self.seqs[-2]})
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b'retry: 3000\n\n')
+        self.assertTrue((await anext(events)).startswith(f'id: {self.seqs[-1]}\n'.encode()))
+        await events.aclose()
+
+    def test_waitlist_promotion_recorded(self):
+        stadium = Stadium.objects.get(name='North')
+        holder, waiting = (Department.objects.create(name=name) for name in ('Alpha', 'Beta'))
+        counter = checks.objects.create(depertment=waiting, stadium=stadium, counter=3)
+        booking = Schedule.objects.create(
+            department=holder, stadium=stadium, date=date(2030, 1, 7),
+            start_time=time(10), end_time=time(11))
+        WaitlistEntry.objects.create(
+            department=waiting, stadium=stadium, date=date(2030, 1, 7),
+            start_time=time(10), end_time=time(11))
+        since = Change.objects.latest('id').id
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.delete()
+
+        changes = self.client.get(self.url, {'since': since}).json()['changes']
+        counted = [change for change in changes if change['model'] == 'checks']
+        self.assertEqual(len(counted), 1)
+        self.assertEqual(counted[0]['object_id'], counter.pk)
+        self.assertEqual(counted[0]['data']['counter'], 4)
+
+
+class UploadTests(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        settings_override = override_settings(MEDIA_ROOT=os.path.join(temp_dir, 'media'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch.object(uploads, 'TEMP_DIR', os.path.join(temp_dir, 'parts'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.stadium = Stadium.objects.create(name='North', capacity=10)
+        self.image = png(64, 64)
+        response = self.client.post('/api/schedule/uploads/', {
+            'target': 'stadium', 'object_id': self.stadium.pk,
+            'filename': 'north.png', 'size': len(self.image)})
+        self.url = f"/api/schedule/uploads/{response.json()['id']}/"
+
+    def send(self, offset, data):
+        return self.client.patch(self.url, data, content_type='application/offset+octet-stream',
+                                 HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_resume(self):
+        half = len(self.image) // 2
+        self.assertEqual(self.send(0, self.image[:half])['Upload-Offset'], str(half))
+        # The client lost the response; it asks where to resume
+        self.assertEqual(self.client.get(self.url).json()['offset'], half)
+
+        response = self.send(half, self.image[half:])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['completed'])
+        self.stadium.refresh_from_db()
+        with self.stadium.image.open() as image:
+            self.assertEqual(image.read(), self.image)
+
+    def test_wrong_offset(self):
+        self.send(0, self.image[:20])
+        response = self.send(0, self.image[:20])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['error'], 'Upload-Offset must be 20.')
+        self.assertEqual(self.client.get(self.url).json()['offset'], 20)
+
+    def test_concurrent_request(self):
+        self.send(0, self.image[:20])
+        upload_id = self.url.rstrip('/').rsplit('/', 1)[1]
+        # Another worker is in the middle of appending
+        with open(os.path.join(uploads.TEMP_DIR, f'{upload_id}.part'), 'ab') as part:
+            fcntl.flock(part, fcntl.LOCK_EX)
+            response = self.send(20, self.image[20:])
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(self.client.delete(self.url).status_code, 409)
+        self.assertEqual(self.client.get(self.url).json()['offset'], 20)
+        self.assertEqual(self.send(20, self.image[20:]).status_code, 200)
+
+    def test_already_complete(self):
+        self.send(0, self.image)
+        response = self.send(len(self.image), b'x')
+        self.assertEqual(response.status_code, 409)
+
+    def test_not_an_image(self):
+        response = self.send(0, b'%PDF-1.4 not an image')
+        self.assertEqual(response.status_code, 415)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class WaitlistTests(TestCase):
+    url = '/api/schedule/waitlist/'
+    day = date(2030, 1, 7)
+
+    def setUp(self):
+        shared_store.clear()
+        self.stadium = Stadium.objects.create(name='North', capacity=10)
+        self.holder, self.first, self.second = (
+            Department.objects.create(name=name) for name in ('Alpha', 'Beta', 'Gamma'))
+        self.booking = self.book(self.holder, 10, 12)
+
+    def book(self, department, start, end):
+        return Schedule.objects.create(
+            department=department, stadium=self.stadium, date=self.day,
+            start_time=time(start), end_time=time(end))
+
+    def join(self, department, start, end):
+        response = self.client.post(self.url, {
+            'department': department.pk, 'stadium': self.stadium.pk, 'date': self.day,
+            'start_time': time(start), 'end_time': time(end)})
+        self.assertEqual(response.status_code, 201)
+        return WaitlistEntry.objects.get(pk=response.json()['id'])
+
+    def free(self, change=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            if change is None:
+                self.booking.delete()
+            else:
+                change(self.booking)
+                self.booking.save()
+
+    def statuses(self, *entries):
+        return [WaitlistEntry.objects.get(pk=entry.pk).status for entry in entries]
+
+    def test_joining_a_free_window_books_it(self):
+        entry = self.join(self.first, 14, 15)
+        self.assertEqual(entry.status, 'promoted')
+        self.assertEqual(entry.schedule.start_time, time(14))
+
+    def test_oldest_entry_first(self):
+        older = self.join(self.first, 10, 11)
+        newer = self.join(self.second, 10, 11)
+        self.free()
+        self.assertEqual(self.statuses(older, newer), ['promoted', 'waiting'])
+
+    def test_every_fitting_entry_promoted(self):
+        morning = self.join(self.first, 10, 11)
+        late_morning = self.join(self.second, 11, 12)
+        self.free()
+        self.assertEqual(self.statuses(morning, late_morning), ['promoted', 'promoted'])
+
+    def test_department_busy_elsewhere_skipped(self):
+        busy = self.join(self.first, 10, 11)
+        # Booked meanwhile at another stadium
+        Schedule.objects.create(
+            department=self.first, stadium=Stadium.objects.create(name='South', capacity=5),
+            date=self.day, start_time=time(10, 30), end_time=time(11, 30))
+        free = self.join(self.second, 10, 11)
+        self.free()
+        self.assertEqual(self.statuses(busy, free), ['waiting', 'promoted'])
+
+    def test_deactivated_booking_frees_window(self):
+        entry = self.join(self.first, 10, 11)
+        self.free(lambda booking: setattr(booking, 'is_active', False))
+        self.assertEqual(self.statuses(entry), ['promoted'])
+
+    def test_moved_booking_frees_old_window(self):
+        entry = self.join(self.first, 10, 11)
+
+        def move(booking):
+            booking.start_time, booking.end_time = time(16), time(18)
+        self.free(move)
+        self.assertEqual(self.statuses(entry), ['promoted'])
+
+    def test_left_entry_not_promoted(self):
+        entry = self.join(self.first, 10, 11)
+        self.assertEqual(self.client.delete(f'{self.url}{entry.pk}/').status_code, 204)
+        self.free()
+        self.assertFalse(Schedule.objects.filter(department=self.first).exists())
+
+    def test_cancellation_recorded_before_promotion(self):
+        self.join(self.first, 10, 11)
+        since = Change.objects.latest('id').id
+        self.free()
+        changes = list(Change.objects.filter(id__gt=since).order_by('id')
+                       .values_list('model', 'action'))
+        self.assertEqual(changes[0], ('schedule', 'delete'))
+        self.assertLess(changes.index(('schedule', 'delete')), changes.index(('schedule', 'create')))
+        self.assertIn(('waitlist', 'update'), changes)
+
+
+def _can_write_schedule():
+    """Whether another connection can write to the schedules right now."""
+    result = []
+
+    def write():
+        try:
+            Schedule.objects.filter(pk=0).update(is_active=False)
+            result.append(True)
+        except OperationalError:
+            result.append(False)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    writer.join()
+    return result[0]
+
+
+class BookingLockTests(TransactionTestCase):
+    def test_lock_blocks_other_writers(self):
+        self.assertTrue(_can_write_schedule())
+        with booking_lock():
+            self.assertFalse(_can_write_schedule())
+        self.assertTrue(_can_write_schedule())
+
+
+ROWS = [
+    'date,start_time,end_time,stadium,department,is_active',
+    '2030-01-07,10:00,11:00,North,Alpha,',       # 2: created
+    '2030-01-07,10:30,11:30,north,Beta,',        # 3: clashes with line 2's stadium
+    '2030-01-07,09:00,10:00,Nowhere,Alpha,',     # 4: unknown stadium
+    '2030-01-07,12:00,11:00,North,Alpha,',       # 5: ends before it starts
+    '2030-01-07,14:00,15:00,North,Alpha,',       # 6: clashes with the existing booking
+    '2030-01-07,14:00,15:00,North,Beta,false',   # 7: inactive, so no clash
+    '2030-01-08,10:00,11:00,{south},Alpha,',     # 8: created, by ID
+]
+
+
+class WaitlistLockTests(TransactionTestCase):
+    def test_window_checked_under_the_lock(self):
+        stadium = Stadium.objects.create(name='North', capacity=10)
+        department = Department.objects.create(name='Alpha')
+        entry = WaitlistEntry.objects.create(
+            department=department, stadium=stadium, date=date(2030, 1, 7),
+            start_time=time(10), end_time=time(11))
+        is_free = waitlist.is_free
+        held = []
+
+        def checking(entry):
+            # A second connection can't book while the window is checked
+            held.append(_can_write_schedule() is False)
+            return is_free(entry)
+
+        with mock.patch.object(waitlist, 'is_free', checking):
+            promoted = waitlist.promote(stadium.pk, date(2030, 1, 7), time(10), time(11))
+        self.assertEqual(held, [True])
+        self.assertEqual([promoted_entry.pk for promoted_entry in promoted], [entry.pk])
+
+
+class ScheduleImportTests(TransactionTestCase):
+    """Uploads are imported on a pool thread with its own connection, so rows are committed."""
+    url = '/api/schedule/schedules/import/'
+
+    def setUp(self):
+        shared_store.clear()
+        self.executor = ThreadPoolExecutor(1)
+        self.addCleanup(self.executor.shutdown)
+        patcher = mock.patch.object(importer, '_executor', self.executor)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.north = Stadium.objects.create(name='North', capacity=10)
+        self.south = Stadium.objects.create(name='South', capacity=10)
+        self.alpha = Department.objects.create(name='Alpha')
+        self.beta = Department.objects.create(name='Beta')
+        Schedule.objects.create(department=self.beta, stadium=self.north, date=date(2030, 1, 7),
+                                start_time=time(14), end_time=time(15))
+        self.counter = checks.objects.create(depertment=self.alpha, stadium=self.north, counter=5)
+        self.csv = '\n'.join(ROWS).format(south=self.south.pk).encode()
+
+    def upload(self, content, name='schedules.csv', **data):
+        response = self.client.post(self.url, {'file': SimpleUploadedFile(name, content), **data})
+        if response.streaming:
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            return response, lines
+        return response, None
+
+    def test_import_completes_without_reader(self):
+        response = self.client.post(self.url, {'file': SimpleUploadedFile('s.csv', self.csv)})
+        # The client went away without reading the progress
+        response.close()
+        self.executor.shutdown(wait=True)
+        self.assertEqual(Schedule.objects.count(), 4)
+
+    def test_conflicts_checked_under_the_lock(self):
+        check_conflicts = importer.ScheduleImporter._check_conflicts
+        held = []
+
+        def checking(importer_self, valid, rejects):
+            # A second connection can't book while the check runs
+            held.append(_can_write_schedule() is False)
+            return check_conflicts(importer_self, valid, rejects)
+
+        with mock.patch.object(importer.ScheduleImporter, '_check_conflicts', checking):
+            _, lines = self.upload(self.csv)
+        self.assertEqual(held, [True])
+        self.assertEqual(lines[-1]['created'], 3)
+
+    def test_rows_rejected_with_their_line(self):
+        response, lines = self.upload(self.csv)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rejects = {line['line']: line['errors'] for line in lines if 'line' in line}
+        self.assertEqual(sorted(rejects), [3, 4, 5, 6])
+        self.assertIn('stadium', rejects[4])
+        self.assertIn('end_time', rejects[5])
+        self.assertEqual(lines[-2], {'processed': 7, 'created': 3, 'rejected': 4})
+        self.assertEqual(lines[-1], {'done': True, 'processed': 7, 'created': 3, 'rejected': 4})
+        self.assertEqual(Schedule.objects.filter(is_active=False).count(), 1)
+
+    def test_bulk_insert_updates_feed_counters_and_cache(self):
+        list_url = '/api/schedule/schedules/?date=2030-01-07'
+        self.assertEqual(len(self.client.get(list_url).json()), 1)
+        since = Change.objects.latest('id').id
+
+        self.upload(self.csv)
+
+        response = self.client.get(list_url)
+        self.assertEqual(response['X-Cache'], 'miss')
+        self.assertEqual(len(response.json()), 2)
+        self.assertEqual(len(self.client.get(list_url + '&include_inactive=true').json()), 3)
+
+        changes = Change.objects.filter(id__gt=since)
+        self.assertEqual(changes.filter(model='schedule', action='create').count(), 3)
+        self.counter.refresh_from_db()
+        self.assertEqual(self.counter.counter, 6)
+        self.assertEqual(changes.get(model='checks', action='update').data['counter'], 6)
+        created = checks.objects.filter(counter=1).order_by('pk')
+        self.assertEqual(
+            [(counter.depertment, counter.stadium) for counter in created],
+            [(self.beta, self.north), (self.alpha, self.south)])
+        self.assertEqual(
+            set(changes.filter(model='checks', action='create').values_list('object_id', flat=True)),
+            {counter.pk for counter in created})
+
+    def test_missing_columns(self):
+        response, _ = self.upload(b'date,start_time\n2030-01-07,10:00\n')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('department', response.json()['error'])
+
+    def test_unknown_format(self):
+        response, _ = self.upload(self.csv, name='schedules.txt')
+        self.assertEqual(response.status_code, 400)
+        response, lines = self.upload(self.csv, name='schedules.txt', format='csv')
+        self.assertEqual(lines[-1]['created'], 3)
+
+    def test_ical(self):
+        calendar = '\r\n'.join([
+            'BEGIN:VCALENDAR',
+            'BEGIN:VEVENT',
+            'SUMMARY:Alpha',
+            'LOCATION:No',
+            ' rth',
+            'DTSTART;TZID=Europe/Berlin:20300107T100000',
+            'DTEND;TZID=Europe/Berlin:20300107T110000',
+            'END:VEVENT',
+            'BEGIN:VEVENT',
+            'SUMMARY:Beta',
+            'LOCATION:South',
+            'DTSTART:20300107T120000Z',
+            'DTEND:20300107T130000Z',
+            'STATUS:CANCELLED',
+            'END:VEVENT',
+            'BEGIN:VEVENT',
+            'SUMMARY:Beta',
+            'LOCATION:South',
+            'DTSTART;VALUE=DATE:20300107',
+            'DTEND;VALUE=DATE:20300108',
+            'END:VEVENT',
+            'END:VCALENDAR',
+        ])
+        rows = list(read_ical(io.StringIO(calendar)))
+        self.assertEqual([line for line, _ in rows], [2, 9, 16])
+        # Folded LOCATION, converted to the server's time zone (UTC)
+        self.assertEqual(rows[0][1] | {'is_active': 'true'}, {
+            'date': '2030-01-07', 'start_time': '09:00:00', 'end_time': '10:00:00',
+            'stadium': 'North', 'department': 'Alpha', 'is_active': 'true'})
+        self.assertEqual(rows[1][1]['is_active'], 'false')
+        self.assertEqual(rows[2][1]['error'], "All-day events can't be imported.")
+
+        response, lines = self.upload(calendar.encode(), name='season.ics')
+        self.assertEqual(lines[-1], {'done': True, 'processed': 3, 'created': 2, 'rejected': 1})
+        self.assertTrue(Schedule.objects.filter(
+            stadium=self.north, department=self.alpha, start_time=time(9)).exists())
+
+    def test_command_writes_rejects(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        source = os.path.join(temp_dir, 'schedules.csv')
+        rejects = os.path.join(temp_dir, 'rejects.csv')
+        with open(source, 'wb') as source_file:
+            source_file.write(self.csv)
+
+        output = io.StringIO()
+        call_command('import_schedules', source, '--chunk-size', '3',
+                     '--rejects', rejects, stdout=output)
+        progress = output.getvalue().splitlines()
+        self.assertEqual(progress, [
+            'Processed 3 rows: 1 created, 2 rejected',
+            'Processed 6 rows: 2 created, 4 rejected',
+            'Processed 7 rows: 3 created, 4 rejected',
+            'Created 3 schedules, rejected 4 rows',
+        ])
+
+        with open(rejects, newline='') as rejects_file:
+            written = list(csv.DictReader(rejects_file))
+        self.assertEqual([row['line'] for row in written], ['3', '4', '5', '6'])
+        self.assertEqual(written[1]['stadium'], 'Nowhere')
+        self.assertIn('stadium', json.loads(written[1]['errors']))
@@ -0,0 +1,176 @@
+"""
+Resumable, streamed uploads of stadium and team images.
+
+Clients create an ``ImageUpload`` declaring the file size, then send the
+bytes in one or more ``PATCH`` requests carrying the offset they start at.
+Request bodies are copied to disk in small chunks, so a worker never holds
+more than ``CHUNK_SIZE`` bytes of an upload in memory, and whatever arrived
+before a dropped connection is kept for the client to resume from. The
+file type is checked as soon as its first bytes are in, and the image is
+verified and attached to its stadium or department once complete.
+
+A request writing to an upload holds an exclusive lock on its partial
+file, so two requests sent from the same offset can't both append; the
+second is turned away with a 409. The lock is released by the operating
+system if the worker dies.
+"""
+
+import fcntl
+import os
+
+from django.conf import settings
+from django.core.files import File
+from rest_framework import status
+
+from .models import Department, Stadium
+from .renditions import IMAGE_FIELDS
+
+CHUNK_SIZE = 64 * 1024
+MAX_SIZE = getattr(settings, 'IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+TEMP_DIR = getattr(settings, 'IMAGE_UPLOAD_TEMP_DIR', None)
+
+TARGET_MODELS = {
+    'stadium': Stadium,
+    'department': Department,
+}
+
+# Bytes needed to recognise every accepted format
+HEADER_SIZE = 12
+
+
+class UploadError(Exception):
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+def is_image_header(header):
+    """Whether ``header`` starts like a JPEG, PNG, GIF or WebP file."""
+    return (
+        header.startswith(b'\xff\xd8\xff') or
+        header.startswith(b'\x89PNG\r\n\x1a\n') or
+        header[:6] in (b'GIF87a', b'GIF89a') or
+        (header[:4] == b'RIFF' and header[8:12] == b'WEBP')
+    )
+
+
+def partial_path(upload):
+    return os.path.join(TEMP_DIR, f'{upload.id}.part')
+
+
+def received(upload):
+    """Number of bytes received so far."""
+    try:
+        return os.path.getsize(partial_path(upload))
+    except FileNotFoundError:
+        return 0
+
+
+def _locked(path):
+    """Open ``path`` for appending, holding its lock, or raise ``UploadError``."""
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    destination = open(path, 'ab')
+    try:
+        fcntl.flock(destination, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        destination.close()
+        raise UploadError("Another request is sending data to this upload.",
+                          status.HTTP_409_CONFLICT)
+    return destination
+
+
+def discard(upload):
+    """Delete the upload and its data, unless a request is sending data to it."""
+    with _locked(partial_path(upload)):
+        _discard(upload)
+
+
+def _discard(upload):
+    try:
+        os.remove(partial_path(upload))
+    except FileNotFoundError:
+        pass
+    upload.delete()
+
+
+def append(upload, offset, stream, length):
+    """
+    Copy ``length`` bytes from ``stream`` to the upload, starting at ``offset``.
+
+    Returns the new offset. Completes the upload when the last byte arrives.
+    Raises ``UploadError`` if another request is sending data to the upload,
+    the offset is wrong, the data would exceed the declared size, or the
+    file turns out not to be an image (in which case the upload is
+    discarded).
+    """
+    path = partial_path(upload)
+    with _locked(path) as destination:
+        # Checked under the lock: another request may have just finished
+        upload.refresh_from_db(fields=['completed'])
+        if upload.completed:
+            os.remove(path)
+            raise UploadError("This upload is already complete.", status.HTTP_409_CONFLICT)
+        current = os.fstat(destination.fileno()).st_size
+        if offset != current:
+            raise UploadError(f"Upload-Offset must be {current}.", status.HTTP_409_CONFLICT)
+        if current + length > upload.size:
+            raise UploadError("Data exceeds the declared upload size.",
+                              status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+
+        remaining = length
+        while remaining:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                # Connection dropped; keep what arrived for a resume
+                break
+            if current < HEADER_SIZE:
+                _check_header(upload, path, destination, chunk)
+            destination.write(chunk)
+            current += len(chunk)
+            remaining -= len(chunk)
+
+        if current == upload.size:
+            destination.flush()
+            complete(upload)
+    return current
+
+
+def _check_header(upload, path, destination, chunk):
+    destination.flush()
+    with open(path, 'rb') as existing:
+        header = (existing.read(HEADER_SIZE) + chunk)[:HEADER_SIZE]
+    if len(header) < min(HEADER_SIZE, upload.size):
+        return
+    if not is_image_header(header):
+        _discard(upload)
+        raise UploadError("Only JPEG, PNG, GIF and WebP images are accepted.",
+                          status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+
+def complete(upload):
+    """Verify the received file and attach it to the target object."""
+    from PIL import Image
+
+    path = partial_path(upload)
+    try:
+        with Image.open(path) as image:
+            image.verify()
+    except Exception:
+        _discard(upload)
+        raise UploadError("The uploaded file is not a valid image.",
+                          status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+
+    model = TARGET_MODELS[upload.target]
+    instance = model.objects.filter(pk=upload.object_id).first()
+    if instance is None:
+        _discard(upload)
+        raise UploadError(f"{model.__name__} not found.", status.HTTP_404_NOT_FOUND)
+
+    # Copied into storage chunk by chunk; saving fires the usual signals
+    # (change feed, renditions)
+    with open(path, 'rb') as source:
+        getattr(instance, IMAGE_FIELDS[model]).save(upload.filename, File(source))
+    os.remove(path)
+    upload.completed = True
+    upload.save(update_fields=['completed'])
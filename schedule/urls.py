@@ -1,8 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
+from rest_framework.parsers import MultiPartParser
 
 from . import views
 
@@ -13,16 +11,33 @@ router.register(r'stadiums', views.StadiumViewSet)
 router.register(r'departments', views.DepartmentViewSet)
 router.register(r'schedules', views.ScheduleViewSet)
 router.register(r'checks', views.ChecksViewSet)
+router.register(r'waitlist', views.WaitlistViewSet)
+router.register(r'operating-hours', views.OperatingHoursViewSet)
+router.register(r'calendar-exceptions', views.CalendarExceptionViewSet)
 
 # URL patterns
 urlpatterns = [
-    # API endpoints
-    path('', include(router.urls)),
-    # Custom action URLs
+    # Custom action URLs (before the router, whose detail routes would
+    # otherwise treat e.g. "available-slots" as a primary key)
+    path('stadiums/board/',
+         views.StadiumViewSet.as_view({'get': 'board'}), name='stadium-board'),
     path('schedules/available-slots/',
          views.ScheduleViewSet.as_view({'get': 'available_slots'}), name='available-slots'),
+    path('schedules/export/',
+         views.ScheduleViewSet.as_view({'get': 'export'}), name='schedule-export'),
+    path('schedules/import/', views.ScheduleViewSet.as_view(
+        {'post': 'import_schedules'}, parser_classes=[MultiPartParser]), name='schedule-import'),
     path('checks/increment-counter/', views.ChecksViewSet.as_view(
         {'post': 'increment_counter'}), name='increment-counter'),
     path('checks/usage-stats/',
          views.ChecksViewSet.as_view({'get': 'usage_stats'}), name='usage-stats'),
+    # Change feed for incremental sync
+    path('changes/', views.ChangeFeedView.as_view(), name='changes'),
+    path('changes/stream/', views.change_stream, name='change-stream'),
+    # Resumable image uploads
+    path('uploads/', views.ImageUploadView.as_view(), name='image-uploads'),
+    path('uploads/<uuid:pk>/', views.ImageUploadDetailView.as_view(),
+         name='image-upload-detail'),
+    # API endpoints
+    path('', include(router.urls)),
 ]
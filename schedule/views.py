@@ -2,20 +2,121 @@ from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
-from django.db.models import Q
+import asyncio
+import csv
+import io
+import json
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from rest_framework.parsers import MultiPartParser
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+
+from core import idempotency, response_cache
+from core.docs import openapi, swagger_auto_schema
+from core.fieldsets import serialize_list
+from core.renderers import COMPACT_RENDERERS
+from django.db.models import Prefetch, Q
+from django.utils import timezone
 from datetime import datetime
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
 
-from .models import Stadium, Department, Schedule, checks
+from . import cache as schedule_cache
+from . import importer, uploads, waitlist
+from .archive import reaches_archive
+from .importer import READERS, ImportFileError, file_format
+from .availability import free_slots, hours_error, opening_hours
+from .models import (
+    Stadium, Department, Schedule, ArchivedSchedule, WaitlistEntry, checks, Change, ImageUpload,
+    OperatingHours, CalendarException
+)
 from .serializers import (
     StadiumSerializer,
     DepartmentSerializer,
     ScheduleSerializer,
-    ChecksSerializer
+    ChecksSerializer,
+    StadiumBoardSerializer,
+    ChangeSerializer,
+    ImageUploadSerializer,
+    WaitlistEntrySerializer,
+    OperatingHoursSerializer,
+    CalendarExceptionSerializer
 )
 
 
+EXPORT_COLUMNS = ['id', 'date', 'start_time', 'end_time', 'department_id',
+                  'department__name', 'stadium_id', 'stadium__name', 'is_active']
+
+
+class _Echo:
+    """File-like object handing each written CSV line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def _import_progress(messages):
+    # The import runs on its own; a client going away only stops the report
+    while (message := messages.get()) is not None:
+        yield json.dumps(message) + '\n'
+
+
+def _detached(upload):
+    """A file of ``upload``'s content that stays open after the request ends."""
+    # The request closes (and deletes) its uploads once the response is done
+    if hasattr(upload, 'temporary_file_path'):
+        return open(upload.temporary_file_path(), 'rb')
+    return io.BytesIO(upload.read())
+
+
+def _include_inactive(request):
+    # Lists show active rows only, unless asked (e.g. to find rows to reactivate)
+    return request.query_params.get('include_inactive', '').lower() in ('1', 'true')
+
+
+INCLUDE_INACTIVE_PARAMETER = openapi.Parameter(
+    'include_inactive', openapi.IN_QUERY,
+    description="Also list deactivated rows (default: false)", type=openapi.TYPE_BOOLEAN)
+
+
+def _schedule_list_tags(request, *args, **kwargs):
+    # Malformed filters get a 400, which isn't cached
+    params = request.query_params
+    try:
+        date = datetime.strptime(params['date'], '%Y-%m-%d').date() if params.get('date') else None
+        stadium_id = int(params['stadium']) if params.get('stadium') else None
+        department_id = int(params['department']) if params.get('department') else None
+    except ValueError:
+        return None
+    # Schedules are listed with their stadium and department names
+    return [schedule_cache.schedule_list_tag(stadium_id, department_id, date),
+            'stadiums', 'departments']
+
+
+def _available_slots_tags(request, *args, **kwargs):
+    try:
+        date = datetime.strptime(request.query_params['date'], '%Y-%m-%d').date()
+        stadium_id = int(request.query_params['stadium'])
+    except (KeyError, ValueError):
+        return None
+    return [schedule_cache.schedule_list_tag(stadium_id=stadium_id, date=date),
+            f'calendar:{stadium_id}']
+
+
+def _export_rows(querysets):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['id', 'date', 'start_time', 'end_time', 'department',
+                           'department_name', 'stadium', 'stadium_name', 'is_active'])
+    for queryset in querysets:
+        rows = queryset.order_by('date', 'start_time').values_list(*EXPORT_COLUMNS)
+        for row in rows.iterator(chunk_size=2000):
+            yield writer.writerow(row)
+
+
 class StadiumViewSet(viewsets.ModelViewSet):
     """
     API endpoint for Stadium operations.
@@ -25,8 +126,15 @@ class StadiumViewSet(viewsets.ModelViewSet):
     queryset = Stadium.objects.all()
     serializer_class = StadiumSerializer
 
+    def get_queryset(self):
+        # Deactivated stadiums stay reachable by ID, so they can be reactivated
+        if self.action == 'list' and not _include_inactive(self.request):
+            return Stadium.active.all()
+        return super().get_queryset()
+
     @swagger_auto_schema(
-        operation_description="List all stadiums or create a new stadium",
+        operation_description="List the active stadiums",
+        manual_parameters=[INCLUDE_INACTIVE_PARAMETER],
         responses={200: StadiumSerializer(many=True)}
     )
     def list(self, request, *args, **kwargs):
@@ -36,6 +144,7 @@ class StadiumViewSet(viewsets.ModelViewSet):
         operation_description="Retrieve a specific stadium by ID",
         responses={200: StadiumSerializer()}
     )
+    @response_cache.cached(lambda request, *args, **kwargs: ['stadiums'])
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
@@ -70,6 +179,64 @@ class StadiumViewSet(viewsets.ModelViewSet):
     def destroy(self, request, *args, **kwargs):
         return super().destroy(request, *args, **kwargs)
 
+    @swagger_auto_schema(
+        operation_description="All active stadiums with their schedules and free slots for a date",
+        manual_parameters=[
+            openapi.Parameter('date', openapi.IN_QUERY,
+                              description="Date to show (YYYY-MM-DD), defaults to today",
+                              type=openapi.TYPE_STRING),
+        ],
+        responses={
+            200: StadiumBoardSerializer(many=True),
+            304: "Not modified",
+            400: "Bad request - invalid date"
+        }
+    )
+    @action(detail=False, methods=['get'])
+    def board(self, request):
+        """Day board for venue display screens."""
+        date_param = request.query_params.get('date')
+        if date_param:
+            try:
+                date_obj = datetime.strptime(date_param, '%Y-%m-%d').date()
+            except ValueError:
+                return Response(
+                    {"error": "Invalid date format. Use YYYY-MM-DD."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            date_obj = timezone.localdate()
+
+        # Cached until a schedule on this date, a stadium or a department changes
+        version = schedule_cache.date_version(date_obj)
+        etag = f'"board-{date_obj}-{version}"'
+        if response_cache.etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag})
+
+        def day_board():
+            # Two queries: the stadiums, then all of the day's schedules
+            stadiums = Stadium.active.prefetch_related(
+                Prefetch(
+                    'schedule_set',
+                    queryset=Schedule.active.filter(
+                        date=date_obj
+                    ).select_related('department').order_by('start_time'),
+                    to_attr='day_schedules'
+                )
+            ).order_by('name')
+            for stadium in stadiums:
+                hours = opening_hours(stadium.id, date_obj)
+                stadium.free_slots = free_slots(stadium.day_schedules, *hours) if hours else []
+            return StadiumBoardSerializer(
+                stadiums, many=True, context={'request': request}).data
+
+        data = schedule_cache.cached(
+            f'stadium-board:{date_obj}:{version}', schedule_cache.date_tags(date_obj),
+            settings.STADIUM_BOARD_CACHE_TIMEOUT, day_board)
+
+        return Response(data, headers={'ETag': etag})
+
 
 class DepartmentViewSet(viewsets.ModelViewSet):
     """
@@ -91,6 +258,7 @@ class DepartmentViewSet(viewsets.ModelViewSet):
         operation_description="Retrieve a specific department by ID",
         responses={200: DepartmentSerializer()}
     )
+    @response_cache.cached(lambda request, *args, **kwargs: ['departments'])
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
 
@@ -111,55 +279,193 @@ class ScheduleViewSet(viewsets.ModelViewSet):
     """
     queryset = Schedule.objects.all()
     serializer_class = ScheduleSerializer
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COMPACT_RENDERERS
 
     @swagger_auto_schema(
         operation_description="List all schedules with optional filtering by date, department, or stadium",
         manual_parameters=[
             openapi.Parameter('date', openapi.IN_QUERY,
                               description="Filter by date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('start_date', openapi.IN_QUERY,
+                              description="Earliest date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('end_date', openapi.IN_QUERY,
+                              description="Latest date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
             openapi.Parameter('department', openapi.IN_QUERY,
                               description="Filter by department ID", type=openapi.TYPE_INTEGER),
             openapi.Parameter('stadium', openapi.IN_QUERY,
                               description="Filter by stadium ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('fields', openapi.IN_QUERY,
+                              description="Comma-separated fields to include", type=openapi.TYPE_STRING),
+            INCLUDE_INACTIVE_PARAMETER,
         ],
         responses={200: ScheduleSerializer(many=True)}
     )
+    @response_cache.cached(_schedule_list_tags)
     def list(self, request, *args, **kwargs):
-        queryset = self.queryset
+        try:
+            filters, start_date = self._filters(request)
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-        # Filter by date
-        date_param = request.query_params.get('date')
+        schedules, archived = self._listed(request, filters)
+        data = serialize_list(self, schedules)
+
+        # Past seasons live in the archive table
+        if reaches_archive(start_date):
+            data = serialize_list(self, archived.order_by('date', 'start_time')) + list(data)
+
+        return Response(data)
+
+    @staticmethod
+    def _filters(request):
+        """
+        Build the list/export filters from the query string.
+
+        Returns ``(filters, start_date)``, where ``start_date`` is the earliest
+        date the filters can match (``None`` if unbounded). Raises
+        ``ValueError`` for malformed dates.
+        """
+        params = request.query_params
+        filters = Q()
+        start_date = None
+
+        # Filter by date, or by a date range
+        date_param = params.get('date')
         if date_param:
-            try:
-                date_obj = datetime.strptime(date_param, '%Y-%m-%d').date()
-                queryset = queryset.filter(date=date_obj)
-            except ValueError:
-                return Response(
-                    {"error": "Invalid date format. Use YYYY-MM-DD."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+            start_date = datetime.strptime(date_param, '%Y-%m-%d').date()
+            filters &= Q(date=start_date)
+        if params.get('start_date'):
+            start_date = datetime.strptime(params['start_date'], '%Y-%m-%d').date()
+            filters &= Q(date__gte=start_date)
+        if params.get('end_date'):
+            end_date = datetime.strptime(params['end_date'], '%Y-%m-%d').date()
+            filters &= Q(date__lte=end_date)
 
         # Filter by department
-        department_param = request.query_params.get('department')
-        if department_param:
-            queryset = queryset.filter(department_id=department_param)
+        if params.get('department'):
+            filters &= Q(department_id=params['department'])
 
         # Filter by stadium
-        stadium_param = request.query_params.get('stadium')
-        if stadium_param:
-            queryset = queryset.filter(stadium_id=stadium_param)
+        if params.get('stadium'):
+            filters &= Q(stadium_id=params['stadium'])
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return filters, start_date
+
+    @staticmethod
+    def _listed(request, filters):
+        """The live and the archived schedules a list or export shows."""
+        if _include_inactive(request):
+            return Schedule.objects.filter(filters), ArchivedSchedule.objects.filter(filters)
+        return (Schedule.active.filter(filters),
+                ArchivedSchedule.objects.filter(filters, is_active=True))
+
+    @swagger_auto_schema(
+        operation_description="Export schedules as CSV, including archived schedules "
+                              "when the date range reaches into the archive",
+        manual_parameters=[
+            openapi.Parameter('date', openapi.IN_QUERY,
+                              description="Filter by date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('start_date', openapi.IN_QUERY,
+                              description="Earliest date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('end_date', openapi.IN_QUERY,
+                              description="Latest date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('department', openapi.IN_QUERY,
+                              description="Filter by department ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('stadium', openapi.IN_QUERY,
+                              description="Filter by stadium ID", type=openapi.TYPE_INTEGER),
+            INCLUDE_INACTIVE_PARAMETER,
+        ],
+        responses={200: "CSV file", 400: "Invalid date format"}
+    )
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        try:
+            filters, start_date = self._filters(request)
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        schedules, archived = self._listed(request, filters)
+        querysets = [schedules]
+        if reaches_archive(start_date):
+            querysets.insert(0, archived)
+
+        response = StreamingHttpResponse(
+            _export_rows(querysets), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="schedules.csv"'
+        return response
+
+    @swagger_auto_schema(
+        operation_description="Create schedules in bulk from a CSV file (columns date, "
+                              "start_time, end_time, stadium, department and optionally "
+                              "is_active) or an iCalendar file (SUMMARY is the department, "
+                              "LOCATION the stadium). Stadiums and departments are given "
+                              "by name or ID. Rows are validated, conflict-checked and "
+                              "committed in chunks, in the background: the import completes "
+                              "even if the client disconnects. The response streams one JSON "
+                              "line per rejected row and per committed chunk, then the totals.",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, description="CSV or iCalendar file",
+                              type=openapi.TYPE_FILE, required=True),
+            openapi.Parameter('format', openapi.IN_FORM,
+                              description="File format (default: by extension)",
+                              type=openapi.TYPE_STRING, enum=sorted(READERS)),
+        ],
+        responses={
+            200: "Newline-delimited JSON: rejects ({line, row, errors}), progress "
+                 "({processed, created, rejected}) and finally {done, processed, created, rejected}",
+            400: "Bad request - missing file, unknown format or missing columns"
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser])
+    def import_schedules(self, request):
+        """Bulk create schedules from an uploaded CSV or iCalendar file."""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {"error": "A CSV or iCalendar file is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        fmt = request.data.get('format') or file_format(upload.name)
+        if fmt not in READERS:
+            return Response(
+                {"error": f"format must be one of: {', '.join(sorted(READERS))}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Large uploads are spooled to disk and read back line by line
+        try:
+            messages = importer.start(_detached(upload), fmt)
+        except ImportFileError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return Response(
+                {"error": "The file must be UTF-8 encoded."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return StreamingHttpResponse(
+            _import_progress(messages), content_type='application/x-ndjson')
 
     @swagger_auto_schema(
         operation_description="Create a new schedule with time conflict validation",
         request_body=ScheduleSerializer,
+        manual_parameters=[idempotency.header_parameter],
         responses={
             201: ScheduleSerializer(),
-            400: "Bad request - time conflict or invalid data"
+            400: "Bad request - time conflict or invalid data",
+            409: "A request with the same Idempotency-Key is in progress",
+            422: "Idempotency-Key reused for a different request"
         }
     )
+    @idempotency.idempotent
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -171,11 +477,15 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         stadium_id = serializer.validated_data['stadium'].id
         department_id = serializer.validated_data['department'].id
 
+        # Check the stadium's operating hours
+        error = hours_error(stadium_id, new_date, new_start_time, new_end_time)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
         # Check for conflicts with the same stadium (existing check)
-        stadium_conflicts = Schedule.objects.filter(
+        stadium_conflicts = Schedule.active.filter(
             date=new_date,
-            stadium_id=stadium_id,
-            is_active=True
+            stadium_id=stadium_id
         )
 
         # Check for time conflicts with the stadium
@@ -188,10 +498,9 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 )
 
         # Check for conflicts with the same department
-        department_conflicts = Schedule.objects.filter(
+        department_conflicts = Schedule.active.filter(
             date=new_date,
-            department_id=department_id,
-            is_active=True
+            department_id=department_id
         )
 
         # Check for time conflicts with the department
@@ -248,6 +557,7 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         }
     )
     @action(detail=False, methods=['get'])
+    @response_cache.cached(_available_slots_tags)
     def available_slots(self, request):
         """Get available time slots for a specific date and stadium."""
         date_param = request.query_params.get('date')
@@ -266,45 +576,26 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 {"error": "Invalid date format. Use YYYY-MM-DD."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            stadium_id = int(stadium_param)
+        except ValueError:
+            return Response(
+                {"error": "stadium must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Closed all day (holiday, maintenance, closed weekday)
+        hours = opening_hours(stadium_id, date_obj)
+        if hours is None:
+            return Response([])
 
         # Get all schedules for the given date and stadium
-        schedules = Schedule.objects.filter(
+        schedules = Schedule.active.filter(
             date=date_obj,
-            stadium_id=stadium_param,
-            is_active=True
+            stadium_id=stadium_id
         ).order_by('start_time')
 
-        # Default operating hours (8 AM to 10 PM)
-        operating_start = datetime.strptime('08:00', '%H:%M').time()
-        operating_end = datetime.strptime('22:00', '%H:%M').time()
-
-        available_slots = []
-        current_time = operating_start
-
-        # Find available slots between scheduled times
-        for schedule in schedules:
-            if current_time < schedule.start_time:
-                available_slots.append({
-                    'start_time': current_time.strftime('%H:%M'),
-                    'end_time': schedule.start_time.strftime('%H:%M')
-                })
-            current_time = schedule.end_time
-
-        # Add final slot if there's time left after the last schedule
-        if schedules and current_time < operating_end:
-            available_slots.append({
-                'start_time': current_time.strftime('%H:%M'),
-                'end_time': operating_end.strftime('%H:%M')
-            })
-
-        # If no schedules for the day, the entire day is available
-        if not schedules:
-            available_slots.append({
-                'start_time': operating_start.strftime('%H:%M'),
-                'end_time': operating_end.strftime('%H:%M')
-            })
-
-        return Response(available_slots)
+        return Response(free_slots(schedules, *hours))
 
     @swagger_auto_schema(
         operation_description="Update a schedule by ID with conflict validation",
@@ -332,11 +623,18 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         department_id = serializer.validated_data.get(
             'department', instance.department).id
 
+        # Check the stadium's operating hours if the booking moves; hours
+        # changed since it was made don't block e.g. deactivating it
+        moved = ((new_date, new_start_time, new_end_time, stadium_id) !=
+                 (instance.date, instance.start_time, instance.end_time, instance.stadium_id))
+        error = moved and hours_error(stadium_id, new_date, new_start_time, new_end_time)
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
         # Check for conflicts with the same stadium
-        stadium_conflicts = Schedule.objects.filter(
+        stadium_conflicts = Schedule.active.filter(
             date=new_date,
-            stadium_id=stadium_id,
-            is_active=True
+            stadium_id=stadium_id
         ).exclude(id=instance.id)  # Exclude the current instance
 
         # Check for time conflicts with the stadium
@@ -349,10 +647,9 @@ class ScheduleViewSet(viewsets.ModelViewSet):
                 )
 
         # Check for conflicts with the same department
-        department_conflicts = Schedule.objects.filter(
+        department_conflicts = Schedule.active.filter(
             date=new_date,
-            department_id=department_id,
-            is_active=True
+            department_id=department_id
         ).exclude(id=instance.id)  # Exclude the current instance
 
         # Check for time conflicts with the department
@@ -387,6 +684,152 @@ class ScheduleViewSet(viewsets.ModelViewSet):
         return self.update(request, *args, **kwargs)
 
 
+class OperatingHoursViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for stadium operating hours.
+
+    One row per stadium and weekday; weekdays without a row use the default
+    hours (08:00-22:00).
+    """
+    queryset = OperatingHours.objects.all()
+    serializer_class = OperatingHoursSerializer
+
+    @swagger_auto_schema(
+        operation_description="List weekly operating hours, optionally for one stadium",
+        manual_parameters=[
+            openapi.Parameter('stadium', openapi.IN_QUERY,
+                              description="Filter by stadium ID", type=openapi.TYPE_INTEGER),
+        ],
+        responses={200: OperatingHoursSerializer(many=True)}
+    )
+    def list(self, request, *args, **kwargs):
+        queryset = self.queryset.order_by('stadium_id', 'weekday')
+        if request.query_params.get('stadium'):
+            queryset = queryset.filter(stadium_id=request.query_params['stadium'])
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Retrieve operating hours by ID",
+        responses={200: OperatingHoursSerializer()}
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Create operating hours",
+        request_body=OperatingHoursSerializer,
+        responses={201: OperatingHoursSerializer(), 400: "Bad request - invalid data"}
+    )
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Update operating hours by ID",
+        request_body=OperatingHoursSerializer,
+        responses={200: OperatingHoursSerializer(), 400: "Bad request - invalid data"}
+    )
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Partially update operating hours by ID",
+        request_body=OperatingHoursSerializer,
+        responses={200: OperatingHoursSerializer(), 400: "Bad request - invalid data"}
+    )
+    def partial_update(self, request, *args, **kwargs):
+        return super().partial_update(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Delete operating hours by ID",
+        responses={204: "No content"}
+    )
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
+
+class CalendarExceptionViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for stadium calendar exceptions.
+
+    Holidays, maintenance closures and other dates whose hours differ from
+    the stadium's weekly hours.
+    """
+    queryset = CalendarException.objects.all()
+    serializer_class = CalendarExceptionSerializer
+
+    @swagger_auto_schema(
+        operation_description="List calendar exceptions with optional filtering",
+        manual_parameters=[
+            openapi.Parameter('stadium', openapi.IN_QUERY,
+                              description="Filter by stadium ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('start_date', openapi.IN_QUERY,
+                              description="Earliest date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('end_date', openapi.IN_QUERY,
+                              description="Latest date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+        ],
+        responses={200: CalendarExceptionSerializer(many=True)}
+    )
+    def list(self, request, *args, **kwargs):
+        queryset = self.queryset.order_by('date')
+        if request.query_params.get('stadium'):
+            queryset = queryset.filter(stadium_id=request.query_params['stadium'])
+
+        try:
+            if request.query_params.get('start_date'):
+                queryset = queryset.filter(date__gte=datetime.strptime(
+                    request.query_params['start_date'], '%Y-%m-%d').date())
+            if request.query_params.get('end_date'):
+                queryset = queryset.filter(date__lte=datetime.strptime(
+                    request.query_params['end_date'], '%Y-%m-%d').date())
+        except ValueError:
+            return Response(
+                {"error": "Invalid date format. Use YYYY-MM-DD."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Retrieve a calendar exception by ID",
+        responses={200: CalendarExceptionSerializer()}
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Create a calendar exception",
+        request_body=CalendarExceptionSerializer,
+        responses={201: CalendarExceptionSerializer(), 400: "Bad request - invalid data"}
+    )
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Update a calendar exception by ID",
+        request_body=CalendarExceptionSerializer,
+        responses={200: CalendarExceptionSerializer(), 400: "Bad request - invalid data"}
+    )
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Partially update a calendar exception by ID",
+        request_body=CalendarExceptionSerializer,
+        responses={200: CalendarExceptionSerializer(), 400: "Bad request - invalid data"}
+    )
+    def partial_update(self, request, *args, **kwargs):
+        return super().partial_update(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Delete a calendar exception by ID",
+        responses={204: "No content"}
+    )
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
+
 class ChecksViewSet(viewsets.ModelViewSet):
     """
     API endpoint for Checks operations.
@@ -406,12 +849,16 @@ class ChecksViewSet(viewsets.ModelViewSet):
                 'stadium': openapi.Schema(type=openapi.TYPE_INTEGER),
             }
         ),
+        manual_parameters=[idempotency.header_parameter],
         responses={
             200: ChecksSerializer(),
-            400: "Bad request - missing or invalid parameters"
+            400: "Bad request - missing or invalid parameters",
+            409: "A request with the same Idempotency-Key is in progress",
+            422: "Idempotency-Key reused for a different request"
         }
     )
     @action(detail=False, methods=['post'])
+    @idempotency.idempotent
     def increment_counter(self, request):
         """Increment counter for department usage of a stadium."""
         department_id = request.data.get('department')
@@ -444,10 +891,13 @@ class ChecksViewSet(viewsets.ModelViewSet):
                               description="Filter by department ID", type=openapi.TYPE_INTEGER),
             openapi.Parameter('stadium', openapi.IN_QUERY,
                               description="Filter by stadium ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('fields', openapi.IN_QUERY,
+                              description="Comma-separated fields to include", type=openapi.TYPE_STRING),
         ],
         responses={200: ChecksSerializer(many=True)}
     )
     @action(detail=False, methods=['get'])
+    @response_cache.cached(lambda request, *args, **kwargs: ['checks', 'stadiums', 'departments'])
     def usage_stats(self, request):
         """Get usage statistics filtered by stadium or department."""
         queryset = self.queryset
@@ -461,5 +911,326 @@ class ChecksViewSet(viewsets.ModelViewSet):
         if stadium_param:
             queryset = queryset.filter(stadium_id=stadium_param)
 
+        return Response(serialize_list(self, queryset))
+
+
+class WaitlistViewSet(viewsets.ModelViewSet):
+    """
+    API endpoint for Waitlist operations.
+
+    Departments queue for booked stadium time windows and are booked
+    automatically, oldest entry first, when the window is freed.
+    """
+    queryset = WaitlistEntry.objects.select_related('department', 'stadium')
+    serializer_class = WaitlistEntrySerializer
+    http_method_names = ['get', 'post', 'delete', 'head', 'options']
+
+    @swagger_auto_schema(
+        operation_description="List waitlist entries with optional filtering",
+        manual_parameters=[
+            openapi.Parameter('department', openapi.IN_QUERY,
+                              description="Filter by department ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('stadium', openapi.IN_QUERY,
+                              description="Filter by stadium ID", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('date', openapi.IN_QUERY,
+                              description="Filter by date (YYYY-MM-DD)", type=openapi.TYPE_STRING),
+            openapi.Parameter('status', openapi.IN_QUERY,
+                              description="Filter by status (waiting or promoted)",
+                              type=openapi.TYPE_STRING),
+        ],
+        responses={200: WaitlistEntrySerializer(many=True)}
+    )
+    def list(self, request, *args, **kwargs):
+        queryset = self.queryset.order_by('created_at')
+
+        for param in ('department', 'stadium', 'status'):
+            if request.query_params.get(param):
+                queryset = queryset.filter(**{param: request.query_params[param]})
+
+        date_param = request.query_params.get('date')
+        if date_param:
+            try:
+                date_obj = datetime.strptime(date_param, '%Y-%m-%d').date()
+            except ValueError:
+                return Response(
+                    {"error": "Invalid date format. Use YYYY-MM-DD."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            queryset = queryset.filter(date=date_obj)
+
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
+
+    @swagger_auto_schema(
+        operation_description="Retrieve a waitlist entry by ID",
+        responses={200: WaitlistEntrySerializer()}
+    )
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @swagger_auto_schema(
+        operation_description="Join the waitlist for a stadium time window; "
+                              "booked right away if the window is free",
+        request_body=WaitlistEntrySerializer,
+        responses={
+            201: WaitlistEntrySerializer(),
+            400: "Bad request - invalid data"
+        }
+    )
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        data = serializer.validated_data
+        error = hours_error(data['stadium'].id, data['date'],
+                            data['start_time'], data['end_time'])
+        if error:
+            return Response({"error": error}, status=status.HTTP_400_BAD_REQUEST)
+
+        entry = serializer.save()
+
+        # Nothing to wait for if the window is already free
+        waitlist.promote(entry.stadium_id, entry.date, entry.start_time, entry.end_time)
+        entry.refresh_from_db()
+
+        return Response(self.get_serializer(entry).data, status=status.HTTP_201_CREATED)
+
+    @swagger_auto_schema(
+        operation_description="Leave the waitlist",
+        responses={204: "No content"}
+    )
+    def destroy(self, request, *args, **kwargs):
+        return super().destroy(request, *args, **kwargs)
+
+
+class ChangeFeedView(APIView):
+    """
+    API endpoint for incremental sync.
+
+    Returns the changes recorded after a sequence number, oldest first, so
+    clients can apply deltas instead of refetching whole lists.
+    """
+    MAX_LIMIT = 1000
+
+    @swagger_auto_schema(
+        operation_description="Changes to stadiums, departments, schedules, checks and "
+                              "waitlist entries after a sequence number",
+        manual_parameters=[
+            openapi.Parameter('since', openapi.IN_QUERY,
+                              description="Last sequence number seen (default 0)",
+                              type=openapi.TYPE_INTEGER),
+            openapi.Parameter('limit', openapi.IN_QUERY,
+                              description="Maximum number of changes (default 500, max 1000)",
+                              type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'changes': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    'last_seq': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'has_more': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                }
+            ),
+            400: "Bad request - invalid parameters"
+        }
+    )
+    def get(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', 500))
+        except ValueError:
+            return Response(
+                {"error": "since and limit must be integers."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, self.MAX_LIMIT))
+
+        # Fetch one extra row to know whether another page follows
+        changes = list(Change.objects.filter(id__gt=since).order_by('id')[:limit + 1])
+        has_more = len(changes) > limit
+        changes = changes[:limit]
+
+        return Response({
+            'changes': ChangeSerializer(changes, many=True).data,
+            'last_seq': changes[-1].id if changes else since,
+            'has_more': has_more
+        })
+
+
+async def change_stream(request):
+    """
+    Server-sent events stream of the change feed.
+
+    Resumes after ``?since=`` or the ``Last-Event-ID`` header. Under the
+    ASGI server (core.asgi) the stream stays open without holding a thread.
+    Under WSGI it holds a worker thread, so it ends after
+    ``CHANGE_STREAM_WSGI_DURATION`` seconds and the client reconnects.
+    """
+    since = request.headers.get('Last-Event-ID') or request.GET.get('since', 0)
+    try:
+        since = int(since)
+    except ValueError:
+        return HttpResponseBadRequest("since must be an integer.")
+
+    if isinstance(request, ASGIRequest):
+        events = _change_events(since)
+    else:
+        events = _bounded_change_events(since, settings.CHANGE_STREAM_WSGI_DURATION)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _change_batch(since):
+    """Events for the next changes after ``since``, and the last sequence number."""
+    events = []
+    for change in Change.objects.filter(id__gt=since).order_by('id')[:500]:
+        data = json.dumps(ChangeSerializer(change).data)
+        events.append(f'id: {change.id}\nevent: change\ndata: {data}\n\n')
+        since = change.id
+    return events, since
+
+
+def _heartbeat_every():
+    # Polls between heartbeats on an idle stream
+    return max(1, int(settings.CHANGE_STREAM_HEARTBEAT / settings.CHANGE_STREAM_POLL_INTERVAL))
+
+
+async def _change_events(since):
+    idle = 0
+    yield 'retry: 3000\n\n'
+    while True:
+        events, since = await sync_to_async(_change_batch)(since)
+        for event in events:
+            yield event
+        if events:
+            idle = 0
+            continue
+
+        idle += 1
+        if idle >= _heartbeat_every():
+            # Comment line that keeps proxies from closing the connection
+            idle = 0
+            yield ': heartbeat\n\n'
+        await asyncio.sleep(settings.CHANGE_STREAM_POLL_INTERVAL)
+
+
+def _bounded_change_events(since, duration):
+    deadline = time.monotonic() + duration
+    idle = 0
+    yield 'retry: 3000\n\n'
+    while True:
+        events, since = _change_batch(since)
+        yield from events
+        if time.monotonic() >= deadline:
+            return
+        if events:
+            idle = 0
+            continue
+
+        idle += 1
+        if idle >= _heartbeat_every():
+            idle = 0
+            yield ': heartbeat\n\n'
+        time.sleep(settings.CHANGE_STREAM_POLL_INTERVAL)
+
+
+class ImageUploadView(APIView):
+    """
+    API endpoint for starting resumable stadium and team image uploads.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Start an image upload for a stadium or a department; "
+                              "send the file with PATCH /uploads/{id}/",
+        request_body=ImageUploadSerializer,
+        responses={201: ImageUploadSerializer(), 400: "Bad request - invalid data"}
+    )
+    def post(self, request):
+        serializer = ImageUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_201_CREATED,
+                        headers={'Upload-Offset': '0'})
+
+
+class ImageUploadDetailView(APIView):
+    """
+    API endpoint for sending and resuming image uploads.
+
+    The request body is raw file data, streamed to disk rather than parsed.
+    """
+
+    @swagger_auto_schema(
+        operation_description="Upload progress; resume by sending from `offset`",
+        responses={200: ImageUploadSerializer(), 404: "Upload not found"}
+    )
+    def get(self, request, pk):
+        upload = get_object_or_404(ImageUpload, pk=pk)
+        data = ImageUploadSerializer(upload).data
+        return Response(data, headers={'Upload-Offset': str(data['offset'])})
+
+    @swagger_auto_schema(
+        operation_description="Append file data (raw bytes) starting at the `Upload-Offset` header",
+        manual_parameters=[
+            openapi.Parameter('Upload-Offset', openapi.IN_HEADER, required=True,
+                              description="Byte offset of this data in the file",
+                              type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: ImageUploadSerializer(),
+            400: "Bad request - missing or invalid headers",
+            404: "Upload not found",
+            409: "Upload-Offset does not match the data received",
+            411: "Content-Length required",
+            413: "Data exceeds the declared size",
+            415: "Not an image"
+        }
+    )
+    def patch(self, request, pk):
+        upload = get_object_or_404(ImageUpload, pk=pk)
+        if upload.completed:
+            return Response(
+                {"error": "This upload is already complete."},
+                status=status.HTTP_409_CONFLICT
+            )
+
+        try:
+            offset = int(request.headers['Upload-Offset'])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "An integer Upload-Offset header is required."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            length = int(request.META['CONTENT_LENGTH'])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Content-Length is required."},
+                status=status.HTTP_411_LENGTH_REQUIRED
+            )
+
+        try:
+            offset = uploads.append(upload, offset, request.stream, length)
+        except uploads.UploadError as e:
+            return Response({"error": e.message}, status=e.status_code)
+
+        return Response(ImageUploadSerializer(upload).data,
+                        headers={'Upload-Offset': str(offset)})
+
+    @swagger_auto_schema(
+        operation_description="Abandon an upload and delete the data received",
+        responses={204: "No content", 404: "Upload not found",
+                   409: "Another request is sending data to this upload"}
+    )
+    def delete(self, request, pk):
+        upload = get_object_or_404(ImageUpload, pk=pk)
+        try:
+            uploads.discard(upload)
+        except uploads.UploadError as e:
+            return Response({"error": e.message}, status=e.status_code)
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,87 @@
+"""
+Waitlist promotion.
+
+When an active booking is deleted, deactivated or moved, the interval it
+held is offered to the waitlist: the waiting entries of that stadium-day
+overlapping the interval are tried oldest first, and each whose window is
+now free for both the stadium and the department becomes a ``Schedule``.
+Each entry is checked and booked under the booking lock (see
+``schedule.locking``), so two workers freeing overlapping intervals can't
+both book the same window.
+Clients learn about promotions from the change feed instead of polling
+``available-slots``.
+"""
+
+from django.db import transaction
+from django.db.models import F, Q
+
+from . import cache
+from .availability import hours_error
+from .locking import booking_lock
+from .models import Change, Schedule, WaitlistEntry, checks
+from .serializers import ChecksSerializer
+
+
+def is_free(entry):
+    """Whether ``entry``'s window clashes with no active booking."""
+    return not Schedule.active.filter(
+        Q(stadium_id=entry.stadium_id) | Q(department_id=entry.department_id),
+        date=entry.date,
+        start_time__lt=entry.end_time,
+        end_time__gt=entry.start_time
+    ).exists()
+
+
+def promote(stadium_id, date, start_time, end_time):
+    """
+    Book the waiting entries that fit into a freed interval.
+
+    Returns the promoted entries.
+    """
+    candidates = WaitlistEntry.objects.filter(
+        status='waiting',
+        stadium_id=stadium_id,
+        date=date,
+        start_time__lt=end_time,
+        end_time__gt=start_time
+    ).order_by('created_at', 'id').values_list('id', flat=True)
+
+    promoted = []
+    for entry_id in candidates:
+        with booking_lock():
+            entry = WaitlistEntry.objects.filter(pk=entry_id, status='waiting').first()
+            if entry is None or not is_free(entry):
+                continue
+            if hours_error(entry.stadium_id, entry.date, entry.start_time, entry.end_time):
+                continue
+            entry.schedule = Schedule.objects.create(
+                department_id=entry.department_id,
+                stadium_id=entry.stadium_id,
+                date=entry.date,
+                start_time=entry.start_time,
+                end_time=entry.end_time
+            )
+            entry.status = 'promoted'
+            entry.save(update_fields=['status', 'schedule'])
+
+            # Counts as a booking in the usage statistics
+            check_obj, created = checks.objects.get_or_create(
+                depertment_id=entry.department_id,
+                stadium_id=entry.stadium_id,
+                defaults={'counter': 1}
+            )
+            if not created:
+                checks.objects.filter(pk=check_obj.pk).update(counter=F('counter') + 1)
+                check_obj.refresh_from_db(fields=['counter'])
+                # update() skips post_save: record the change here
+                Change.objects.create(
+                    model='checks', object_id=check_obj.pk, action='update',
+                    data=ChecksSerializer(check_obj).data)
+                cache.bump_checks()
+        promoted.append(entry)
+    return promoted
+
+
+def offer(stadium_id, date, start_time, end_time):
+    """Offer a freed interval to the waitlist once the current transaction commits."""
+    transaction.on_commit(lambda: promote(stadium_id, date, start_time, end_time))
@@ -1,14 +1,19 @@
 from django.contrib import admin
 
 # Register your models here.
+from core.admin import FullTextSearchMixin
+
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(FullTextSearchMixin, admin.ModelAdmin):
     list_display = ('id', 'username', 'email',
                     'first_name', 'last_name', 'depertment')
+    list_select_related = ('depertment',)
+    autocomplete_fields = ('depertment',)
     search_fields = ('username', 'email')
+    search_kind = 'user'
     ordering = ('-id',)
     list_per_page = 10
     fieldsets = (
@@ -0,0 +1,22 @@
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .tokens import RevokedTokenError, decode_access_token
+
+
+class UserTokenAuthentication(JWTStatelessUserAuthentication):
+    """
+    Stateless bearer token authentication for ``users.User``.
+
+    ``request.user`` is a ``TokenUser`` built from the token claims, so no
+    database lookup is made for authenticated requests.
+    """
+
+    def get_validated_token(self, raw_token):
+        try:
+            return decode_access_token(raw_token)
+        except (TokenError, RevokedTokenError) as exc:
+            raise InvalidToken({
+                'detail': str(exc),
+                'code': 'token_not_valid',
+            })
@@ -0,0 +1,79 @@
+"""
+Password hashing on a bounded worker pool.
+
+PBKDF2 takes hundreds of milliseconds of CPU, so hashes are computed on a
+small pool of threads (hashlib releases the GIL while hashing). At most
+``PASSWORD_HASHING_WORKERS`` hashes run at once and
+``PASSWORD_HASHING_QUEUE`` more may wait; beyond that requests are
+rejected with a 503 rather than queueing indefinitely.
+
+Synchronous callers still wait for their hash, so a WSGI worker is tied
+up for as long as it would be hashing in place; what they gain is the cap
+and the 503. Only ``averify_password`` frees the worker (an ASGI event
+loop) while the hash runs.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+WORKERS = getattr(settings, 'PASSWORD_HASHING_WORKERS', 4)
+QUEUE_SIZE = getattr(settings, 'PASSWORD_HASHING_QUEUE', 32)
+
+_executor = ThreadPoolExecutor(
+    max_workers=WORKERS, thread_name_prefix='password-hashing')
+_slots = threading.BoundedSemaphore(WORKERS + QUEUE_SIZE)
+
+
+class PasswordHashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Too many password operations in progress, try again shortly."
+    default_code = 'password_hashing_busy'
+
+
+def _submit(fn, *args):
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    try:
+        future = _executor.submit(fn, *args)
+    except BaseException:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def _verify(password, encoded):
+    upgraded = []
+    # Django calls the setter when the hash uses an outdated algorithm or
+    # iteration count; the new hash is returned for the caller to save
+    valid = hashers.check_password(
+        password, encoded,
+        setter=lambda raw: upgraded.append(hashers.make_password(raw)))
+    return valid, upgraded[0] if upgraded else None
+
+
+def make_password(password):
+    """Hash ``password`` on the worker pool, waiting for the result."""
+    return _submit(hashers.make_password, password).result()
+
+
+def verify_password(password, encoded):
+    """
+    Check ``password`` against ``encoded`` on the worker pool, waiting for
+    the result.
+
+    Returns ``(valid, upgraded)`` where ``upgraded`` is a fresh hash to store
+    when the existing one is outdated, otherwise ``None``.
+    """
+    return _submit(_verify, password, encoded).result()
+
+
+async def averify_password(password, encoded):
+    """Async version of ``verify_password`` that doesn't block the event loop."""
+    return await asyncio.wrap_future(_submit(_verify, password, encoded))
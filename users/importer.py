@@ -0,0 +1,206 @@
+"""
+Bulk user import from CSV.
+
+Rows are streamed and handled in chunks: each chunk is validated with
+``UserCreateSerializer`` rules, checked for duplicate usernames and emails
+with one query per field, hashed on a process pool and inserted with
+``bulk_create``.
+
+The pool is started by the first import and reused by every later one in
+the process, so its workers load Django once rather than per request.
+"""
+
+import csv
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from core import search
+from schedule.models import Department
+
+from .models import User
+from .serializers import UserCreateSerializer
+
+CSV_FIELDS = ['username', 'email', 'password',
+              'first_name', 'last_name', 'depertment']
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def make_pool(workers):
+    # Spawned workers don't inherit the web process' threads or sockets;
+    # they only need settings loaded to hash passwords
+    context = multiprocessing.get_context('spawn')
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                               initializer=django.setup)
+
+
+def hashing_pool():
+    """The process pool shared by the imports of this process."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = make_pool(settings.USER_IMPORT_WORKERS)
+        return _pool
+
+
+def _discard_pool(pool):
+    # A pool whose worker died refuses new work; the next import starts another
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+
+
+class UserImportSerializer(UserCreateSerializer):
+    """
+    ``UserCreateSerializer`` without per-row queries.
+
+    Uniqueness is checked per chunk and the department is given by name or
+    ID and resolved by the importer.
+    """
+    depertment = serializers.CharField(
+        max_length=100, required=False, allow_blank=True)
+
+    class Meta(UserCreateSerializer.Meta):
+        extra_kwargs = {
+            'password': {'write_only': True},
+            'username': {'validators': []},
+            'email': {'validators': []},
+        }
+
+
+class UserImporter:
+    """
+    Import users from CSV rows.
+
+    ``errors`` collects ``{"line": ..., "errors": ...}`` entries for rows
+    that were rejected; line numbers count the header as line 1.
+    """
+
+    def __init__(self, chunk_size=500, pool=None, workers=None):
+        # Without a pool, the shared one is used
+        self.chunk_size = chunk_size
+        self.pool = pool
+        self.workers = workers or settings.USER_IMPORT_WORKERS
+        self.created = 0
+        self.errors = []
+        self._departments = None
+
+    def run(self, lines):
+        reader = csv.DictReader(lines)
+        missing = set(CSV_FIELDS) - set(reader.fieldnames or [])
+        if missing:
+            self.errors.append({
+                'line': 1,
+                'errors': {'header': f"Missing columns: {', '.join(sorted(missing))}"}
+            })
+            return self
+
+        pool = self.pool or hashing_pool()
+        rows = enumerate(reader, start=2)
+        try:
+            while True:
+                chunk = list(islice(rows, self.chunk_size))
+                if not chunk:
+                    break
+                self._import_chunk(chunk, pool)
+        except BrokenProcessPool:
+            _discard_pool(pool)
+            raise
+        self.errors.sort(key=lambda error: error['line'])
+        return self
+
+    def _import_chunk(self, chunk, pool):
+        valid = []
+        for line, row in chunk:
+            row = {field: row.get(field) or '' for field in CSV_FIELDS}
+            row['confirm_password'] = row['password']
+            serializer = UserImportSerializer(data=row)
+            if not serializer.is_valid():
+                self.errors.append({'line': line, 'errors': serializer.errors})
+                continue
+
+            data = serializer.validated_data
+            department = data.pop('depertment', '').strip()
+            if department:
+                data['depertment_id'] = self._department_id(department)
+                if data['depertment_id'] is None:
+                    self.errors.append({
+                        'line': line,
+                        'errors': {'depertment': [f"Unknown department '{department}'."]}
+                    })
+                    continue
+            valid.append((line, data))
+
+        valid = self._check_unique(valid)
+        if not valid:
+            return
+
+        passwords = [data['password'] for _, data in valid]
+        hashed = pool.map(make_password, passwords,
+                          chunksize=max(1, len(passwords) // (self.workers * 4)))
+        users = [
+            (line, User(**dict(data, password=password)))
+            for (line, data), password in zip(valid, hashed)
+        ]
+
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in users])
+                # bulk_create skips post_save, so index the rows here
+                search.index_objects('user', [user for _, user in users])
+            self.created += len(users)
+        except IntegrityError:
+            # Rows created concurrently since the uniqueness check; save them
+            # one by one to find which lines conflict
+            for line, user in users:
+                try:
+                    with transaction.atomic():
+                        user.save()
+                    self.created += 1
+                except IntegrityError:
+                    self.errors.append({
+                        'line': line,
+                        'errors': {'non_field_errors': ["A user with this username or email already exists."]}
+                    })
+
+    def _department_id(self, value):
+        if self._departments is None:
+            # Departments are few; load the lookup map once per import
+            self._departments = {}
+            for department_id, name in Department.objects.values_list('id', 'name'):
+                self._departments[str(department_id)] = department_id
+                self._departments.setdefault(name.lower(), department_id)
+        return self._departments.get(value.lower())
+
+    def _check_unique(self, valid):
+        """Drop rows whose username or email is taken, in the database or earlier in the file."""
+        taken = {}
+        for field in ('username', 'email'):
+            values = [data[field] for _, data in valid]
+            taken[field] = set(User.objects.filter(
+                **{f'{field}__in': values}).values_list(field, flat=True))
+
+        unique = []
+        for line, data in valid:
+            errors = {}
+            for field in ('username', 'email'):
+                if data[field] in taken[field]:
+                    errors[field] = [f"user with this {field} already exists."]
+            if errors:
+                self.errors.append({'line': line, 'errors': errors})
+                continue
+            taken['username'].add(data['username'])
+            taken['email'].add(data['email'])
+            unique.append((line, data))
+        return unique
@@ -0,0 +1,32 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.importer import UserImporter, make_pool
+
+
+class Command(BaseCommand):
+    help = ("Create users from a CSV file with the columns username, email, "
+            "password, first_name, last_name, depertment.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV file to import.")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="Rows validated and inserted per batch.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Password hashing processes (default: USER_IMPORT_WORKERS).")
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or settings.USER_IMPORT_WORKERS
+        with make_pool(workers) as pool, \
+                open(options['path'], encoding='utf-8-sig', newline='') as csv_file:
+            importer = UserImporter(
+                chunk_size=options['chunk_size'], pool=pool, workers=workers)
+            importer.run(csv_file)
+
+        for error in importer.errors:
+            self.stderr.write(
+                f"line {error['line']}: {json.dumps(error['errors'])}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {importer.created} users, rejected {len(importer.errors)} rows"))
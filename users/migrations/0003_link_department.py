@@ -0,0 +1,95 @@
+# Replace the free-text User.depertment with a foreign key to Department
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def link_departments(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    Department = apps.get_model("schedule", "Department")
+
+    # Match names case-insensitively, ignoring surrounding/repeated spaces
+    departments = {
+        " ".join(department.name.split()).lower(): department
+        for department in Department.objects.all()
+    }
+
+    batch = []
+    for user in User.objects.exclude(depertment="").iterator():
+        name = " ".join(user.depertment.split())
+        if not name:
+            continue
+        department = departments.get(name.lower())
+        if department is None:
+            department = Department.objects.create(name=name)
+            departments[name.lower()] = department
+        user.department_link = department
+        batch.append(user)
+        if len(batch) >= BATCH_SIZE:
+            User.objects.bulk_update(batch, ["department_link"])
+            batch = []
+    User.objects.bulk_update(batch, ["department_link"])
+
+
+def unlink_departments(apps, schema_editor):
+    User = apps.get_model("users", "User")
+
+    batch = []
+    for user in User.objects.select_related("department_link").iterator():
+        user.depertment = user.department_link.name if user.department_link else ""
+        batch.append(user)
+        if len(batch) >= BATCH_SIZE:
+            User.objects.bulk_update(batch, ["depertment"])
+            batch = []
+    User.objects.bulk_update(batch, ["depertment"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("schedule", "0002_department_name_index"),
+        ("users", "0002_revokedtoken"),
+    ]
+
+    operations = [
+        # Gives the text column a default so this migration can be reversed
+        migrations.AlterField(
+            model_name="user",
+            name="depertment",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="department_link",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="schedule.department",
+            ),
+        ),
+        migrations.RunPython(link_departments, unlink_departments),
+        migrations.RemoveField(
+            model_name="user",
+            name="depertment",
+        ),
+        migrations.RenameField(
+            model_name="user",
+            old_name="department_link",
+            new_name="depertment",
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="depertment",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="users",
+                to="schedule.department",
+            ),
+        ),
+    ]
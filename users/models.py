@@ -1,5 +1,7 @@
 from django.db import models
 
+from schedule.models import Department
+
 # Create your models here.
 
 
@@ -9,7 +11,17 @@ class User(models.Model):
     password = models.CharField(max_length=128)
     first_name = models.CharField(max_length=30)
     last_name = models.CharField(max_length=30)
-    depertment = models.CharField(max_length=100)
+    depertment = models.ForeignKey(
+        Department, on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='users')
 
     def __str__(self):
         return self.username
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField()
+
+    def __str__(self):
+        return self.jti
@@ -0,0 +1,20 @@
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .authentication import UserTokenAuthentication
+
+
+class IsSelfOrStaff(BasePermission):
+    """
+    Changes to a user are limited to that user, or to admin staff.
+
+    Only a bearer token identifies a ``users.User``; a session belongs to
+    an admin site account, whose ID says nothing about API users, so it
+    only counts through the account's ``is_staff`` flag.
+    """
+
+    def has_object_permission(self, request, view, obj):
+        if request.method in SAFE_METHODS:
+            return True
+        if isinstance(request.successful_authenticator, UserTokenAuthentication):
+            return str(request.user.id) == str(obj.pk)
+        return bool(request.user and request.user.is_staff)
@@ -1,13 +1,17 @@
 from rest_framework import serializers
-from django.contrib.auth.hashers import make_password
+
+from core.fieldsets import SparseFieldsetMixin
+from .hashing import make_password, verify_password
 from .models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    department_name = serializers.ReadOnlyField(source='depertment.name')
+
     class Meta:
         model = User
         fields = ['id', 'username', 'email',
-                  'first_name', 'last_name', 'depertment']
+                  'first_name', 'last_name', 'depertment', 'department_name']
 
 
 class UserCreateSerializer(serializers.ModelSerializer):
@@ -62,8 +66,9 @@ class UserUpdateSerializer(serializers.ModelSerializer):
                 })
 
             # Check if current password is correct
-            from django.contrib.auth.hashers import check_password
-            if not check_password(data['current_password'], self.instance.password):
+            valid, _ = verify_password(
+                data['current_password'], self.instance.password)
+            if not valid:
                 raise serializers.ValidationError(
                     {"current_password": "Current password is incorrect."})
 
@@ -85,3 +90,7 @@ class UserUpdateSerializer(serializers.ModelSerializer):
 class UserLoginSerializer(serializers.Serializer):
     username = serializers.CharField(required=True)
     password = serializers.CharField(required=True, write_only=True)
+
+
+class TokenRefreshSerializer(serializers.Serializer):
+    refresh = serializers.CharField(required=True, write_only=True)
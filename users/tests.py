@@ -1,3 +1,274 @@
+import threading
+from datetime import time, timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.utils import timezone
+
+from core import shared_store
+from schedule.models import Department, Schedule, Stadium
+
+from . import hashing, importer, throttling
+from .hashing import make_password
+from .models import User
+from .tokens import tokens_for_user
+
+
+def bearer(user):
+    _, access = tokens_for_user(user)
+    return {'HTTP_AUTHORIZATION': f'Bearer {access}'}
+
+
+class MyScheduleTests(TestCase):
+    url = '/api/users/me/schedule/'
+
+    def setUp(self):
+        shared_store.clear()
+        self.department = Department.objects.create(name='Alpha')
+        self.stadium = Stadium.objects.create(name='North', capacity=10)
+        self.user = User.objects.create(
+            username='alice', email='alice@example.com', depertment=self.department)
+        self.headers = bearer(self.user)
+
+    def book(self, start_time):
+        with self.captureOnCommitCallbacks(execute=True):
+            Schedule.objects.create(
+                department=self.department, stadium=self.stadium,
+                date=timezone.localdate() + timedelta(days=1),
+                start_time=start_time, end_time=time(start_time.hour + 1))
+
+    def test_not_modified(self):
+        self.book(time(10))
+        response = self.client.get(self.url, **self.headers)
+        self.assertEqual(len(response.json()), 1)
+        response = self.client.get(
+            self.url, HTTP_IF_NONE_MATCH=response['ETag'], **self.headers)
+        self.assertEqual(response.status_code, 304)
+
+    def test_booking_invalidates(self):
+        self.book(time(10))
+        etag = self.client.get(self.url, **self.headers)['ETag']
+        self.book(time(12))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_invalidation_from_another_worker(self):
+        etag = self.client.get(self.url, **self.headers)['ETag']
+        # A thread has its own connection to the store, like another process
+        worker = threading.Thread(target=shared_store.bump, args=(
+            [f'schedules:department:{self.department.pk}'],))
+        worker.start()
+        worker.join()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, 200)
+
+    def test_timetable_shared_with_other_workers(self):
+        self.book(time(10))
+        self.client.get(self.url, **self.headers)
+        # Another worker has nothing in its own Django cache
+        cache.clear()
+        with mock.patch('users.views.ScheduleWithStadiumSerializer') as serializer:
+            response = self.client.get(self.url, **self.headers)
+        serializer.assert_not_called()
+        self.assertEqual(len(response.json()), 1)
+
+    def test_version_survives_store_reset(self):
+        etag = self.client.get(self.url, **self.headers)['ETag']
+        # A new store starts its versions over, but not its generation
+        shared_store.clear()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, 200)
+
+
+def fresh_login_buckets(test):
+    """Give ``test`` login throttles of its own."""
+    for name in ('ip_buckets', 'username_buckets'):
+        buckets = getattr(throttling, name)
+        patcher = mock.patch.object(throttling, name, throttling.TokenBucket(
+            buckets.capacity, buckets.refill_rate))
+        patcher.start()
+        test.addCleanup(patcher.stop)
+
+
+class TokenTests(TestCase):
+    def setUp(self):
+        fresh_login_buckets(self)
+        self.user = User.objects.create(
+            username='alice', email='alice@example.com',
+            password=make_password('s3cret-pass'))
+
+    def login(self, password='s3cret-pass'):
+        return self.client.post(
+            '/api/users/login/', {'username': 'alice', 'password': password},
+            content_type='application/json')
+
+    def test_login(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user_id'], self.user.pk)
+        profile = self.client.get(
+            '/api/users/profile/', HTTP_AUTHORIZATION=f"Bearer {response.json()['token']}")
+        self.assertEqual(profile.json()['username'], 'alice')
+
+    def test_login_awaits_the_hash(self):
+        # /login/ is the async view: nothing waits on the pool in the worker's thread
+        with mock.patch('users.views.verify_password', side_effect=AssertionError) as blocking:
+            self.assertEqual(self.login().status_code, 200)
+        blocking.assert_not_called()
+
+    def test_login_wrong_password(self):
+        self.assertEqual(self.login('wrong').status_code, 400)
+
+    def test_login_malformed_body(self):
+        for body in (['alice'], 'alice', 42):
+            response = self.client.post(
+                '/api/users/login/', body, content_type='application/json')
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_login_throttled(self):
+        for _ in range(throttling.username_buckets.capacity):
+            self.login('wrong')
+        response = self.login()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_hashing_pool_full(self):
+        with mock.patch.object(hashing, '_slots') as slots:
+            slots.acquire.return_value = False
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+
+    def test_refresh(self):
+        refresh = self.login().json()['refresh']
+        response = self.client.post(
+            '/api/users/token/refresh/', {'refresh': refresh}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.json())
+
+    def test_logout_revokes_tokens(self):
+        tokens = self.login().json()
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {tokens['token']}"}
+        response = self.client.post(
+            '/api/users/logout/', {'refresh': tokens['refresh']},
+            content_type='application/json', **headers)
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(self.client.get('/api/users/profile/', **headers).status_code, 401)
+        response = self.client.post(
+            '/api/users/token/refresh/', {'refresh': tokens['refresh']},
+            content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+
+class UserPermissionTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create(username='alice', email='alice@example.com')
+        self.bob = User.objects.create(username='bob', email='bob@example.com')
+
+    def url(self, user):
+        return f'/api/users/users/{user.pk}/'
+
+    def test_update_self(self):
+        response = self.client.patch(
+            self.url(self.alice), {'first_name': 'Alice'},
+            content_type='application/json', **bearer(self.alice))
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_other_user_forbidden(self):
+        response = self.client.patch(
+            self.url(self.bob), {'first_name': 'Mallory'},
+            content_type='application/json', **bearer(self.alice))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.delete(self.url(self.bob), **bearer(self.alice))
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(User.objects.filter(pk=self.bob.pk).exists())
+
+    def test_staff_session(self):
+        staff = get_user_model().objects.create_user('admin', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.patch(
+            self.url(self.bob), {'first_name': 'Robert'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_session_id_is_not_an_api_user(self):
+        # The admin account's ID matches alice's, but it isn't her
+        account = get_user_model().objects.create_user('someone', id=self.alice.pk)
+        self.client.force_login(account)
+        response = self.client.patch(
+            self.url(self.alice), {'first_name': 'Mallory'}, content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
+
+
+class ByDepartmentTests(TestCase):
+    url = '/api/users/users-by-department/'
+
+    def setUp(self):
+        self.alpha = Department.objects.create(name='Alpha')
+        self.numbered = Department.objects.create(name='999')
+        self.alice = User.objects.create(
+            username='alice', email='alice@example.com', depertment=self.alpha)
+        self.bob = User.objects.create(
+            username='bob', email='bob@example.com', depertment=self.numbered)
+
+    def usernames(self, **params):
+        response = self.client.get(self.url, params, **bearer(self.alice))
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.json()]
+
+    def test_by_id(self):
+        self.assertEqual(self.usernames(department=self.alpha.pk), ['alice'])
+
+    def test_numeric_name_without_matching_id(self):
+        self.assertEqual(self.usernames(department='999'), ['bob'])
+
+    def test_prefix_ignores_case(self):
+        self.assertEqual(self.usernames(department='al', match='prefix'), ['alice'])
+        self.assertEqual(self.usernames(department='alpha'), [])
+
+
+class ImportTests(TestCase):
+    url = '/api/users/users/import/'
+
+    def setUp(self):
+        Department.objects.create(name='Alpha')
+        User.objects.create(username='taken', email='taken@example.com')
+
+    def upload(self, **headers):
+        rows = [
+            'username,email,password,first_name,last_name,depertment',
+            'carol,carol@example.com,pw-carol-1,Carol,C,Alpha',
+            'dave,not-an-email,pw-dave-1,Dave,D,',
+            'taken,other@example.com,pw-taken-1,T,T,',
+            'erin,erin@example.com,pw-erin-1,Erin,E,Nowhere',
+        ]
+        csv_file = SimpleUploadedFile('users.csv', '\n'.join(rows).encode(), 'text/csv')
+        return self.client.post(self.url, {'file': csv_file}, **headers)
+
+    def test_staff_import(self):
+        self.client.force_login(get_user_model().objects.create_user('admin', is_staff=True))
+        response = self.upload()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['created'], 1)
+        self.assertEqual([error['line'] for error in response.json()['errors']], [3, 4, 5])
+        carol = User.objects.get(username='carol')
+        self.assertEqual(carol.depertment.name, 'Alpha')
+        self.assertTrue(hashing.verify_password('pw-carol-1', carol.password)[0])
+
+    def test_pool_reused(self):
+        self.client.force_login(get_user_model().objects.create_user('admin', is_staff=True))
+        self.upload()
+        pool = importer.hashing_pool()
+        User.objects.filter(username='carol').delete()
+        self.upload()
+        self.assertIs(importer.hashing_pool(), pool)
 
-# Create your tests here.
+    def test_users_forbidden(self):
+        user = User.objects.get(username='taken')
+        self.assertEqual(self.upload(**bearer(user)).status_code, 403)
+        self.assertFalse(User.objects.filter(username='carol').exists())
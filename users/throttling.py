@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+# (burst size, tokens refilled per second)
+DEFAULT_RATES = {
+    'ip': (20, 1.0),
+    'username': (5, 0.2),
+}
+
+
+class TokenBucket:
+    """
+    In-memory token buckets keyed by an arbitrary string.
+
+    The least recently used keys are evicted once ``max_keys`` is reached.
+    """
+
+    def __init__(self, capacity, refill_rate, max_keys=10000):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def consume(self, key):
+        """Take a token for ``key``. Returns 0 if allowed, else seconds to wait."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity,
+                         tokens + (now - updated_at) * self.refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / self.refill_rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+_rates = getattr(settings, 'LOGIN_THROTTLE_RATES', DEFAULT_RATES)
+ip_buckets = TokenBucket(*_rates['ip'])
+username_buckets = TokenBucket(*_rates['username'])
+
+
+def login_wait(ip, username):
+    """Return the seconds a login attempt must wait, or 0 if it may proceed."""
+    wait = ip_buckets.consume(ip)
+    if not wait and username:
+        wait = username_buckets.consume(str(username).lower())
+    return wait
+
+
+class LoginRateThrottle(BaseThrottle):
+    """
+    Reject login floods per client IP and per username.
+
+    Runs before the view, so throttled attempts never reach password hashing.
+    """
+
+    def allow_request(self, request, view):
+        # Malformed bodies are throttled per IP and rejected by the view
+        data = request.data
+        username = data.get('username') if isinstance(data, dict) else None
+        self._wait = login_wait(self.get_ident(request), username)
+        return not self._wait
+
+    def wait(self):
+        return self._wait
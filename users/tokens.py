@@ -0,0 +1,105 @@
+"""
+Signed access/refresh tokens for ``users.User``.
+
+Tokens are verified from their signature alone. Revoked token IDs are kept
+in memory and synced from the ``RevokedToken`` table at most once every
+``TOKEN_REVOCATION_SYNC_INTERVAL`` seconds. The sync runs on the request
+path: once per interval, one authenticated request per process makes an
+indexed query for the rows added since the last sync. Requests arriving
+while it runs don't wait for it and check the list as it was.
+"""
+
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+from .models import RevokedToken
+
+
+class RevokedTokenError(Exception):
+    pass
+
+
+def tokens_for_user(user):
+    """Return a new ``(refresh, access)`` token pair for the user."""
+    refresh = RefreshToken.for_user(user)
+    # Claims copied into access tokens, so views don't need a user lookup
+    refresh['username'] = user.username
+    refresh['department_id'] = user.depertment_id
+    return refresh, refresh.access_token
+
+
+@lru_cache(maxsize=getattr(settings, 'TOKEN_CACHE_SIZE', 1024))
+def _decode_access_token(raw_token):
+    return AccessToken(raw_token)
+
+
+def decode_access_token(raw_token):
+    """
+    Return the validated access token for ``raw_token``.
+
+    Signature checks are cached per raw token; expiry and revocation are
+    checked on every call. Raises ``TokenError`` for invalid tokens.
+    """
+    token = _decode_access_token(raw_token)
+    token.check_exp(current_time=aware_utcnow())
+    if revocation_list.is_revoked(token[api_settings.JTI_CLAIM]):
+        raise RevokedTokenError("Token has been revoked")
+    return token
+
+
+class RevocationList:
+    """In-memory view of the ``RevokedToken`` table."""
+
+    def __init__(self, sync_interval):
+        self.sync_interval = sync_interval
+        self._lock = threading.Lock()
+        self._expiries = {}
+        self._last_id = 0
+        self._synced_at = None
+
+    def revoke(self, token):
+        jti = token[api_settings.JTI_CLAIM]
+        expires_at = datetime_from_epoch(token['exp'])
+        RevokedToken.objects.get_or_create(
+            jti=jti, defaults={'expires_at': expires_at})
+        with self._lock:
+            self._expiries[jti] = expires_at
+
+    def is_revoked(self, jti):
+        if self._synced_at is None:
+            self.sync()
+        elif time.monotonic() - self._synced_at >= self.sync_interval:
+            # Another thread already syncing is as good as this one doing it
+            self.sync(blocking=False)
+        return jti in self._expiries
+
+    def sync(self, blocking=True):
+        """Pick up tokens revoked by other processes and drop expired ones."""
+        if not self._lock.acquire(blocking=blocking):
+            return
+        try:
+            now = timezone.now()
+            rows = RevokedToken.objects.filter(
+                id__gt=self._last_id, expires_at__gt=now
+            ).values_list('id', 'jti', 'expires_at')
+            for row_id, jti, expires_at in rows:
+                self._expiries[jti] = expires_at
+                self._last_id = max(self._last_id, row_id)
+            self._expiries = {
+                jti: expires_at for jti, expires_at in self._expiries.items()
+                if expires_at > now
+            }
+            self._synced_at = time.monotonic()
+        finally:
+            self._lock.release()
+
+
+revocation_list = RevocationList(
+    getattr(settings, 'TOKEN_REVOCATION_SYNC_INTERVAL', 30))
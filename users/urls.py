@@ -15,8 +15,15 @@ urlpatterns = [
     # User profile endpoint
     path('profile/', views.UserProfileView.as_view(), name='user-profile'),
 
-    # Login endpoint
-    path('login/', views.UserViewSet.as_view({'post': 'login'}), name='login'),
+    # Current user's department timetable
+    path('me/schedule/', views.MyScheduleView.as_view(), name='my-schedule'),
+
+    # Login endpoint; the password check doesn't hold up an ASGI worker
+    path('login/', views.async_login, name='login'),
+    path('login/async/', views.async_login, name='login-async'),
+    path('token/refresh/', views.UserViewSet.as_view(
+        {'post': 'refresh_token'}), name='token-refresh'),
+    path('logout/', views.UserViewSet.as_view({'post': 'logout'}), name='logout'),
 
     # Department filtering
     path('users-by-department/',
@@ -1,19 +1,59 @@
+import io
+import json
+import math
+
 from rest_framework import viewsets, status, generics
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
-from rest_framework.authtoken.models import Token
-from django.contrib.auth.hashers import check_password
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, AllowAny
+from rest_framework.parsers import MultiPartParser
+from rest_framework.generics import get_object_or_404
+from rest_framework.settings import api_settings
+from rest_framework.views import APIView
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import RefreshToken
+from datetime import timedelta
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from core import response_cache
+from core.docs import openapi, swagger_auto_schema
+from core.fieldsets import serialize_list
+from core.renderers import COMPACT_RENDERERS
+from schedule import cache as schedule_cache
+from schedule.models import Department, Schedule
+from schedule.serializers import ScheduleWithStadiumSerializer
 
 from .models import User
 from .serializers import (
     UserSerializer,
     UserCreateSerializer,
     UserUpdateSerializer,
-    UserLoginSerializer
+    UserLoginSerializer,
+    TokenRefreshSerializer
 )
+from .authentication import UserTokenAuthentication
+from .importer import UserImporter
+from .permissions import IsSelfOrStaff
+from .hashing import PasswordHashingBusy, averify_password, verify_password
+from .throttling import LoginRateThrottle, login_wait
+from .tokens import RevokedTokenError, revocation_list, tokens_for_user
+
+
+def _login_response(user):
+    refresh, access = tokens_for_user(user)
+    return {
+        'token': str(access),
+        'refresh': str(refresh),
+        'user_id': user.id,
+        'username': user.username,
+        'department': user.depertment.name if user.depertment else None,
+        'department_id': user.depertment_id
+    }
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -22,7 +62,8 @@ class UserViewSet(viewsets.ModelViewSet):
 
     Provides CRUD operations for user management with proper authentication.
     """
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('depertment')
+    renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES + COMPACT_RENDERERS
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -33,17 +74,34 @@ class UserViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         # Allow anyone to register
-        if self.action == 'create' or self.action == 'login':
+        if self.action in ['create', 'login', 'refresh_token']:
             return [AllowAny()]
+        # Bulk imports create accounts for others and take a process pool
+        if self.action == 'import_users':
+            return [IsAdminUser()]
+        # Only the user themselves or staff can change or delete a user
+        if self.action in ['update', 'partial_update', 'destroy']:
+            return [IsAuthenticated(), IsSelfOrStaff()]
         # Only authenticated users can access other actions
         return [IsAuthenticated()]
 
+    def get_throttles(self):
+        # Reject login floods before any password hashing happens
+        if self.action == 'login':
+            return [LoginRateThrottle()]
+        return super().get_throttles()
+
     @swagger_auto_schema(
         operation_description="List all users",
+        manual_parameters=[
+            openapi.Parameter('fields', openapi.IN_QUERY,
+                              description="Comma-separated fields to include", type=openapi.TYPE_STRING),
+        ],
         responses={200: UserSerializer(many=True)}
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(serialize_list(self, queryset))
 
     @swagger_auto_schema(
         operation_description="Create a new user account",
@@ -91,8 +149,11 @@ class UserViewSet(viewsets.ModelViewSet):
                 type=openapi.TYPE_OBJECT,
                 properties={
                     'token': openapi.Schema(type=openapi.TYPE_STRING),
+                    'refresh': openapi.Schema(type=openapi.TYPE_STRING),
                     'user_id': openapi.Schema(type=openapi.TYPE_INTEGER),
                     'username': openapi.Schema(type=openapi.TYPE_STRING),
+                    'department': openapi.Schema(type=openapi.TYPE_STRING),
+                    'department_id': openapi.Schema(type=openapi.TYPE_INTEGER),
                 }
             ),
             400: "Bad request - invalid credentials"
@@ -107,25 +168,22 @@ class UserViewSet(viewsets.ModelViewSet):
             password = serializer.validated_data['password']
 
             try:
-                user = User.objects.get(username=username)
+                user = User.objects.select_related(
+                    'depertment').get(username=username)
             except User.DoesNotExist:
                 return Response(
                     {"error": "Invalid username or password"},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            # Check password
-            if check_password(password, user.password):
-                # Generate or get token - we'll use a simple approach for now
-                token_value = f"token_{user.id}_{hash(user.username)}"
-
-                # Return user info and token
-                return Response({
-                    'token': token_value,
-                    'user_id': user.id,
-                    'username': user.username,
-                    'department': user.depertment
-                })
+            # Check password on the hashing pool
+            valid, upgraded = verify_password(password, user.password)
+            if valid:
+                if upgraded:
+                    User.objects.filter(pk=user.pk).update(password=upgraded)
+
+                # Return user info and tokens
+                return Response(_login_response(user))
             else:
                 return Response(
                     {"error": "Invalid username or password"},
@@ -135,10 +193,123 @@ class UserViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @swagger_auto_schema(
-        operation_description="Get users by department",
+        operation_description="Get a new access token from a refresh token",
+        request_body=TokenRefreshSerializer,
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'token': openapi.Schema(type=openapi.TYPE_STRING),
+                }
+            ),
+            401: "Invalid, expired or revoked refresh token"
+        }
+    )
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    def refresh_token(self, request):
+        """Issue a new access token."""
+        serializer = TokenRefreshSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            refresh = self._get_refresh_token(serializer)
+        except (TokenError, RevokedTokenError) as exc:
+            return Response(
+                {"error": str(exc)},
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+
+        return Response({'token': str(refresh.access_token)})
+
+    @swagger_auto_schema(
+        operation_description="Revoke the refresh token and the current access token",
+        request_body=TokenRefreshSerializer,
+        responses={
+            204: "No content",
+            400: "Bad request - invalid refresh token"
+        }
+    )
+    @action(detail=False, methods=['post'])
+    def logout(self, request):
+        """Revoke the user's tokens."""
+        serializer = TokenRefreshSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            refresh = self._get_refresh_token(serializer)
+        except (TokenError, RevokedTokenError) as exc:
+            return Response(
+                {"error": str(exc)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        revocation_list.revoke(refresh)
+        if request.auth is not None:
+            revocation_list.revoke(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def _get_refresh_token(self, serializer):
+        refresh = RefreshToken(serializer.validated_data['refresh'])
+        if revocation_list.is_revoked(refresh['jti']):
+            raise RevokedTokenError("Token has been revoked")
+        return refresh
+
+    @swagger_auto_schema(
+        operation_description="Create users in bulk from a CSV file with the columns "
+                              "username, email, password, first_name, last_name, depertment",
+        manual_parameters=[
+            openapi.Parameter('file', openapi.IN_FORM, description="CSV file",
+                              type=openapi.TYPE_FILE, required=True),
+        ],
+        responses={
+            200: openapi.Schema(
+                type=openapi.TYPE_OBJECT,
+                properties={
+                    'created': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    'errors': openapi.Schema(
+                        type=openapi.TYPE_ARRAY,
+                        items=openapi.Schema(
+                            type=openapi.TYPE_OBJECT,
+                            properties={
+                                'line': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                'errors': openapi.Schema(type=openapi.TYPE_OBJECT),
+                            }
+                        )
+                    ),
+                }
+            ),
+            400: "Bad request - missing file"
+        }
+    )
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=[MultiPartParser])
+    def import_users(self, request):
+        """Bulk create users from an uploaded CSV file."""
+        upload = request.FILES.get('file')
+        if not upload:
+            return Response(
+                {"error": "A CSV file is required"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        lines = io.TextIOWrapper(upload, encoding='utf-8-sig', newline='')
+        importer = UserImporter().run(lines)
+        return Response({
+            'created': importer.created,
+            'errors': importer.errors
+        })
+
+    @swagger_auto_schema(
+        operation_description="Get users by department ID or name",
         manual_parameters=[
             openapi.Parameter('department', openapi.IN_QUERY,
-                              description="Department name", type=openapi.TYPE_STRING),
+                              description="Department ID or name; a name when no department has that ID",
+                              type=openapi.TYPE_STRING),
+            openapi.Parameter('match', openapi.IN_QUERY,
+                              description="Name matching: 'exact' (default) or 'prefix' (case-insensitive)",
+                              type=openapi.TYPE_STRING, enum=['exact', 'prefix']),
+            openapi.Parameter('fields', openapi.IN_QUERY,
+                              description="Comma-separated fields to include", type=openapi.TYPE_STRING),
         ],
         responses={200: UserSerializer(many=True)}
     )
@@ -152,9 +323,23 @@ class UserViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        users = User.objects.filter(depertment__icontains=department)
-        serializer = self.get_serializer(users, many=True)
-        return Response(serializer.data)
+        match = request.query_params.get('match', 'exact')
+        if match not in ('exact', 'prefix'):
+            return Response(
+                {"error": "match must be 'exact' or 'prefix'"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        users = self.get_queryset()
+        # Departments can have numeric names, so digits are an ID only if one exists
+        if department.isdigit() and Department.objects.filter(pk=department).exists():
+            users = users.filter(depertment_id=department)
+        elif match == 'prefix':
+            users = users.filter(depertment__name__istartswith=department)
+        else:
+            users = users.filter(depertment__name=department)
+
+        return Response(serialize_list(self, users))
 
 
 class UserProfileView(generics.RetrieveUpdateAPIView):
@@ -162,23 +347,134 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
     API endpoint for retrieving and updating the current user's profile.
     """
     serializer_class = UserUpdateSerializer
+    # Sessions belong to admin site accounts, not to API users
+    authentication_classes = [UserTokenAuthentication]
     permission_classes = [IsAuthenticated]
 
     def get_object(self):
-        # Get the current user based on authentication
-        # In a real app with proper auth, you'd use request.user
-        # For demo, we're assuming the user ID is passed in the request
-        user_id = self.request.query_params.get('user_id')
-        if not user_id:
+        # The user ID comes from the verified token claims
+        return get_object_or_404(
+            User.objects.select_related('depertment'), id=self.request.user.id)
+
+
+@csrf_exempt
+@require_POST
+async def async_login(request):
+    """
+    Login, served at ``/login/``.
+
+    Behaves like ``UserViewSet.login`` but awaits the password check on the
+    hashing pool, so under ASGI the worker serves other requests meanwhile.
+    Under WSGI, Django runs the view in the worker's thread, which waits
+    for the check as it would for ``UserViewSet.login``.
+    """
+    data = request.POST
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"error": "Invalid JSON body"},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = UserLoginSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors,
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    username = serializer.validated_data['username']
+    password = serializer.validated_data['password']
+
+    wait = login_wait(LoginRateThrottle().get_ident(request), username)
+    if wait:
+        response = JsonResponse(
+            {"error": "Too many login attempts"},
+            status=status.HTTP_429_TOO_MANY_REQUESTS)
+        response['Retry-After'] = str(math.ceil(wait))
+        return response
+
+    try:
+        user = await User.objects.select_related(
+            'depertment').aget(username=username)
+    except User.DoesNotExist:
+        return JsonResponse({"error": "Invalid username or password"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        valid, upgraded = await averify_password(password, user.password)
+    except PasswordHashingBusy as exc:
+        return JsonResponse({"error": str(exc.detail)},
+                            status=exc.status_code)
+
+    if not valid:
+        return JsonResponse({"error": "Invalid username or password"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+    if upgraded:
+        await User.objects.filter(pk=user.pk).aupdate(password=upgraded)
+
+    return JsonResponse(_login_response(user))
+
+
+class MyScheduleView(APIView):
+    """
+    API endpoint for the current user's department timetable.
+
+    Returns the department's upcoming bookings with stadium details from a
+    single query. The department comes from the token, and responses are
+    cached per department and schedule version.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_DAYS = 31
+
+    @swagger_auto_schema(
+        operation_description="Upcoming schedules for the current user's department",
+        manual_parameters=[
+            openapi.Parameter('days', openapi.IN_QUERY,
+                              description="Number of days to include, starting today (default 7, max 31)",
+                              type=openapi.TYPE_INTEGER),
+        ],
+        responses={
+            200: ScheduleWithStadiumSerializer(many=True),
+            304: "Not modified",
+            400: "Bad request - invalid parameters or no department"
+        }
+    )
+    def get(self, request):
+        department_id = getattr(request.user, 'token', {}).get('department_id')
+        if not department_id:
             return Response(
-                {"error": "User ID is required"},
+                {"error": "The current user has no department."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
         try:
-            return User.objects.get(id=user_id)
-        except User.DoesNotExist:
+            days = int(request.query_params.get('days', 7))
+        except ValueError:
             return Response(
-                {"error": "User not found"},
-                status=status.HTTP_404_NOT_FOUND
+                {"error": "days must be an integer."},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        days = max(1, min(days, self.MAX_DAYS))
+
+        today = timezone.localdate()
+        version = schedule_cache.department_version(department_id)
+        etag = f'"{department_id}-{version}-{today}-{days}"'
+        if response_cache.etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers={'ETag': etag})
+
+        def timetable():
+            schedules = Schedule.active.filter(
+                department_id=department_id,
+                date__gte=today,
+                date__lt=today + timedelta(days=days)
+            ).select_related('department', 'stadium').order_by('date', 'start_time')
+            return ScheduleWithStadiumSerializer(
+                schedules, many=True, context={'request': request}).data
+
+        data = schedule_cache.cached(
+            f'my-schedule:{department_id}:{version}:{today}:{days}',
+            schedule_cache.department_tags(department_id),
+            settings.MY_SCHEDULE_CACHE_TIMEOUT, timetable)
+
+        return Response(data, headers={'ETag': etag})